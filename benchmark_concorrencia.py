@@ -0,0 +1,127 @@
+"""
+Benchmark de concorrência da API: dispara requisições pesadas (/geojson de
+uma região) misturadas com leves (/regioes) e mede a latência de cada grupo.
+
+Compara o caminho síncrono (threadpool) e o assíncrono (DATABASE_ASYNC=true)
+subindo um uvicorn para cada modo:
+
+    python benchmark_concorrencia.py --regiao CARIRI --concorrencia 50 --requisicoes 400
+
+Para medir um servidor já em execução, use --url (o modo fica a cargo dele).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def _percentil(valores, p):
+    if not valores:
+        return float("nan")
+    valores = sorted(valores)
+    k = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[k]
+
+
+def _requisitar(url):
+    inicio = time.perf_counter()
+    try:
+        resp = requests.get(url, timeout=300)
+        ok = resp.status_code == 200
+        # Consome o corpo inteiro (respostas em streaming)
+        _ = resp.content
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - inicio, ok
+
+
+def executar(base_url, regiao, concorrencia, requisicoes, proporcao_pesadas):
+    """Dispara as requisições e devolve {grupo: [latências em s]} e o total de falhas."""
+    pesada = f"{base_url}/geojson?regiao={regiao}"
+    leve = f"{base_url}/regioes"
+    passo = max(1, round(1 / proporcao_pesadas)) if proporcao_pesadas > 0 else 0
+    urls = [
+        ("pesada", pesada) if passo and i % passo == 0 else ("leve", leve)
+        for i in range(requisicoes)
+    ]
+
+    latencias = {"pesada": [], "leve": []}
+    falhas = 0
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        futuros = [(grupo, pool.submit(_requisitar, url)) for grupo, url in urls]
+        for grupo, futuro in futuros:
+            duracao, ok = futuro.result()
+            latencias[grupo].append(duracao)
+            falhas += 0 if ok else 1
+    return latencias, falhas, time.perf_counter() - inicio
+
+
+def relatorio(modo, latencias, falhas, total_s):
+    print(f"\n=== {modo} === ({total_s:.1f}s no total, {falhas} falhas)")
+    for grupo, valores in latencias.items():
+        if not valores:
+            continue
+        print(
+            f"  {grupo:<7} n={len(valores):<5} "
+            f"média={statistics.mean(valores) * 1000:8.1f}ms "
+            f"p50={_percentil(valores, 50) * 1000:8.1f}ms "
+            f"p95={_percentil(valores, 95) * 1000:8.1f}ms "
+            f"p99={_percentil(valores, 99) * 1000:8.1f}ms"
+        )
+
+
+def _subir_servidor(porta, assincrono):
+    env = dict(os.environ, DATABASE_ASYNC="true" if assincrono else "false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "data_service.main:app", "--port", str(porta), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{porta}"
+    for _ in range(120):
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Servidor não respondeu em /health")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Usa um servidor já em execução em vez de subir um por modo.")
+    parser.add_argument("--regiao", default="CARIRI")
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--requisicoes", type=int, default=400)
+    parser.add_argument("--pesadas", type=float, default=0.25, help="Proporção de requisições pesadas.")
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.url:
+        resultado = executar(args.url.rstrip("/"), args.regiao, args.concorrencia, args.requisicoes, args.pesadas)
+        relatorio(args.url, *resultado)
+        return
+
+    for assincrono in (False, True):
+        modo = "assíncrono (DATABASE_ASYNC=true)" if assincrono else "síncrono (threadpool)"
+        proc, base_url = _subir_servidor(args.porta, assincrono)
+        try:
+            # Aquecimento: caches de metadados e arquivos do sistema operacional
+            executar(base_url, args.regiao, 4, 8, args.pesadas)
+            resultado = executar(base_url, args.regiao, args.concorrencia, args.requisicoes, args.pesadas)
+            relatorio(modo, *resultado)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark da serialização JSON: compara o caminho antigo
+(`safe_value` por propriedade + jsonable_encoder + json.dumps, como no
+JSONResponse do FastAPI) com `dumps_json` (orjson, NaN → null no encoder)
+sobre um FeatureCollection sintético, e confere que os dois geram o mesmo JSON.
+
+    python benchmark_json.py --features 50000 --repeticoes 5
+"""
+
+import argparse
+import datetime
+import json
+import math
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from data_service.json_response import dumps_json
+from data_service.utils import safe_value
+
+
+def colecao_sintetica(n, seed=42):
+    """FeatureCollection com polígonos de 5 a 40 vértices e propriedades variadas (com NaN)."""
+    rnd = random.Random(seed)
+    features = []
+    for i in range(n):
+        cx, cy = rnd.uniform(-41.5, -37.2), rnd.uniform(-7.9, -2.7)
+        vertices = rnd.randint(5, 40)
+        anel = [
+            [round(cx + 0.01 * math.cos(2 * math.pi * k / vertices), 6),
+             round(cy + 0.01 * math.sin(2 * math.pi * k / vertices), 6)]
+            for k in range(vertices)
+        ]
+        anel.append(anel[0])
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [anel]},
+            "properties": {
+                "numero_lote": str(i),
+                "numero_incra": None if i % 3 else f"{i:013d}",
+                "situacao_juridica": rnd.choice(["Titulado", "Posse", "Em análise"]),
+                "modulo_fiscal": float("nan") if i % 7 == 0 else round(rnd.uniform(0, 20), 2),
+                "area": round(rnd.uniform(0.1, 5000), 4),
+                "nome_municipio": rnd.choice(["Crato", "Juazeiro do Norte", "Barbalha"]),
+                "nome_proprietario": f"Proprietário {i}",
+                "regiao_administrativa": "Cariri",
+                "categoria": rnd.choice(["Pequena Propriedade", "Média Propriedade", "Grande Propriedade"]),
+                "data_criacao_lote": datetime.date(2000 + i % 24, 1 + i % 12, 1 + i % 28),
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def antigo(colecao):
+    """Caminho anterior: NaN removido por `safe_value`, depois jsonable_encoder + json.dumps."""
+    limpa = {
+        "type": colecao["type"],
+        "features": [
+            {**f, "properties": {k: safe_value(v) for k, v in f["properties"].items()}}
+            for f in colecao["features"]
+        ],
+    }
+    return json.dumps(
+        jsonable_encoder(limpa), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def novo(colecao):
+    return dumps_json(colecao)
+
+
+def medir(func, colecao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = func(colecao)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), corpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=int, default=50000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    colecao = colecao_sintetica(args.features)
+    t_antigo, corpo_antigo = medir(antigo, colecao, args.repeticoes)
+    t_novo, corpo_novo = medir(novo, colecao, args.repeticoes)
+
+    # Mesmo documento JSON (a formatação de floats pode diferir, ex.: 1e-05 vs 1e-5)
+    if json.loads(corpo_antigo) != json.loads(corpo_novo):
+        raise SystemExit("As saídas divergem!")
+    print(f"{args.features} features, melhor de {args.repeticoes}:")
+    print(f"  jsonable_encoder + json.dumps: {t_antigo * 1000:9.1f} ms ({len(corpo_antigo) / 1e6:.1f} MB)")
+    print(f"  orjson (dumps_json):           {t_novo * 1000:9.1f} ms ({len(corpo_novo) / 1e6:.1f} MB)")
+    print(f"  ganho: {t_antigo / t_novo:.1f}x; saídas equivalentes, {'idênticas' if corpo_antigo == corpo_novo else 'com diferenças só de formatação'} byte a byte")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 # config.py
 from enum import Enum
-from typing import List
+from typing import List, Optional
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
@@ -28,6 +28,14 @@ class Settings(BaseSettings):
     TABLE_DADOS_RESERVATORIOS: str = "reseratorios_ceara"
     TABLE_TEMPORARY: str = "temp_table"
     TABLE_RA_MUNICIPIOS_MF_CE: str = "regioes_administrativas_municipios_malha_fundiaria_ceara"
+    TABLE_DATA_VERSION: str = "versao_dados"
+    # Dimensão região → município → camada (contagens), mantida pelos importadores
+    TABLE_LOCALIDADES: str = "localidades"
+    # Agregados da malha fundiária (calculados pelos importadores, lidos por /estatisticas)
+    TABLE_ESTATISTICAS: str = "estatisticas_malha"
+    TABLE_ESTATISTICAS_PROPRIETARIOS: str = "estatisticas_proprietarios"
+    # Reservatórios mais próximos de cada lote (calculada pelos importadores)
+    TABLE_LOTES_RESERVATORIOS: str = "lotes_reservatorios_proximos"
     
     # Token de acesso à GeoAPI
     TOKEN_GEOAPI: str = ""
@@ -46,8 +54,123 @@ class Settings(BaseSettings):
     # 0.0001: Quase não simplifica; só remove micro-serrilhados ou ruídos de digitização.
     GEOMETRY_TOLERANCE: float = 0.001
     GEOMETRY_DECIMALS: int = 6
+    # Níveis pré-simplificados gerados pelos importadores; a tolerância pedida
+    # nas rotas é aproximada para o nível mais próximo.
+    SIMPLIFICATION_LEVELS: List[float] = [0.0001, 0.0005, 0.001, 0.01]
+    # Níveis extras, mais grosseiros, só dos municípios (visões do estado
+    # inteiro): simplificados como cobertura, não abrem frestas entre vizinhos.
+    SIMPLIFICATION_LEVELS_MUNICIPIOS: List[float] = [0.02, 0.05]
     PREPROCESS_START_HOUR: int = 2
     PREPROCESS_START_MINUTE: int = 0
+    # Raiz dos snapshots do pré-processamento (<raiz>/snapshots/<id>, publicado em <raiz>/current)
+    PREPROCESS_DIR: str = "data/geodata"
+    # Snapshots mantidos em disco (o publicado + os mais recentes, ainda em leitura)
+    PREPROCESS_SNAPSHOTS_KEEP: int = 2
+    # Intervalo (min) da checagem de novas importações, que dispara o pré-processamento
+    # só das entidades alteradas; 0 desativa (fica só o agendamento diário).
+    PREPROCESS_CHECK_INTERVAL_MINUTES: int = 10
+    # Se False, a API não agenda o pré-processamento (fica a cargo do runner
+    # `python -m data_service.preprocess --agendar`). Mesmo agendado em todos os
+    # workers, só um executa por vez (lock no banco ou em arquivo).
+    PREPROCESS_SCHEDULE_IN_API: bool = True
+    # Processos do pré-processamento (cada um com uma conexão); 0 usa DB_POOL_SIZE.
+    PREPROCESS_WORKERS: int = 0
+    # Níveis de compressão das cópias .gz/.br dos arquivos pré-processados
+    # (geradas uma vez, então vale usar o máximo).
+    PRECOMPRESS_GZIP_LEVEL: int = 9
+    PRECOMPRESS_BROTLI_QUALITY: int = 11
+
+    ## Acesso assíncrono ao banco
+
+    # Se True, as rotas usam create_async_engine (asyncpg / aiosqlite) em vez de
+    # ocupar uma thread do threadpool por requisição.
+    DATABASE_ASYNC: bool = False
+
+    ## Pool de conexões (por processo; multiplique pelos workers do gunicorn)
+
+    # Conexões mantidas abertas e extras permitidas em picos; o padrão cobre
+    # GUNICORN_THREADS=8 com folga para o pré-processamento.
+    DB_POOL_SIZE: int = 8
+    DB_MAX_OVERFLOW: int = 4
+    # Espera máxima (s) por uma conexão livre antes de erro.
+    DB_POOL_TIMEOUT: int = 30
+    # Conexões mais velhas que isso (s) são reabertas no próximo checkout.
+    DB_POOL_RECYCLE: int = 1800
+    # Testa a conexão no checkout (descarta conexões derrubadas pelo servidor).
+    DB_POOL_PRE_PING: bool = True
+    # Statements compilados guardados pelo SQLAlchemy por engine.
+    DB_QUERY_CACHE_SIZE: int = 500
+    # Prepared statements server-side (asyncpg, DATABASE_ASYNC=true); desative
+    # atrás de PgBouncer em modo transaction.
+    DB_PREPARED_STATEMENTS: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+
+    ## Streaming
+
+    # Quantidade de linhas buscadas por vez no cursor server-side das rotas GeoJSON.
+    STREAM_YIELD_PER: int = 1000
+
+    ## Paginação (keyset)
+    PAGE_DEFAULT_LIMIT: int = 1000
+    PAGE_MAX_LIMIT: int = 10000
+
+    ## Versão dos dados
+
+    # Intervalo (s) para reler a tabela de versão, incrementada a cada importação.
+    DATA_VERSION_TTL_SECONDS: int = 30
+    # max-age do Cache-Control das rotas de dados (revalidadas por ETag/Last-Modified).
+    HTTP_CACHE_MAX_AGE: int = 60
+
+    ## Cache de resultados
+
+    # Camada em memória (por processo) + camada compartilhada entre os workers:
+    # "sqlite" (arquivo local), "redis" (exige CACHE_REDIS_URL e o pacote redis) ou "none".
+    CACHE_MEMORY_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_SHARED_BACKEND: str = "sqlite"
+    CACHE_SQLITE_PATH: str = "data/cache/resultados.sqlite"
+    CACHE_SQLITE_MAX_BYTES: int = 1024 * 1024 * 1024
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_TTL_SECONDS: int = 3600
+    # Respostas maiores que isto não são guardadas
+    CACHE_MAX_ENTRY_BYTES: int = 8 * 1024 * 1024
+
+    ## Estatísticas pré-calculadas (/estatisticas)
+
+    # Limites (em hectares) das faixas de módulo fiscal: [20, 40] → "< 20", "20-40", ">= 40".
+    ESTATISTICAS_FAIXAS_MODULO_FISCAL: List[float] = [20, 40, 60, 80]
+    # Quantos proprietários guardar no ranking de cada escopo (estado, região, município).
+    ESTATISTICAS_TOP_N: int = 100
+
+    ## Cache de artefatos GeoJSON (/geojson por região/município)
+
+    # Uma variante por (camada, entidade, nível de simplificação, casas decimais,
+    # propriedades), gravada na primeira requisição; LRU limitado a este total.
+    ARTIFACT_CACHE_DIR: str = "data/artifacts"
+    ARTIFACT_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+    ## Consulta por ponto (/lookup)
+
+    # Máximo de pontos por chamada do POST /lookup.
+    LOOKUP_MAX_POINTS: int = 10000
+
+    ## Reservatórios mais próximos (/reservatorios/proximos)
+
+    # Máximo de reservatórios (k) por consulta.
+    RESERVATORIOS_PROXIMOS_MAX_K: int = 50
+    # Reservatórios por lote na tabela pré-calculada TABLE_LOTES_RESERVATORIOS (0 desativa).
+    RESERVATORIOS_PROXIMOS_POR_LOTE: int = 3
+
+    ## TopoJSON (/geojson_muni?format=topojson)
+
+    # Valores inteiros por eixo na quantização das coordenadas (1e5 ≈ 5 m no Ceará).
+    TOPOJSON_QUANTIZATION: int = 100000
+
+    ## Tiles vetoriais (MVT)
+    TILE_EXTENT: int = 4096
+    TILE_BUFFER: int = 64
+    TILE_MAX_ZOOM: int = 22
+    TILE_CACHE_DIR: str = "data/tiles"
+    TILE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
 
     @property
     def postgres_dsn(self) -> str:
@@ -59,6 +182,10 @@ class Settings(BaseSettings):
             f"{self.POSTGRES_DB}"
         )
     
+    @property
+    def postgres_async_dsn(self) -> str:
+        return self.postgres_dsn.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     @property
     def sqlite_dsn(self) -> str:
         return f"sqlite:///{os.path.abspath(self.SQLITE_PATH)}"
@@ -0,0 +1,184 @@
+# data_service/artifacts.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from typing import AsyncIterable, Dict, Iterable, Iterator, Optional, Sequence
+
+from .precompressed import PRECOMPRESSED_SUFFIXES, write_precompressed
+
+logger = logging.getLogger("uvicorn")
+
+
+def artifact_name(level: float, decimals: int, properties: Sequence[str]) -> str:
+    """Nome do arquivo de uma variante: nível de simplificação, casas decimais e propriedades."""
+    props = hashlib.sha1(",".join(properties).encode("utf-8")).hexdigest()[:12]
+    return f"t{level:g}_d{decimals}_p{props}.geojson"
+
+
+class ArtifactCache:
+    """
+    Cache em disco das respostas GeoJSON completas de uma entidade, como
+    `<root>/v<versão>/<camada>/<entidade>/t<nível>_d<decimais>_p<props>.geojson`
+    (+ cópias .gz/.br). É preenchido sob demanda: a primeira requisição de uma
+    variante grava o corpo enquanto o envia. Ao mudar a versão dos dados, as
+    versões antigas são removidas; acima de `max_bytes`, as variantes menos
+    usadas recentemente (mtime, atualizado a cada acerto) são apagadas.
+    Contadores de acertos/faltas são por processo.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"acertos": 0, "faltas": 0, "gravacoes": 0, "remocoes": 0}
+        self._size: Optional[int] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path(self, version: int, layer: str, entity: str, name: str) -> str:
+        return os.path.join(self.root, f"v{version}", layer, entity, name)
+
+    def lookup(self, version: int, layer: str, entity: str, name: str) -> Optional[str]:
+        """Caminho da variante, se estiver em cache (conta acerto/falta)."""
+        path = self.path(version, layer, entity, name)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats["faltas"] += 1
+            return None
+        with self._lock:
+            self.stats["acertos"] += 1
+        return path
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "bytes": self._size or 0, "limite_bytes": self.max_bytes}
+
+    # ---------- gravação ----------
+
+    def _tmp_path(self, path: str) -> str:
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _commit(self, version: int, tmp: str, path: str) -> None:
+        os.replace(tmp, path)
+        try:
+            write_precompressed(path)
+        except OSError as e:
+            logger.warning("Falha ao comprimir %s: %s", path, e)
+        added = sum(os.path.getsize(p) for p in self._group(path) if os.path.isfile(p))
+        with self._lock:
+            self.stats["gravacoes"] += 1
+            if self._version != version:
+                self._purge_old_versions(version)
+                self._version = version
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _finish(self, version: int, tmp: str, path: str) -> None:
+        # Compressão (brotli no nível máximo) fora da requisição
+        threading.Thread(target=self._commit, args=(version, tmp, path), daemon=True).start()
+
+    def tee(self, version: int, layer: str, entity: str, name: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Repassa os pedaços da resposta e, se lida até o fim, grava a variante."""
+        if not self.enabled:
+            yield from chunks
+            return
+        path = self.path(version, layer, entity, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = self._tmp_path(path)
+        complete = False
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._finish(version, tmp, path)
+            else:
+                _remove(tmp)
+
+    async def atee(self, version: int, layer: str, entity: str, name: str, chunks: AsyncIterable[bytes]):
+        """Equivalente assíncrono de `tee` (escrita em disco numa thread)."""
+        if not self.enabled:
+            async for chunk in chunks:
+                yield chunk
+            return
+        path = self.path(version, layer, entity, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = self._tmp_path(path)
+        f = await asyncio.to_thread(open, tmp, "wb")
+        complete = False
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                yield chunk
+            complete = True
+        finally:
+            f.close()
+            if complete:
+                self._finish(version, tmp, path)
+            else:
+                _remove(tmp)
+
+    # ---------- remoção ----------
+
+    @staticmethod
+    def _group(path: str):
+        return [path] + [path + suffix for suffix in PRECOMPRESSED_SUFFIXES.values()]
+
+    def _entries(self):
+        """(variante, bytes somando as cópias comprimidas, mtime) de cada variante em disco."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".geojson"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                size = sum(os.path.getsize(p) for p in self._group(path) if os.path.isfile(p))
+                yield path, size, mtime
+
+    def _purge_old_versions(self, version: int) -> None:
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            if name != f"v{version}":
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        self._size = None
+
+    def _evict(self) -> None:
+        """Remove as variantes mais antigas até ficar em 90% do limite."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        size = sum(s for _, s, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, s, _ in entries:
+            if size <= target:
+                break
+            for p in self._group(path):
+                _remove(p)
+            size -= s
+            self.stats["remocoes"] += 1
+        self._size = size
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
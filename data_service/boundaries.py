@@ -0,0 +1,36 @@
+# data_service/boundaries.py
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import shapely
+from shapely import STRtree
+
+from .names import name_key
+
+class BoundaryIndex:
+    """
+    Contornos dos municípios (EPSG:4326) num STRtree em memória, com a região
+    administrativa de cada um. Como as regiões são uniões de municípios, o
+    município que contém o ponto já dá a região, sem uma segunda árvore.
+    """
+
+    def __init__(self, names: Sequence[str], geoms: Sequence, regioes: Dict[str, str]):
+        self.names = list(names)
+        self.regioes = [regioes.get(name_key(n)) for n in self.names]
+        self.tree = STRtree(list(geoms))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def locate(self, points: Sequence[Tuple[float, float]]) -> List[Tuple[Optional[str], Optional[str]]]:
+        """(município, região) de cada ponto (lon, lat); pontos na divisa ficam com o primeiro."""
+        result: List[Tuple[Optional[str], Optional[str]]] = [(None, None)] * len(points)
+        if not points or not self.names:
+            return result
+        lons, lats = zip(*points)
+        found, matches = self.tree.query(shapely.points(lons, lats), predicate="intersects")
+        for i, j in zip(found.tolist(), matches.tolist()):
+            if result[i][0] is None:
+                result[i] = (self.names[j], self.regioes[j])
+        return result
+
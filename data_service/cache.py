@@ -0,0 +1,280 @@
+# data_service/cache.py
+
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger("uvicorn")
+
+# Cópia de uma resposta em streaming (tee) mantida em memória; acima disso, vai para disco
+TEE_SPOOL_BYTES = 1024 * 1024
+
+
+class MemoryCache:
+    """
+    Camada em processo: LRU limitado em bytes, com TTL por entrada.
+    Ao mudar a versão dos dados, tudo é descartado.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: int) -> None:
+        if self._version != version:
+            self._items.clear()
+            self._size = 0
+            self._version = version
+
+    def get(self, version: int, key: str) -> Optional[bytes]:
+        with self._lock:
+            self._check_version(version)
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                self._drop(key)
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, version: int, key: str, value: bytes, ttl: int) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (time.time() + ttl, value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._items)))
+
+    def _drop(self, key: str) -> None:
+        _, value = self._items.pop(key)
+        self._size -= len(value)
+
+
+class SQLiteCache:
+    """
+    Camada compartilhada entre os workers: um arquivo SQLite (modo WAL) no
+    disco local. Entradas de outras versões são apagadas quando a versão
+    muda; acima de `max_bytes`, saem as menos acessadas recentemente.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._version: Optional[int] = None
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    versao INTEGER NOT NULL,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_acessado_em ON cache (acessado_em)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Uma conexão por thread (sqlite3 não compartilha conexões entre threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, version: int, key: str) -> Optional[bytes]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT valor, expira_em FROM cache WHERE key = ? AND versao = ?",
+            (key, version)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        if expires_at < now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET acessado_em = ? WHERE key = ?", (now, key))
+        return bytes(value)
+
+    def set(self, version: int, key: str, value: bytes, ttl: int) -> None:
+        if len(value) > self.max_bytes:
+            return
+        conn = self._conn()
+        now = time.time()
+        if self._version != version:
+            conn.execute("DELETE FROM cache WHERE versao <> ?", (version,))
+            self._version = version
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, versao, valor, tamanho, expira_em, acessado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, version, value, len(value), now + ttl, now)
+        )
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+        if total > self.max_bytes:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove expiradas e, depois, as menos acessadas até 90% do limite."""
+        conn.execute("DELETE FROM cache WHERE expira_em < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM cache").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        doomed: List[str] = []
+        for key, size in conn.execute("SELECT key, tamanho FROM cache ORDER BY acessado_em"):
+            if total <= target:
+                break
+            doomed.append(key)
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in doomed])
+
+
+class RedisCache:
+    """
+    Camada compartilhada em Redis. O TTL vai no próprio SET; a evicção por
+    tamanho fica a cargo do `maxmemory`/`maxmemory-policy` do servidor, e a
+    versão faz parte da chave (entradas antigas expiram sozinhas).
+    """
+
+    def __init__(self, url: str, prefix: str = "tgdm"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, version: int, key: str) -> str:
+        return f"{self.prefix}:v{version}:{key}"
+
+    def get(self, version: int, key: str) -> Optional[bytes]:
+        return self._client.get(self._key(version, key))
+
+    def set(self, version: int, key: str, value: bytes, ttl: int) -> None:
+        self._client.set(self._key(version, key), value, ex=ttl)
+
+
+class TieredCache:
+    """
+    Consulta as camadas em ordem (memória do processo, depois a
+    compartilhada) e preenche as camadas anteriores num acerto tardio.
+    Falhas de uma camada são registradas e tratadas como ausência.
+    """
+
+    def __init__(self, tiers: List, ttl: int, max_entry_bytes: int):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+
+    def get(self, version: int, key: str) -> Optional[bytes]:
+        for i, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(version, key)
+            except Exception as e:
+                logger.warning("Falha ao ler cache %s: %s", type(tier).__name__, e)
+                continue
+            if value is not None:
+                self._set_tiers(self.tiers[:i], version, key, value, self.ttl)
+                return value
+        return None
+
+    def set(self, version: int, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        if len(value) > self.max_entry_bytes:
+            return
+        self._set_tiers(self.tiers, version, key, value, ttl or self.ttl)
+
+    def _set_tiers(self, tiers: List, version: int, key: str, value: bytes, ttl: int) -> None:
+        for tier in tiers:
+            try:
+                tier.set(version, key, value, ttl)
+            except Exception as e:
+                logger.warning("Falha ao gravar cache %s: %s", type(tier).__name__, e)
+
+    def get_or_compute(self, version: int, key: str, compute: Callable[[], bytes]) -> bytes:
+        value = self.get(version, key)
+        if value is None:
+            value = compute()
+            self.set(version, key, value)
+        return value
+
+
+def build_cache() -> TieredCache:
+    """Monta as camadas conforme settings.CACHE_* (Redis só se o pacote existir)."""
+    tiers = []
+    if settings.CACHE_MEMORY_MAX_BYTES > 0:
+        tiers.append(MemoryCache(settings.CACHE_MEMORY_MAX_BYTES))
+    backend = settings.CACHE_SHARED_BACKEND
+    if backend == "redis" and settings.CACHE_REDIS_URL:
+        try:
+            tiers.append(RedisCache(settings.CACHE_REDIS_URL))
+        except ImportError:
+            logger.warning("Pacote 'redis' não instalado; usando cache compartilhado em SQLite")
+            backend = "sqlite"
+    if backend == "sqlite":
+        tiers.append(SQLiteCache(settings.CACHE_SQLITE_PATH, settings.CACHE_SQLITE_MAX_BYTES))
+    return TieredCache(tiers, settings.CACHE_TTL_SECONDS, settings.CACHE_MAX_ENTRY_BYTES)
+
+
+def _spool():
+    return tempfile.SpooledTemporaryFile(max_size=TEE_SPOOL_BYTES, prefix="tee-")
+
+
+def tee_to_cache(
+    chunks: Iterable[bytes],
+    cache: TieredCache,
+    version: int,
+    key: str,
+) -> Iterator[bytes]:
+    """
+    Repassa os pedaços de uma resposta em streaming e, se ela couber em
+    CACHE_MAX_ENTRY_BYTES e for lida até o fim, grava o corpo completo.
+    A cópia vai para um arquivo temporário (em memória só até TEE_SPOOL_BYTES),
+    para que respostas grandes em andamento não voltem a crescer em memória.
+    """
+    size = 0
+    with _spool() as spool:
+        for chunk in chunks:
+            if size <= cache.max_entry_bytes:
+                size += len(chunk)
+                if size <= cache.max_entry_bytes:
+                    spool.write(chunk)
+            yield chunk
+        if size <= cache.max_entry_bytes:
+            spool.seek(0)
+            cache.set(version, key, spool.read())
+
+
+async def atee_to_cache(chunks, cache: TieredCache, version: int, key: str):
+    """Equivalente assíncrono de `tee_to_cache` (a leitura e a gravação rodam numa thread)."""
+    size = 0
+    with _spool() as spool:
+        async for chunk in chunks:
+            if size <= cache.max_entry_bytes:
+                size += len(chunk)
+                if size <= cache.max_entry_bytes:
+                    spool.write(chunk)
+            yield chunk
+        if size <= cache.max_entry_bytes:
+            def _store():
+                spool.seek(0)
+                cache.set(version, key, spool.read())
+            await asyncio.to_thread(_store)
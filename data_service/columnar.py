@@ -0,0 +1,226 @@
+# data_service/columnar.py
+
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+
+from .flatgeobuf import iter_flatgeobuf
+from .streaming import peek
+
+# Formatos colunares e tipos de mídia
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+FLATGEOBUF_MEDIA_TYPE = "application/flatgeobuf"
+
+COLUMNAR_MEDIA_TYPES = {
+    "arrow": ARROW_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE,
+    "flatgeobuf": FLATGEOBUF_MEDIA_TYPE,
+}
+COLUMNAR_EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "flatgeobuf": "fgb"}
+
+# Tipos aceitos no cabeçalho Accept (inclui sinônimos usados por clientes)
+ACCEPT_FORMATS = {
+    ARROW_MEDIA_TYPE: "arrow",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+    FLATGEOBUF_MEDIA_TYPE: "flatgeobuf",
+}
+
+Batch = Sequence[Sequence[Any]]
+
+
+def negotiate_format(accept: Optional[str], allowed: Sequence[str]) -> Optional[str]:
+    """Formato colunar pedido via `Accept` (o primeiro tipo reconhecido), se houver."""
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        fmt = ACCEPT_FORMATS.get(media_type)
+        if fmt in allowed:
+            return fmt
+    return None
+
+
+# ==================== Tipos das colunas ====================
+
+def _kind_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, (float, Decimal)):
+        return "float"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes"
+    return "str"
+
+
+def infer_kinds(columns: Sequence[str], first_batch: Batch, geometry_column: Optional[str] = None) -> List[str]:
+    """
+    Tipo de cada coluna pelo primeiro valor não nulo do primeiro lote
+    (colunas inteiramente nulas viram texto). A geometria é sempre WKB.
+    """
+    kinds = []
+    for i, col in enumerate(columns):
+        if col == geometry_column:
+            kinds.append("bytes")
+            continue
+        sample = next((row[i] for row in first_batch if row[i] is not None), None)
+        kinds.append("str" if sample is None else _kind_of(sample))
+    return kinds
+
+
+def _convert(kind: str, values: Iterable[Any]) -> List[Any]:
+    if kind == "float":
+        return [None if v is None else float(v) for v in values]
+    if kind == "int":
+        return [None if v is None else int(v) for v in values]
+    if kind == "bytes":
+        return [None if v is None else bytes(v) for v in values]
+    if kind == "str":
+        return [None if v is None else (v if isinstance(v, str) else str(v)) for v in values]
+    return list(values)
+
+
+# ==================== Arrow / Parquet ====================
+
+class _BufferSink:
+    """Destino em memória que é esvaziado a cada lote (saída em streaming)."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(columns: Sequence[str], kinds: Sequence[str], geometry_column: Optional[str], geoparquet: bool):
+    import pyarrow as pa
+
+    types = {
+        "bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "str": pa.string(),
+        "datetime": pa.timestamp("us"), "date": pa.date32(), "bytes": pa.binary(),
+    }
+    fields = []
+    for col, kind in zip(columns, kinds):
+        metadata = None
+        if col == geometry_column:
+            # Extensão GeoArrow: leitores compatíveis reconhecem o WKB como geometria
+            metadata = {"ARROW:extension:name": "geoarrow.wkb", "ARROW:extension:metadata": "{}"}
+        fields.append(pa.field(col, types[kind], metadata=metadata))
+    metadata = None
+    if geometry_column and geoparquet:
+        # Metadados GeoParquet 1.1: sem 'crs' vale OGC:CRS84 (lon/lat, EPSG:4326)
+        metadata = {b"geo": json.dumps({
+            "version": "1.1.0",
+            "primary_column": geometry_column,
+            "columns": {geometry_column: {"encoding": "WKB", "geometry_types": []}},
+        }).encode("utf-8")}
+    return pa.schema(fields, metadata=metadata)
+
+
+def _record_batch(schema, kinds: Sequence[str], batch: Batch):
+    import pyarrow as pa
+
+    columns = list(zip(*batch)) if batch else [()] * len(kinds)
+    arrays = [
+        pa.array(_convert(kind, values), type=field.type)
+        for kind, values, field in zip(kinds, columns, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _iter_arrow_like(
+    columns: Sequence[str],
+    batches: Iterable[Batch],
+    geometry_column: Optional[str],
+    parquet: bool,
+) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    first, batches = peek(batches)
+    kinds = infer_kinds(columns, first or [], geometry_column)
+    schema = _arrow_schema(columns, kinds, geometry_column, geoparquet=parquet)
+    sink = _BufferSink()
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for batch in batches:
+            # Cada lote do cursor vira um record batch (Parquet: um row group)
+            writer.write_batch(_record_batch(schema, kinds, batch))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow_ipc(
+    columns: Sequence[str],
+    batches: Iterable[Batch],
+    geometry_column: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Arrow IPC (formato stream) a partir dos lotes de linhas do cursor."""
+    return _iter_arrow_like(columns, batches, geometry_column, parquet=False)
+
+
+def iter_parquet(
+    columns: Sequence[str],
+    batches: Iterable[Batch],
+    geometry_column: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Parquet (GeoParquet se houver `geometry_column` com WKB), um row group por lote."""
+    return _iter_arrow_like(columns, batches, geometry_column, parquet=True)
+
+
+def iter_columnar(
+    fmt: str,
+    name: str,
+    columns: Sequence[str],
+    batches: Iterable[Batch],
+    geometry_column: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Despacha para o serializador do formato (`arrow`, `parquet` ou `flatgeobuf`)."""
+    if fmt == "arrow":
+        return iter_arrow_ipc(columns, batches, geometry_column)
+    if fmt == "parquet":
+        return iter_parquet(columns, batches, geometry_column)
+    first, batches = peek(batches)
+    kinds = infer_kinds(columns, first or [], geometry_column)
+    rows = (row for batch in batches for row in batch)
+    return iter_flatgeobuf(name, columns, kinds, rows, list(columns).index(geometry_column))
+
+
+def columnar_headers(fmt: str, name: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{name}.{COLUMNAR_EXTENSIONS[fmt]}"'}
+
+
+def columnar_media_type(fmt: str) -> str:
+    return COLUMNAR_MEDIA_TYPES[fmt]
+
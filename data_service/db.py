@@ -1,12 +1,97 @@
 # data_service/db.py
 
-from sqlalchemy import create_engine, event
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config import settings, DatabaseType
+from .version import for_data_version, get_data_version
+
+
+class PoolWaitStats:
+    """Tempo de espera no checkout do pool (por processo), em histograma cumulativo."""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(self.BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            for i, limit in enumerate(self.BUCKETS):
+                if seconds <= limit:
+                    self.buckets[i] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.count,
+                "espera_total_s": round(self.total, 6),
+                "espera_media_s": round(self.total / self.count, 6) if self.count else 0.0,
+                "espera_max_s": round(self.max, 6),
+                "histograma": {f"le_{b}": n for b, n in zip(self.BUCKETS, self.buckets)},
+            }
+
+
+POOL_WAIT = {"sync": PoolWaitStats(), "async": PoolWaitStats()}
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool que registra quanto cada checkout esperou por uma conexão."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT["sync"].observe(time.perf_counter() - start)
+
+
+class _TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT["async"].observe(time.perf_counter() - start)
+
+
+def _pool_options() -> Dict[str, Any]:
+    """Parâmetros do pool e do cache de compilação vindos de settings.DB_*."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "query_cache_size": settings.DB_QUERY_CACHE_SIZE,
+    }
+
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Ocupação atual do pool de `engine` (síncrona ou assíncrona)."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    return {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "livres": pool.checkedin(),
+    }
+
 
 def get_sqlalchemy_engine():
     if settings.DATABASE_TYPE == DatabaseType.SQLITE:
         uri = f"sqlite:///{settings.SQLITE_PATH}"
-        engine = create_engine(uri, echo=False, future=True)
+        engine = create_engine(uri, echo=False, future=True, poolclass=_TimedQueuePool, **_pool_options())
 
         # 👇 Carrega a extensão SpatiaLite em cada conexão
         @event.listens_for(engine, "connect")
@@ -18,6 +103,60 @@ def get_sqlalchemy_engine():
 
         return engine
 
-    # Postgres segue normal
-    return create_engine(settings.postgres_dsn, echo=False, future=True)
+    # Postgres: psycopg2 não tem prepared statements server-side; o texto
+    # estável das consultas (veja statements.py) reaproveita o cache de compilação.
+    return create_engine(
+        settings.postgres_dsn, echo=False, future=True, poolclass=_TimedQueuePool, **_pool_options()
+    )
+
+def get_async_sqlalchemy_engine():
+    """
+    Engine assíncrona (asyncpg para Postgres, aiosqlite para SQLite).
+    Os drivers só são importados quando DATABASE_ASYNC está ativo.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        uri = f"sqlite+aiosqlite:///{settings.SQLITE_PATH}"
+        engine = create_async_engine(uri, echo=False, poolclass=_TimedAsyncQueuePool, **_pool_options())
+
+        # 👇 Carrega a extensão SpatiaLite em cada conexão (via conexão aiosqlite)
+        @event.listens_for(engine.sync_engine, "connect")
+        def load_spatialite(dbapi_connection, connection_record):
+            dbapi_connection.run_async(lambda conn: conn.enable_load_extension(True))
+            dbapi_connection.run_async(lambda conn: conn.load_extension("mod_spatialite"))
+
+        return engine
+
+    # asyncpg prepara cada consulta no servidor e guarda até
+    # DB_PREPARED_STATEMENT_CACHE_SIZE por conexão (0 desativa, ex.: atrás de PgBouncer)
+    cache_size = settings.DB_PREPARED_STATEMENT_CACHE_SIZE if settings.DB_PREPARED_STATEMENTS else 0
+    return create_async_engine(
+        settings.postgres_async_dsn, echo=False, poolclass=_TimedAsyncQueuePool,
+        connect_args={"prepared_statement_cache_size": cache_size},
+        **_pool_options()
+    )
+
+
+def table_srid(engine, table: str, column: str) -> int:
+    """
+    SRID declarado da coluna geométrica (4326 se não houver registro), relido
+    quando a versão dos dados muda. Sem registro, não fica em cache.
+    """
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        sql = (
+            "SELECT srid FROM geometry_columns "
+            "WHERE lower(f_table_name) = lower(:t) AND lower(f_geometry_column) = lower(:c)"
+        )
+    else:
+        sql = "SELECT Find_SRID(current_schema()::text, :t, :c)"
+
+    def _load():
+        try:
+            with engine.connect() as conn:
+                return conn.execute(text(sql), {"t": table, "c": column}).scalar() or None
+        except Exception:
+            return None
 
+    version = get_data_version(engine)[0]
+    return for_data_version(f"srid:{table}.{column}", version, _load) or 4326
@@ -0,0 +1,242 @@
+# data_service/flatgeobuf.py
+#
+# Escrita de FlatGeobuf (https://flatgeobuf.org) em streaming, sem índice
+# espacial: cabeçalho + uma feature por vez. Os buffers FlatBuffers são
+# montados à mão para não depender de GDAL no servidor.
+
+import struct
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import shapely
+
+MAGIC = b"fgb\x03fgb\x00"
+
+# Enums do schema FlatGeobuf
+GEOMETRY_TYPES = {
+    "Unknown": 0, "Point": 1, "LineString": 2, "Polygon": 3, "MultiPoint": 4,
+    "MultiLineString": 5, "MultiPolygon": 6, "GeometryCollection": 7,
+}
+COLUMN_TYPES = {"bool": 2, "int": 7, "float": 10, "str": 11, "datetime": 13, "date": 13, "bytes": 14}
+
+
+# ==================== FlatBuffers mínimo ====================
+# Os objetos são gravados "para frente": a tabela vem antes dos filhos,
+# que são apontados por uoffsets positivos; a vtable fica logo antes da tabela.
+
+def _align(buf: bytearray, alignment: int, extra: int = 0) -> None:
+    """Completa com zeros até (len(buf) + extra) ser múltiplo de `alignment`."""
+    buf.extend(b"\0" * ((-(len(buf) + extra)) % alignment))
+
+
+class _Table:
+    """Tabela FlatBuffers: campos escalares (fmt struct) ou filhos (objetos)."""
+
+    def __init__(self):
+        self.fields: List[Tuple[int, str, Any]] = []
+
+    def scalar(self, field_id: int, fmt: str, value) -> "_Table":
+        self.fields.append((field_id, fmt, value))
+        return self
+
+    def child(self, field_id: int, obj) -> "_Table":
+        if obj is not None:
+            self.fields.append((field_id, "child", obj))
+        return self
+
+    def write(self, buf: bytearray) -> int:
+        n_fields = max((f[0] for f in self.fields), default=-1) + 1
+        # Layout da tabela: soffset (4 bytes) e campos do maior para o menor
+        layout, cursor = [], 4
+        for field_id, fmt, value in sorted(self.fields, key=lambda f: -_size(f[1])):
+            size = _size(fmt)
+            cursor += (-cursor) % size
+            layout.append((field_id, fmt, value, cursor))
+            cursor += size
+        table_size = cursor + (-cursor) % 4
+
+        vtable_size = 4 + 2 * n_fields
+        # A tabela começa alinhada a 8 logo após a vtable
+        _align(buf, 8, vtable_size)
+        vtable_pos = len(buf)
+        offsets = [0] * n_fields
+        for field_id, _, _, pos in layout:
+            offsets[field_id] = pos
+        buf.extend(struct.pack(f"<HH{n_fields}H", vtable_size, table_size, *offsets))
+        table_pos = len(buf)
+        buf.extend(b"\0" * table_size)
+        struct.pack_into("<i", buf, table_pos, table_pos - vtable_pos)
+
+        children = []
+        for field_id, fmt, value, pos in layout:
+            if fmt == "child":
+                children.append((table_pos + pos, value))
+            else:
+                struct.pack_into("<" + fmt, buf, table_pos + pos, value)
+        for field_pos, obj in children:
+            _patch(buf, field_pos, _write_obj(buf, obj))
+        return table_pos
+
+
+class _Vector:
+    """Vetor de escalares (fmt struct) ou de tabelas (fmt None)."""
+
+    def __init__(self, items: Sequence, fmt: Optional[str] = None):
+        self.items = items
+        self.fmt = fmt
+
+    def write(self, buf: bytearray) -> int:
+        if self.fmt is None:
+            _align(buf, 4)
+            pos = len(buf)
+            buf.extend(struct.pack("<I", len(self.items)))
+            slots = len(buf)
+            buf.extend(b"\0" * (4 * len(self.items)))
+            for i, item in enumerate(self.items):
+                _patch(buf, slots + 4 * i, item.write(buf))
+            return pos
+        size = _size(self.fmt)
+        # O primeiro elemento (após o tamanho) fica alinhado ao seu tamanho
+        _align(buf, max(size, 4), 4)
+        pos = len(buf)
+        if self.fmt == "B":
+            buf.extend(struct.pack("<I", len(self.items)) + bytes(self.items))
+        else:
+            buf.extend(struct.pack(f"<I{len(self.items)}{self.fmt}", len(self.items), *self.items))
+        return pos
+
+
+def _size(fmt: str) -> int:
+    return 4 if fmt == "child" else struct.calcsize("<" + fmt)
+
+
+def _patch(buf: bytearray, field_pos: int, target: int) -> None:
+    struct.pack_into("<I", buf, field_pos, target - field_pos)
+
+
+def _write_obj(buf: bytearray, obj) -> int:
+    if isinstance(obj, str):
+        obj = obj.encode("utf-8")
+    if isinstance(obj, (bytes, bytearray)):
+        _align(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack("<I", len(obj)) + bytes(obj) + b"\0")
+        return pos
+    return obj.write(buf)
+
+
+def _finish(root: _Table) -> bytes:
+    """Buffer com prefixo de tamanho (size-prefixed), como exige o FlatGeobuf."""
+    buf = bytearray(b"\0\0\0\0")
+    _patch(buf, 0, root.write(buf))
+    _align(buf, 4)
+    return struct.pack("<I", len(buf)) + bytes(buf)
+
+
+# ==================== Geometria ====================
+
+def _coords(geom) -> List[float]:
+    return [c for xy in shapely.get_coordinates(geom) for c in xy]
+
+
+def _geometry_table(geom) -> _Table:
+    kind = geom.geom_type
+    t = _Table()
+    if kind in ("Polygon", "MultiLineString"):
+        rings = [geom.exterior, *geom.interiors] if kind == "Polygon" else list(geom.geoms)
+        xy: List[float] = []
+        ends: List[int] = []
+        for ring in rings:
+            xy.extend(_coords(ring))
+            ends.append(len(xy) // 2)
+        if len(ends) > 1:
+            t.child(0, _Vector(ends, "I"))
+        t.child(1, _Vector(xy, "d"))
+    elif kind in ("MultiPolygon", "GeometryCollection"):
+        t.child(7, _Vector([_geometry_table(g) for g in geom.geoms]))
+    else:
+        # Point, LineString, MultiPoint: só a lista de coordenadas
+        t.child(1, _Vector(_coords(geom), "d"))
+    return t.scalar(6, "B", GEOMETRY_TYPES.get(kind, 0))
+
+
+# ==================== Propriedades ====================
+
+def _encode_value(kind: str, value) -> bytes:
+    if kind == "bool":
+        return struct.pack("<?", bool(value))
+    if kind == "int":
+        return struct.pack("<q", int(value))
+    if kind == "float":
+        return struct.pack("<d", float(value))
+    if kind == "bytes":
+        data = bytes(value)
+    elif kind in ("datetime", "date"):
+        data = value.isoformat().encode("utf-8")
+    else:
+        data = str(value).encode("utf-8")
+    return struct.pack("<I", len(data)) + data
+
+
+def _properties(kinds: Sequence[str], values: Sequence[Any]) -> bytes:
+    out = bytearray()
+    for i, (kind, value) in enumerate(zip(kinds, values)):
+        if value is None or (kind == "float" and value != value):
+            continue
+        out += struct.pack("<H", i) + _encode_value(kind, value)
+    return bytes(out)
+
+
+# ==================== Escrita em streaming ====================
+
+def header_bytes(
+    name: str,
+    columns: Sequence[str],
+    kinds: Sequence[str],
+    geometry_type: str = "Unknown",
+    srid: int = 4326,
+) -> bytes:
+    """Assinatura + cabeçalho (sem índice espacial e com total de features desconhecido)."""
+    cols = [
+        _Table().child(0, col).scalar(1, "B", COLUMN_TYPES.get(kind, COLUMN_TYPES["str"]))
+        for col, kind in zip(columns, kinds)
+    ]
+    header = (
+        _Table()
+        .child(0, name)
+        .scalar(2, "B", GEOMETRY_TYPES.get(geometry_type, 0))
+        .child(7, _Vector(cols) if cols else None)
+        .scalar(8, "Q", 0)
+        .scalar(9, "H", 0)
+        .child(10, _Table().child(0, "EPSG").scalar(1, "i", srid))
+    )
+    return MAGIC + _finish(header)
+
+
+def feature_bytes(wkb: Optional[bytes], kinds: Sequence[str], values: Sequence[Any]) -> bytes:
+    """Uma feature: geometria (a partir do WKB) + propriedades codificadas."""
+    feature = _Table()
+    geom = shapely.from_wkb(bytes(wkb)) if wkb else None
+    if geom is not None and not geom.is_empty:
+        feature.child(0, _geometry_table(geom))
+    props = _properties(kinds, values)
+    if props:
+        feature.child(1, _Vector(props, "B"))
+    return _finish(feature)
+
+
+def iter_flatgeobuf(
+    name: str,
+    columns: Sequence[str],
+    kinds: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    geometry_index: int,
+) -> Iterator[bytes]:
+    """
+    Escreve o FlatGeobuf a partir de linhas (tuplas) cuja coluna
+    `geometry_index` traz o WKB; as demais viram propriedades.
+    """
+    prop_idx = [i for i in range(len(columns)) if i != geometry_index]
+    yield header_bytes(name, [columns[i] for i in prop_idx], [kinds[i] for i in prop_idx])
+    prop_kinds = [kinds[i] for i in prop_idx]
+    for row in rows:
+        yield feature_bytes(row[geometry_index], prop_kinds, [row[i] for i in prop_idx])
@@ -0,0 +1,24 @@
+# data_service/geometry.py
+
+import shapely
+
+
+def clean_geometry_sql(source_expr: str, polygonal: bool = False) -> str:
+    """
+    Expressão PostGIS que transforma `source_expr` (geometria ou
+    ST_GeomFromText(...)) na forma gravada nas colunas `geom` dos
+    importadores: 2D (sem Z/M) e válida. Com `polygonal`, extrai só os
+    polígonos e devolve MULTIPOLYGON, o tipo declarado da coluna.
+    Calculada uma vez na carga, tira o parse de WKT das requisições.
+    """
+    expr = f"ST_MakeValid(ST_Force2D({source_expr}))"
+    if polygonal:
+        expr = f"ST_Multi(ST_CollectionExtract({expr}, 3))"
+    return expr
+
+
+def clean_geometry(geom):
+    """Equivalente em shapely de `clean_geometry_sql` (importadores via GeoPandas)."""
+    if geom is None or geom.is_empty:
+        return None
+    return shapely.make_valid(shapely.force_2d(geom))
@@ -0,0 +1,66 @@
+# data_service/http_cache.py
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from config import settings
+
+
+def build_etag(version: int, resource: str, encoding: Optional[str] = None) -> str:
+    """
+    ETag forte da representação: versão dos dados + hash da URL (caminho e
+    query) + codificação de conteúdo negociada, já que gzip/br são
+    representações diferentes do mesmo recurso.
+    """
+    digest = hashlib.sha1(f"{resource}|{encoding or 'identity'}".encode("utf-8")).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    # TIMESTAMP sem fuso gravado pelo banco é tratado como UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    """Cabeçalhos de validação e de cache de uma resposta de dados."""
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime,
+) -> bool:
+    """
+    Avalia as pré-condições de uma requisição condicional (RFC 9110 §13.2.2):
+    If-None-Match tem precedência; If-Modified-Since só vale sem ele.
+    """
+    if if_none_match is not None:
+        candidates = [c.strip() for c in if_none_match.split(",")]
+        if "*" in candidates:
+            return True
+        # Comparação fraca, como exige a RFC para If-None-Match
+        return any(c.removeprefix("W/") == etag for c in candidates)
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
@@ -0,0 +1,50 @@
+# data_service/json_response.py
+
+import datetime
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Chaves não-string (ex.: inteiros) viram texto, como no json.dumps
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que o orjson não serializa sozinho, convertidos como no jsonable_encoder."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode("utf-8")
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "_mapping"):
+        # Row do SQLAlchemy
+        return dict(obj._mapping)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def dumps_json(obj: Any) -> bytes:
+    """
+    JSON compacto em UTF-8 via orjson, sem passar pelo jsonable_encoder.
+    NaN e ±Infinity viram null (o json.dumps com allow_nan=False falharia).
+    """
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+def loads_json(data) -> Any:
+    return orjson.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Resposta JSON padrão da aplicação. Rotas que devolvem dict/list ainda
+    passam pelo jsonable_encoder do FastAPI; para evitá-lo em respostas
+    grandes, devolva `FastJSONResponse(conteudo)` diretamente.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
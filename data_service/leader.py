@@ -0,0 +1,58 @@
+# data_service/leader.py
+
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import settings, DatabaseType
+
+logger = logging.getLogger("uvicorn")
+
+
+def _advisory_key(name: str) -> int:
+    """Chave (bigint com sinal) do advisory lock do Postgres para `name`."""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@contextmanager
+def exclusive_lock(name: str, engine: Engine, lock_dir: str) -> Iterator[bool]:
+    """
+    Eleição de líder para tarefas que devem rodar uma vez por implantação
+    (ex.: o pré-processamento agendado em cada worker do gunicorn). Entrega
+    True a quem obteve o lock e False aos demais, sem esperar.
+    No Postgres usa `pg_try_advisory_lock` numa conexão mantida durante o
+    bloco (vale entre contêineres); no SQLite, `flock` num arquivo em `lock_dir`.
+    """
+    if settings.DATABASE_TYPE == DatabaseType.POSTGRES:
+        key = _advisory_key(name)
+        with engine.connect() as conn:
+            acquired = bool(conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar())
+            # O lock é da sessão: encerra a transação para não ficar "idle in transaction"
+            conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                    conn.commit()
+        return
+
+    import fcntl
+
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f".{name}.lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,98 @@
+# data_service/lookup.py
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from config import settings
+
+from .names import key_column, name_key, run_sql, run_sql_many
+
+
+def _create_table_sql() -> List[str]:
+    table = settings.TABLE_LOCALIDADES
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            camada VARCHAR(100) NOT NULL,
+            regiao_administrativa VARCHAR(255),
+            regiao_administrativa_norm VARCHAR(255),
+            nome_municipio VARCHAR(255) NOT NULL,
+            nome_municipio_norm VARCHAR(255) NOT NULL,
+            total BIGINT NOT NULL
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_camada_regiao "
+        f"ON {table} (camada, regiao_administrativa_norm)",
+    ]
+
+
+def refresh_lookup(
+    conn,
+    camada: str,
+    municipio_column: str = "nome_municipio",
+    regiao_column: Optional[str] = None,
+) -> int:
+    """
+    Recalcula as linhas de `camada` (o nome da tabela de fatos, como em
+    `versao_dados`) na tabela de localidades: uma linha por região/município
+    com a contagem de registros. Deve ser chamada pelos importadores na mesma
+    transação de `bump_data_version`, para que as listagens da API (que leem
+    esta tabela no lugar de um DISTINCT sobre a tabela de fatos) mudem junto
+    com a versão. Aceita uma Connection do SQLAlchemy ou uma sqlite3.Connection.
+    Retorna o número de linhas gravadas.
+    """
+    for sql in _create_table_sql():
+        run_sql(conn, sql)
+    regiao = f'"{regiao_column}"' if regiao_column else "NULL"
+    rows = run_sql(conn, f"""
+        SELECT {regiao} AS regiao, "{municipio_column}" AS municipio, COUNT(*) AS total
+        FROM {camada}
+        WHERE "{municipio_column}" IS NOT NULL
+        GROUP BY {regiao}, "{municipio_column}"
+    """).fetchall()
+    run_sql(conn, f"DELETE FROM {settings.TABLE_LOCALIDADES} WHERE camada = :camada", {"camada": camada})
+    run_sql_many(conn, f"""
+        INSERT INTO {settings.TABLE_LOCALIDADES} (
+            camada, regiao_administrativa, {key_column("regiao_administrativa")},
+            nome_municipio, {key_column("nome_municipio")}, total
+        ) VALUES (:camada, :regiao, :regiao_norm, :municipio, :municipio_norm, :total)
+    """, [
+        {
+            "camada": camada, "regiao": reg, "regiao_norm": name_key(reg),
+            "municipio": muni, "municipio_norm": name_key(muni), "total": int(total),
+        }
+        for reg, muni, total in rows
+    ])
+    return len(rows)
+
+
+def group_localidades(rows: Iterable[Mapping[str, Any]], camadas: Mapping[str, str]) -> List[Dict[str, Any]]:
+    """
+    Agrupa as linhas da tabela de localidades em região → município → camada.
+    Os municípios das camadas sem região (assentamentos, reservatórios) são
+    ligados à região da malha fundiária pela chave canônica do nome;
+    `camadas` mapeia o nome da tabela para o rótulo exposto na API.
+    """
+    primary = next(iter(camadas), None)
+    municipios: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for row in rows:
+        label = camadas.get(row["camada"])
+        if label is None:
+            continue
+        entry = municipios.setdefault(
+            row["nome_municipio_norm"],
+            {"regiao": None, "municipio": row["nome_municipio"], "camadas": {}},
+        )
+        if row["camada"] == primary:
+            # Nome e região da camada principal (malha) têm precedência
+            entry["municipio"] = row["nome_municipio"]
+            entry["regiao"] = entry["regiao"] or row["regiao_administrativa"]
+        entry["camadas"][label] = entry["camadas"].get(label, 0) + int(row["total"])
+
+    regioes: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for entry in municipios.values():
+        regioes.setdefault(entry.pop("regiao"), []).append(entry)
+    return [
+        {"regiao": regiao, "municipios": sorted(items, key=lambda m: m["municipio"])}
+        for regiao, items in sorted(regioes.items(), key=lambda kv: (kv[0] is None, kv[0] or ""))
+    ]
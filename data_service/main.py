@@ -1,23 +1,56 @@
 # data_service/main.py
 
 import os
-import json
+import time
+import shutil
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Callable, Hashable, List, Dict, Any, Optional, Tuple
 from multiprocessing import Pool, cpu_count
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from brotli_asgi import BrotliMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 from pythonjsonlogger import jsonlogger
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+import shapely
 
 from config import settings, DatabaseType
-from .db import get_sqlalchemy_engine
-from .utils import row_to_feature
+from .precompressed import negotiate_encoding, precompressed_response, write_precompressed
+from .http_cache import build_etag, cache_headers, is_not_modified
+from .cache import TieredCache, atee_to_cache, build_cache, tee_to_cache
+from .pagination import (
+    decode_cursor, encode_cursor, keyset_columns_sql, keyset_order_sql, keyset_sql, page_link,
+)
+from .db import POOL_WAIT, get_async_sqlalchemy_engine, get_sqlalchemy_engine, pool_status, table_srid
+from .tiles import MVT_MEDIA_TYPE, TileCache, arender_tile, render_tile
+from .simplification import simplified_geometry_expr, snap_tolerance, table_columns
+from .spatial_filter import parse_bbox, parse_geometry, point_filter_sql, spatial_filter_sql
+from .version import for_data_version, get_data_version, read_layer_versions
+from .manifest import PreprocessManifest, row_fingerprints
+from .snapshots import current_snapshot, gc_snapshots, link_files, new_snapshot, publish
+from .artifacts import ArtifactCache, artifact_name
+from .leader import exclusive_lock
+from .topojson import build_topology
+from .boundaries import BoundaryIndex
+from .nearest import NEAREST_COLUMNS, ReservoirIndex, nearest_params, nearest_sql
+from .streaming import (
+    GEOJSON_MEDIA_TYPE, GEOJSON_SEQ_MEDIA_TYPE,
+    aiter_feature_collection, aiter_geojson_seq, apeek, astream_rows,
+    iter_feature_collection, iter_geojson_seq, peek, stream_row_batches, stream_rows,
+)
+from .statements import STATEMENTS, as_statement
+from .names import file_key, key_column, name_key
+from .lookup import group_localidades
+from .rollups import DIMENSIONS, faixa_labels
+from .json_response import FastJSONResponse, dumps_json, loads_json
+from .columnar import columnar_headers, columnar_media_type, iter_columnar, negotiate_format
 from functools import lru_cache
 
 from typing import Optional
@@ -46,32 +79,100 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Falha ao conectar ao banco de dados: {e}")
         raise
 
+    # Metadados (colunas e SRIDs) são lidos pela engine síncrona e cacheados
+    # por versão dos dados; as rotas os consultam via run_in_threadpool, e
+    # lê-los aqui poupa essa ida ao banco na primeira requisição.
+    await run_in_threadpool(_warm_metadata)
+    try:
+        # Contornos dos municípios em memória para o /lookup
+        index = get_boundary_index()
+        logger.info("✅ %d contornos de municípios indexados", len(index) if index else 0)
+    except Exception as e:
+        logger.warning("Índice de contornos indisponível: %s", e)
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        try:
+            # Sem KNN no SpatiaLite: /reservatorios/proximos busca em memória
+            index = get_reservoir_index()
+            logger.info("✅ %d reservatórios indexados", len(index) if index else 0)
+        except Exception as e:
+            logger.warning("Índice de reservatórios indisponível: %s", e)
+    if settings.DATABASE_ASYNC:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        logger.info("✅ Engine assíncrona pronta")
+
+    # Todos os workers agendam, mas só quem obtiver o lock executa (veja
+    # run_preprocess); com PREPROCESS_SCHEDULE_IN_API=false o agendamento fica
+    # só no runner dedicado (python -m data_service.preprocess --agendar).
     scheduler = BackgroundScheduler()
-    scheduler.add_job(preprocess_geojson, 'cron',
-                      hour=settings.PREPROCESS_START_HOUR,
-                      minute=settings.PREPROCESS_START_MINUTE)
+    if settings.PREPROCESS_SCHEDULE_IN_API:
+        schedule_preprocess(scheduler)
     scheduler.start()
 
     yield
 
     logger.info("Encerrando aplicação...")
     scheduler.shutdown()
+    if settings.DATABASE_ASYNC:
+        await get_async_engine().dispose()
     get_engine().dispose()
 
 # ==================== App FastAPI ====================
 app = FastAPI(
     title="terraGeoDataMiniServer",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_methods=["GET"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
 app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
 app.add_middleware(BrotliMiddleware, quality=5)
 
+# Rotas que não dependem da versão dos dados (sem ETag/Last-Modified)
+UNVERSIONED_PATHS = {"/health", "/metricas", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"}
+# Rotas cujo formato pode vir do cabeçalho Accept (a representação varia com ele)
+ACCEPT_NEGOTIATED_PATHS = {"/geojson", "/dados_fundiarios"}
+
+@app.middleware("http")
+async def conditional_requests(request: Request, call_next):
+    """
+    ETag/Last-Modified/Cache-Control derivados da versão dos dados (tabela
+    `versao_dados`, incrementada pelos importadores). If-None-Match e
+    If-Modified-Since são respondidos com 304 antes de chegar à rota.
+    """
+    if request.method not in ("GET", "HEAD") or request.url.path in UNVERSIONED_PATHS:
+        return await call_next(request)
+    version, last_modified = await run_in_threadpool(get_data_version, get_engine())
+    if last_modified is None:
+        return await call_next(request)
+
+    resource = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+    negotiated = request.url.path in ACCEPT_NEGOTIATED_PATHS
+    if negotiated and "format" not in request.query_params:
+        resource += "#" + (negotiate_format(request.headers.get("accept"), COLUMNAR_FORMATS) or "")
+    etag = build_etag(version, resource, negotiate_encoding(request.headers.get("accept-encoding")))
+    headers = cache_headers(etag, last_modified)
+    if negotiated:
+        headers["Vary"] = "Accept, Accept-Encoding"
+    if is_not_modified(
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since"),
+        etag, last_modified,
+    ):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        vary = [v.strip() for v in response.headers.get("vary", "").split(",") if v.strip()]
+        missing = [v for v in headers["Vary"].split(", ") if v.lower() not in {x.lower() for x in vary}]
+        headers["Vary"] = ", ".join(vary + missing)
+        response.headers.update(headers)
+    return response
+
 # ==================== Constantes ====================
 COMMON_PROPERTY_COLUMNS = [
     "numero_lote", "numero_incra", "situacao_juridica",
@@ -79,61 +180,568 @@ COMMON_PROPERTY_COLUMNS = [
     "regiao_administrativa", "categoria", "nome_municipio_original","imovel","data_criacao_lote"
     ]
 
+ASSENTAMENTOS_PROPERTY_COLUMNS = [
+    "cd_sipra", 
+    "nome_municipio", 
+    "nome_assentamento", 
+    "nome_municipio_original", 
+    "area", 
+    "perimetro", 
+    "tipo_assentamento", 
+    "forma_obtecao", 
+    "num_familias"
+]
+
+RESERVATORIOS_PROPERTY_COLUMNS = [
+    "id_sagreh", "nome", "proprietario", "gerencia", "reg_hidrog",
+    "nome_municipio", "nome_municipio_original","ini_monito", "ano_constr", "o_barrad",
+    "ac_jusante", "id_ac_jus", "area_ha", "capacid_m3",
+    "cot_vert_m", "lg_vert_m", "cot_td_m", "tipo_verte","ri"
+]
+
+# Camadas dos tiles vetoriais: tabela, coluna geométrica (com índice GiST),
+# zoom mínimo e propriedades incluídas a partir de cada zoom.
+TILE_LAYERS = {
+    "malha_fundiaria": {
+        "table": settings.TABLE_DADOS_FUNDIARIOS,
+        "geom_column": "geometry",
+        "min_zoom": 0,
+        "properties_by_zoom": [
+            (0, ["categoria"]),
+            (10, ["categoria", "situacao_juridica", "nome_municipio", "regiao_administrativa", "area"]),
+            (13, COMMON_PROPERTY_COLUMNS),
+        ],
+    },
+    "assentamentos": {
+        "table": settings.TABLE_DADOS_ASSENTAMENTOS,
+        "geom_column": "geom",
+        "min_zoom": 0,
+        "properties_by_zoom": [
+            (0, ["nome_assentamento"]),
+            (10, ASSENTAMENTOS_PROPERTY_COLUMNS),
+        ],
+    },
+    "reservatorios": {
+        "table": settings.TABLE_DADOS_RESERVATORIOS,
+        "geom_column": "geom",
+        "min_zoom": 0,
+        "properties_by_zoom": [
+            (0, ["nome"]),
+            (10, ["nome", "nome_municipio", "capacid_m3", "area_ha"]),
+            (13, RESERVATORIOS_PROPERTY_COLUMNS),
+        ],
+    },
+}
+
+# Camadas da tabela de localidades (settings.TABLE_LOCALIDADES) e rótulos em /localidades;
+# a primeira (malha) dá a região de cada município
+LOOKUP_LAYERS = {
+    settings.TABLE_DADOS_FUNDIARIOS: "malha_fundiaria",
+    settings.TABLE_DADOS_ASSENTAMENTOS: "assentamentos",
+    settings.TABLE_DADOS_RESERVATORIOS: "reservatorios",
+}
+
+# Filtros espaciais (em EPSG:4326) aceitos pelas rotas de geometria
+BBOX_QUERY = Query(None, description="Caixa 'minx,miny,maxx,maxy' em lon/lat (EPSG:4326).")
+INTERSECTS_QUERY = Query(None, description="Geometria WKT ou GeoJSON (EPSG:4326) que as feições devem intersectar.")
+
+# Membro 'crs' devolvido pelas camadas de assentamentos e reservatórios
+CRS_EPSG_4326 = {
+    "type": "name",
+    "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}
+}
+
+# Formatos de saída das rotas de geometria
+GEOJSON_FORMATS = ("geojson", "geojsonseq")
+FORMAT_QUERY = Query(
+    "geojson",
+    description="'geojson' (FeatureCollection) ou 'geojsonseq' (GeoJSON Text Sequences, RFC 8142)."
+)
+# Formatos colunares (geometria em WKB); também escolhidos pelo cabeçalho Accept
+COLUMNAR_FORMATS = ("arrow", "parquet", "flatgeobuf")
+# TopoJSON (arcos compartilhados, coordenadas quantizadas) das camadas de contorno
+MUNI_FORMAT_QUERY = Query(
+    "geojson",
+    description=(
+        "'geojson', 'geojsonseq' ou 'topojson' (fronteiras compartilhadas, "
+        "com o objeto 'regioes' fundido a partir dos municípios)."
+    )
+)
+QUANTIZATION_QUERY = Query(
+    None, ge=10, le=10**9,
+    description="Valores inteiros por eixo no TopoJSON (padrão TOPOJSON_QUANTIZATION)."
+)
+COLUMNAR_FORMAT_QUERY = Query(
+    "geojson",
+    description=(
+        "'geojson', 'geojsonseq', 'arrow' (Arrow IPC), 'parquet' (GeoParquet) "
+        "ou 'flatgeobuf'. Sem o parâmetro, vale o cabeçalho Accept."
+    )
+)
+
+# Paginação por keyset (rotas de dados e GeoJSON)
+LIMIT_QUERY = Query(
+    None, ge=1, le=settings.PAGE_MAX_LIMIT,
+    description="Itens por página; ativa a paginação (veja `next`/Link)."
+)
+CURSOR_QUERY = Query(None, description="Cursor opaco devolvido em `next` pela página anterior.")
+
 # ==================== Helpers de Engine e SQL ====================
 @lru_cache()
 def get_engine():
     return get_sqlalchemy_engine()
 
-def _ci_equals(column: str, param: str = "param") -> str:
-    """Cláusula case-insensitive para SQLite ou Postgres."""
-    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
-        return f"LOWER({column}) = LOWER(:{param})"
-    return f"{column} ILIKE :{param}"
+@lru_cache()
+def get_async_engine():
+    return get_async_sqlalchemy_engine()
+
+def _warm_metadata() -> None:
+    """Pré-carrega os caches de colunas e SRID das tabelas servidas."""
+    engine = get_engine()
+    for table in (
+        settings.TABLE_DADOS_FUNDIARIOS, settings.TABLE_GEOM_MUNICIPIOS,
+        settings.TABLE_DADOS_ASSENTAMENTOS, settings.TABLE_DADOS_RESERVATORIOS,
+    ):
+        table_columns(engine, table)
+    table_srid(engine, settings.TABLE_DADOS_FUNDIARIOS, "geometry")
+    table_srid(engine, settings.TABLE_DADOS_ASSENTAMENTOS, "geom")
+    table_srid(engine, settings.TABLE_DADOS_RESERVATORIOS, "geom")
+
+async def _fetch_all(sql, params: Optional[Dict[str, Any]] = None):
+    """
+    Executa `sql` e devolve todas as linhas (RowMapping): pela engine
+    assíncrona se DATABASE_ASYNC, senão pela síncrona no threadpool.
+    """
+    if settings.DATABASE_ASYNC:
+        async with get_async_engine().connect() as conn:
+            result = await conn.execute(as_statement(sql), params or {})
+            return result.mappings().all()
+
+    def _run():
+        with get_engine().connect() as conn:
+            return conn.execute(as_statement(sql), params or {}).mappings().all()
+
+    return await run_in_threadpool(_run)
+
+@lru_cache()
+def get_tile_cache() -> TileCache:
+    return TileCache(settings.TILE_CACHE_DIR, settings.TILE_CACHE_MAX_BYTES)
+
+@lru_cache()
+def get_artifact_cache() -> ArtifactCache:
+    return ArtifactCache(settings.ARTIFACT_CACHE_DIR, settings.ARTIFACT_CACHE_MAX_BYTES)
+
+@lru_cache()
+def get_result_cache() -> TieredCache:
+    return build_cache()
+
+def _data_version() -> int:
+    return get_data_version(get_engine())[0]
+
+def _statement(table: str, variant: Hashable, build: Callable[[], str]) -> TextClause:
+    """
+    Statement de `variant` em `table` no registro (veja statements.py),
+    montado por `build` na primeira vez de cada versão dos dados. Lê a
+    versão pela engine síncrona: as rotas chamam via run_in_threadpool.
+    """
+    return STATEMENTS.get(_data_version(), table, variant, build)
+
+def _cached_json(key: str, compute):
+    """Valor JSON guardado no cache de resultados (memória + compartilhado), por versão dos dados."""
+    raw = get_result_cache().get_or_compute(_data_version(), key, lambda: dumps_json(compute()))
+    return loads_json(raw)
+
+async def _cached_json_response(key: str, build, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Corpo JSON pronto lido do cache de resultados; na ausência, `await build()`
+    gera o conteúdo (exceções, como 404, não são guardadas).
+    """
+    version = await run_in_threadpool(_data_version)
+    cache = get_result_cache()
+    body = await run_in_threadpool(cache.get, version, key)
+    if body is None:
+        body = dumps_json(await build())
+        await run_in_threadpool(cache.set, version, key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _query_key(prefix: str, sql: str, params: Dict[str, Any]) -> str:
+    """Chave de cache de uma consulta (SQL + parâmetros)."""
+    return f"{prefix}:" + hashlib.sha1(f"{sql}|{sorted(params.items())}".encode("utf-8")).hexdigest()
+
+async def _cached_rows(prefix: str, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Linhas (como dicts JSON) de uma consulta pequena, guardadas no cache de resultados."""
+    key = _query_key(prefix, sql, params)
+    version = await run_in_threadpool(_data_version)
+    cache = get_result_cache()
+    raw = await run_in_threadpool(cache.get, version, key)
+    if raw is None:
+        raw = dumps_json([dict(r) for r in await _fetch_all(sql, params)])
+        await run_in_threadpool(cache.set, version, key, raw)
+    return loads_json(raw)
+
+async def _cached_count(table: str, clauses: List[str], params: Dict[str, Any]) -> int:
+    """COUNT(*) do filtro, guardado no cache de resultados até a próxima importação."""
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = await _cached_rows("count", f"SELECT COUNT(*) AS total FROM {table} {where}", params)
+    return int(rows[0]["total"])
+
+async def _keyset_page(
+    request: Request,
+    table: str,
+    key_column: str,
+    clauses: List[str],
+    params: Dict[str, Any],
+    limit: Optional[int],
+    cursor: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """
+    Paginação por keyset em `key_column` (chave com índice B-tree): devolve as
+    cláusulas/parâmetros da página, o sufixo ORDER BY/LIMIT, o total (COUNT
+    cacheado) e o link relativo da próxima página.
+    Sem `limit` nem `cursor`, devolve None (resposta completa, como antes).
+    """
+    if limit is None and cursor is None:
+        return None
+    limit = limit or settings.PAGE_DEFAULT_LIMIT
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    dialect = settings.DATABASE_TYPE
+    total = await _cached_count(table, clauses, params)
+    page_clauses, page_params, last_row_sql = keyset_sql(table, key_column, clauses, params, after, dialect)
+    rows = await _cached_rows("last_row", last_row_sql, {**page_params, "page_offset": limit - 1})
+    next_link = (
+        page_link(request.url, encode_cursor(rows[0]["page_key"], rows[0]["page_tie"]))
+        if len(rows) == 2 else None
+    )
+    return {
+        "clauses": page_clauses,
+        "params": {**page_params, "page_size": limit},
+        "columns_sql": keyset_columns_sql(table, key_column, dialect),
+        "order_sql": keyset_order_sql(table, key_column, dialect),
+        "limit": limit,
+        "total": total,
+        "next": next_link,
+        "headers": {"Link": f'<{next_link}>; rel="next"'} if next_link else None,
+    }
+
+def _page_members(page: Optional[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None):
+    """Membros do FeatureCollection paginado (no estilo OGC API - Features)."""
+    def members(returned: int) -> Dict[str, Any]:
+        out = dict(extra or {})
+        if page:
+            out["numberMatched"] = page["total"]
+            out["numberReturned"] = returned
+            out["links"] = (
+                [{"rel": "next", "type": GEOJSON_MEDIA_TYPE, "href": page["next"]}] if page["next"] else []
+            )
+        return out
+    return members
+
+def _has_name_key(table: str, column: str) -> bool:
+    return key_column(column) in table_columns(get_engine(), table)
+
+def _name_clause(table: str, column: str, param: str = "param") -> str:
+    """
+    Filtro por nome de região/município: igualdade na coluna `<coluna>_norm`
+    (índice B-tree, criado pelos importadores) comparada com `_name_value`.
+    Em bancos importados antes da coluna existir, cai no LOWER() = LOWER().
+    """
+    if _has_name_key(table, column):
+        return f'{table}."{key_column(column)}" = :{param}'
+    return f"LOWER({column}) = LOWER(:{param})"
+
+def _name_value(table: str, column: str, value: str) -> str:
+    """Valor do parâmetro de `_name_clause`: a chave canônica do nome pedido."""
+    return name_key(value) if _has_name_key(table, column) else value
+
+def _name_filter(table: str, column: str, value: str, param: str = "param") -> Tuple[str, str]:
+    """
+    (`_name_clause`, `_name_value`) de uma vez. Lê as colunas da tabela pela
+    engine síncrona: as rotas chamam via run_in_threadpool.
+    """
+    return _name_clause(table, column, param), _name_value(table, column, value)
 
 def _geom_sql(
     tolerance: Optional[float] = None,
-    decimals: Optional[int] = None
+    table: Optional[str] = None,
+) -> str:
+    """
+    Expressão SQL para GeoJSON simplificado (casas decimais no parâmetro
+    `:geom_decimals`, veja `_geom_params`). Usa settings.GEOMETRY_TOLERANCE por padrão.
+    A tolerância é aproximada para um dos SIMPLIFICATION_LEVELS e a geometria
+    é lida da coluna pré-simplificada correspondente de `table`; como os
+    níveis são finitos, o texto da consulta também é.
+    """
+    table = table or settings.TABLE_DADOS_FUNDIARIOS
+    level = snap_tolerance(tolerance, table)
+    geom = simplified_geometry_expr(
+        get_engine(), table,
+        "geometry", "geometry", "ST_Simplify", level
+    )
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        return f"AsGeoJSON({geom}, :geom_decimals)"
+    return f"ST_AsGeoJSON({geom}, :geom_decimals)"
+
+def _geom_params(decimals: Optional[int] = None) -> Dict[str, Any]:
+    """Parâmetros de `_geom_sql` (settings.GEOMETRY_DECIMALS por padrão)."""
+    return {"geom_decimals": decimals if decimals is not None else settings.GEOMETRY_DECIMALS}
+
+def _entity_geojson_sql(
+    table: str,
+    cols: List[str],
+    clauses: List[str],
+    tolerance: Optional[float] = None,
+    page: Optional[Dict[str, Any]] = None,
+    key_column: str = "lote_id",
+) -> TextClause:
+    """
+    Consulta `feature_json` das rotas GeoJSON por região/município. O texto
+    depende só das colunas, das cláusulas, do nível de simplificação e da
+    paginação (valores vão como parâmetros): vem do registro de statements.
+    """
+    level = snap_tolerance(tolerance, table)
+
+    def _build() -> str:
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        props = "".join(f', "{c}"' for c in cols)
+        if page:
+            props += f', {page["columns_sql"]}'
+        return _feature_sql(f"""
+            SELECT {_geom_sql(tolerance=level, table=table)} AS geom_json{props}
+            FROM {table}
+            {where}
+            {page["order_sql"] if page else ""}
+        """, cols, ordered=bool(page))
+
+    variant = ("geojson", tuple(cols), tuple(clauses), level, key_column if page else None)
+    return _statement(table, variant, _build)
+
+def _spatial_filter(
+    table: str,
+    geom_column: str,
+    bbox: Optional[str],
+    intersects: Optional[str],
+):
+    """Valida bbox/intersects e devolve (cláusulas, parâmetros) indexáveis para `table`."""
+    try:
+        box = parse_bbox(bbox)
+        geom = parse_geometry(intersects)
+    except ValueError as e:
+        raise HTTPException(400, f"Filtro espacial inválido: {e}")
+    if not box and not geom:
+        return [], {}
+    srid = table_srid(get_engine(), table, geom_column)
+    return spatial_filter_sql(table, geom_column, srid, box, geom, settings.DATABASE_TYPE)
+
+def _check_format(fmt: str, allowed=GEOJSON_FORMATS) -> None:
+    if fmt not in allowed:
+        raise HTTPException(400, f"Formato inválido. Use um de: {', '.join(allowed)}.")
+
+def _negotiated_format(request: Request, fmt: str, allowed) -> str:
+    """
+    `format` explícito prevalece; com o padrão ('geojson' ou 'json'), um tipo
+    colunar no cabeçalho Accept escolhe o formato. Valida contra `allowed`.
+    """
+    if fmt == allowed[0] and "format" not in request.query_params:
+        fmt = negotiate_format(request.headers.get("accept"), allowed) or fmt
+    _check_format(fmt, allowed)
+    return fmt
+
+def _geom_wkb_sql(table: str, tolerance: Optional[float] = None) -> str:
+    """Geometria simplificada (mesmos níveis do GeoJSON) em WKB, em EPSG:4326."""
+    level = snap_tolerance(tolerance, table)
+    geom = simplified_geometry_expr(get_engine(), table, "geometry", "geometry", "ST_Simplify", level)
+    sqlite = settings.DATABASE_TYPE == DatabaseType.SQLITE
+    if table_srid(get_engine(), table, "geometry") != 4326:
+        geom = f"{'Transform' if sqlite else 'ST_Transform'}({geom}, 4326)"
+    return f"{'AsBinary' if sqlite else 'ST_AsBinary'}({geom})"
+
+def _feature_sql(
+    inner_sql: str,
+    columns: List[str],
+    strip_nulls: bool = True,
+    ordered: bool = False,
 ) -> str:
     """
-    Expressão SQL para GeoJSON simplificado.
-    Usa settings.GEOMETRY_TOLERANCE e settings.GEOMETRY_DECIMALS por padrão.
+    Envolve uma consulta que devolve `geom_json` + colunas de propriedades para
+    que o próprio banco monte cada Feature como texto JSON completo (coluna
+    `feature_json`). A geometria gerada pelo PostGIS/SpatiaLite é embutida sem
+    passar por json.loads/json.dumps no Python.
+    Com `strip_nulls`, propriedades nulas são omitidas. Com `ordered`, a
+    consulta interna deve trazer as colunas `page_key` e `page_tie` (paginação por keyset).
     """
-    tol = tolerance if tolerance is not None else settings.GEOMETRY_TOLERANCE
-    dec = decimals if decimals is not None else settings.GEOMETRY_DECIMALS
     if settings.DATABASE_TYPE == DatabaseType.SQLITE:
-        return f"AsGeoJSON(ST_Simplify(geometry, {tol}), {dec})"
-    return f"ST_AsGeoJSON(ST_Simplify(geometry, {tol}), {dec})"
+        props = "json_object(" + ", ".join(f"'{c}', t.\"{c}\"" for c in columns) + ")"
+        if strip_nulls:
+            # json_patch remove as chaves cujo valor é null (RFC 7396)
+            props = f"json_patch('{{}}', {props})"
+        feature = (
+            f"json_object('type', 'Feature', 'geometry', json(t.geom_json), "
+            f"'properties', {props})"
+        )
+    else:
+        props = "json_build_object(" + ", ".join(f"'{c}', t.\"{c}\"" for c in columns) + ")"
+        if strip_nulls:
+            props = f"json_strip_nulls({props})"
+        feature = (
+            f"json_build_object('type', 'Feature', 'geometry', t.geom_json::json, "
+            f"'properties', {props})::text"
+        )
+    return (
+        f"SELECT {feature} AS feature_json "
+        f"FROM ({inner_sql}) AS t "
+        f"WHERE t.geom_json IS NOT NULL"
+        + (" ORDER BY t.page_key, t.page_tie" if ordered else "")
+    )
+
+def _iter_feature_texts(rows):
+    """Extrai o texto JSON de cada Feature montada pelo banco."""
+    for row in rows:
+        yield row['feature_json']
+
+async def _aiter_feature_texts(rows):
+    async for row in rows:
+        yield row['feature_json']
+
+async def _stream_geojson(
+    sql: str,
+    params: Dict[str, Any],
+    not_found: str,
+    fmt: str = "geojson",
+    extra_members=None,
+    allow_empty: bool = False,
+    headers: Optional[Dict[str, str]] = None,
+    artifact: Optional[Tuple[str, str, str]] = None,
+) -> StreamingResponse:
+    """
+    Consulta com cursor server-side e envia as features à medida que são lidas,
+    sem materializar o FeatureCollection em memória.
+    `sql` deve devolver a coluna `feature_json` (veja `_feature_sql`).
+    A resposta completa vai para o cache de resultados, chaveada pela consulta,
+    ou, com `artifact` = (camada, entidade, variante), para o cache de artefatos em disco.
+    """
+    media_type = GEOJSON_SEQ_MEDIA_TYPE if fmt == "geojsonseq" else GEOJSON_MEDIA_TYPE
+    cache = get_result_cache()
+    cache_key = _query_key(f"geojson:{fmt}", sql, params)
+    version = await run_in_threadpool(_data_version)
+    if artifact is None:
+        cached = await run_in_threadpool(cache.get, version, cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type=media_type, headers=headers)
+
+    if settings.DATABASE_ASYNC:
+        rows = await astream_rows(get_async_engine(), sql, params, settings.STREAM_YIELD_PER)
+        first, features = await apeek(_aiter_feature_texts(rows))
+        seq, collection, tee = aiter_geojson_seq, aiter_feature_collection, atee_to_cache
+    else:
+        rows = await run_in_threadpool(stream_rows, get_engine(), sql, params, settings.STREAM_YIELD_PER)
+        first, features = await run_in_threadpool(peek, _iter_feature_texts(rows))
+        seq, collection, tee = iter_geojson_seq, iter_feature_collection, tee_to_cache
+    if first is None and not allow_empty:
+        raise HTTPException(404, not_found)
+    if fmt == "geojsonseq":
+        chunks = seq(features)
+    else:
+        chunks = collection(features, extra_members)
+    if artifact is not None:
+        artifacts = get_artifact_cache()
+        body = (artifacts.atee if settings.DATABASE_ASYNC else artifacts.tee)(version, *artifact, chunks)
+    else:
+        body = tee(chunks, cache, version, cache_key)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+async def _stream_columnar(
+    fmt: str,
+    name: str,
+    sql: str,
+    params: Dict[str, Any],
+    not_found: str,
+    geometry_column: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
+    """
+    Envia o resultado de `sql` em Arrow IPC, Parquet ou FlatGeobuf, um lote do
+    cursor por vez (record batch / row group / features). Sempre pela engine
+    síncrona numa thread; as saídas colunares não passam pelo cache de resultados.
+    """
+    columns, batches = await run_in_threadpool(
+        stream_row_batches, get_engine(), sql, params, settings.STREAM_YIELD_PER
+    )
+    first, batches = await run_in_threadpool(peek, batches)
+    if first is None:
+        raise HTTPException(404, not_found)
+    headers = {**(headers or {}), **columnar_headers(fmt, name)}
+    return StreamingResponse(
+        iter_columnar(fmt, name, columns, batches, geometry_column),
+        media_type=columnar_media_type(fmt), headers=headers
+    )
 
 # ==================== Listagem de Regiões e Municípios ====================
-@lru_cache(maxsize=32)
-def fetch_regioes() -> List[str]:
-    """Retorna todas as regiões administrativas."""
+def _lookup_layers() -> List[str]:
+    """Camadas já presentes na tabela de localidades (vazio se ela não existir)."""
+    def _query():
+        try:
+            with get_engine().connect() as conn:
+                rows = conn.execute(
+                    text(f"SELECT DISTINCT camada FROM {settings.TABLE_LOCALIDADES}")
+                ).all()
+        except Exception:
+            return []
+        return [r[0] for r in rows]
+    return _cached_json("localidades:camadas", _query)
+
+def _listing_query(table: str, column: str, regiao: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Consulta dos valores distintos (ordenados) de `column` em `table`, opcionalmente
+    de uma região. Lê a tabela de localidades quando o importador de `table` já a
+    preencheu (poucas centenas de linhas); senão, DISTINCT sobre a tabela de fatos.
+    """
+    params: Dict[str, Any] = {}
+    clauses = []
+    if table in _lookup_layers():
+        source = settings.TABLE_LOCALIDADES
+        clauses.append("camada = :camada")
+        params["camada"] = table
+        if regiao is not None:
+            clauses.append(f"{key_column('regiao_administrativa')} = :regiao")
+            params["regiao"] = name_key(regiao)
+    else:
+        source = table
+        if regiao is not None:
+            clauses.append(_name_clause(table, "regiao_administrativa", "regiao"))
+            params["regiao"] = _name_value(table, "regiao_administrativa", regiao)
+    clauses.append(f"{column} IS NOT NULL")
     sql = f"""
-        SELECT DISTINCT regiao_administrativa
-        FROM {settings.TABLE_DADOS_FUNDIARIOS}
-        WHERE regiao_administrativa IS NOT NULL
-        ORDER BY regiao_administrativa
+        SELECT DISTINCT {column}
+        FROM {source}
+        WHERE {' AND '.join(clauses)}
+        ORDER BY {column}
     """
+    return sql, params
+
+def _fetch_listing(table: str, column: str, regiao: Optional[str] = None) -> List[str]:
+    sql, params = _listing_query(table, column, regiao)
     with get_engine().connect() as conn:
-        rows = conn.execute(text(sql)).mappings().all()
-    return [r['regiao_administrativa'] for r in rows]
+        rows = conn.execute(as_statement(sql), params).all()
+    return [r[0] for r in rows]
+
+def fetch_regioes() -> List[str]:
+    """Retorna todas as regiões administrativas (via cache de resultados)."""
+    return _cached_json(
+        "regioes", lambda: _fetch_listing(settings.TABLE_DADOS_FUNDIARIOS, "regiao_administrativa")
+    )
 
-@lru_cache(maxsize=32)
 def fetch_municipios(regiao: str) -> List[str]:
-    """Retorna municípios de uma região."""
-    where = _ci_equals("regiao_administrativa", "regiao")
-    sql = f"""
-        SELECT DISTINCT nome_municipio
-        FROM {settings.TABLE_DADOS_FUNDIARIOS}
-        WHERE {where} AND nome_municipio IS NOT NULL
-        ORDER BY nome_municipio
-    """
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), {"regiao": regiao}).mappings().all()
-    return [r['nome_municipio'] for r in rows]
+    """Retorna municípios de uma região (via cache de resultados)."""
+    return _cached_json(
+        f"municipios:{name_key(regiao)}",
+        lambda: _fetch_listing(settings.TABLE_DADOS_FUNDIARIOS, "nome_municipio", regiao)
+    )
 
 # ==================== GeoJSON Genérico ====================
-def _get_geojson_from_file_or_db(
+async def _get_geojson_from_file_or_db(
     entity_type: str,
     entity_name: str,
     table: str,
@@ -141,101 +749,515 @@ def _get_geojson_from_file_or_db(
     extra_columns: Optional[List[str]] = None,
     tolerance: Optional[float] = None,
     decimals: Optional[int] = None,
-) -> Dict[str, Any]:
-    """Tenta ler arquivo pré-processado ou consulta o banco."""
-    file_path = f"data/geodata/{entity_type}_{entity_name}.geojson"
-    if os.path.isfile(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    cols = extra_columns or []
-    props = ", ".join(f'"{c}"' for c in cols)
-    geom = _geom_sql(tolerance=tolerance, decimals=decimals)
-    sql = f"""
-        SELECT {geom} AS geom_json, {props}
-        FROM {table}
-        WHERE {_ci_equals(where_column, 'param')}
+    fmt: str = "geojson",
+    filters: Optional[List[str]] = None,
+    filter_params: Optional[Dict[str, Any]] = None,
+    accept_encoding: Optional[str] = None,
+    request: Optional[Request] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    key_column: str = "lote_id",
+):
     """
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), {"param": entity_name}).mappings().all()
-    features = [row_to_feature(r) for r in rows if r.get('geom_json')]
-    if not features:
-        raise HTTPException(404, f"Nenhuma geometria para {entity_type} '{entity_name}'")
-    return {"type": "FeatureCollection", "features": features}
+    Serve o arquivo pré-processado (cópia .br/.gz conforme `accept_encoding`)
+    ou consulta o banco (em streaming).
+    `filters`/`filter_params` são cláusulas espaciais extras (veja `_spatial_filter`);
+    com elas o arquivo pré-processado é ignorado e `entity_name` pode ser None.
+    `limit`/`cursor` paginam por keyset em `key_column` (veja `_keyset_page`).
+    """
+    paged = limit is not None or cursor is not None
+    cols = extra_columns or []
+    artifact = None
+    if fmt == "geojson" and entity_name and not filters and not paged:
+        level = snap_tolerance(tolerance, table)
+        decimals_used = _geom_params(decimals)["geom_decimals"]
+        file_path = _preprocessed_file(entity_type, entity_name, table, level, decimals_used)
+        if file_path and cols == COMMON_PROPERTY_COLUMNS:
+            return precompressed_response(file_path, accept_encoding, GEOJSON_MEDIA_TYPE)
+        artifacts = get_artifact_cache()
+        # Sem versão registrada (base sem `versao_dados`), uma reimportação não
+        # invalidaria as variantes em disco: o cache fica desligado
+        version = await run_in_threadpool(_data_version) if artifacts.enabled else 0
+        if version:
+            artifact = (table, file_key(entity_name), artifact_name(level, decimals_used, cols))
+            cached_path = await run_in_threadpool(artifacts.lookup, version, *artifact)
+            if cached_path:
+                return precompressed_response(cached_path, accept_encoding, GEOJSON_MEDIA_TYPE)
+
+    clauses = list(filters or [])
+    params = dict(filter_params or {})
+    if entity_name:
+        clause, params["param"] = await run_in_threadpool(_name_filter, table, where_column, entity_name)
+        clauses.insert(0, clause)
+    page = await _keyset_page(request, table, key_column, clauses, params, limit, cursor)
+    if page:
+        clauses, params = page["clauses"], page["params"]
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    props = "".join(f', "{c}"' for c in cols)
+    not_found = (
+        f"Nenhuma geometria para {entity_type} '{entity_name}'" if entity_name
+        else "Nenhuma geometria no filtro espacial informado"
+    )
+    if fmt in COLUMNAR_FORMATS:
+        geom = await run_in_threadpool(_geom_wkb_sql, table, tolerance)
+        sql = f"""
+            SELECT {geom} AS geometry{props}
+            FROM {table}
+            {where}
+            {page["order_sql"] if page else ""}
+        """
+        name = f"{entity_type}_{entity_name}" if entity_name else entity_type
+        return await _stream_columnar(
+            fmt, name, sql, params, not_found, geometry_column="geometry",
+            headers=page["headers"] if page else None
+        )
+    sql = await run_in_threadpool(_entity_geojson_sql, table, cols, clauses, tolerance, page, key_column)
+    return await _stream_geojson(
+        sql, {**params, **_geom_params(decimals)}, not_found, fmt=fmt,
+        extra_members=_page_members(page) if page else None,
+        headers=page["headers"] if page else None,
+        artifact=artifact
+    )
 
 # ==================== Pré-processamento ====================
-def _preprocess_municipio(muni: str):
-    """Gera e salva GeoJSON de município."""
-    sql = (
-        f"SELECT {_geom_sql()} AS geom_json, \"nm_mun\" AS nome_municipio "
-        f"FROM {settings.TABLE_GEOM_MUNICIPIOS} "
-        f"WHERE {_ci_equals('nm_mun', 'muni')}"
+def _geodata_name(entity_type: str, name: str) -> str:
+    """Nome do arquivo pré-processado de região/município (chave canônica do nome)."""
+    return f"{entity_type}_{file_key(name)}.geojson"
+
+def _geodata_path(entity_type: str, name: str) -> Optional[str]:
+    """
+    Arquivo pré-processado no snapshot publicado (None se ainda não houver).
+    O link `current` é resolvido aqui, uma vez: a requisição lê sempre o
+    mesmo snapshot, mesmo que outro seja publicado no meio do envio.
+    """
+    snapshot = current_snapshot(settings.PREPROCESS_DIR)
+    return os.path.join(snapshot, _geodata_name(entity_type, name)) if snapshot else None
+
+def _preprocessed_file(entity_type: str, entity_name: str, table: str, level: float, decimals: int) -> Optional[str]:
+    """
+    Arquivo pré-processado de `entity_name`, se existir e valer para a
+    variante pedida: mesma tabela de origem (PREPROCESS_SOURCES), nível padrão
+    da tabela e casas decimais padrão.
+    """
+    source_table, _, _ = PREPROCESS_SOURCES.get(entity_type, (None, None, None))
+    if source_table != table or level != snap_tolerance(None, table) or decimals != settings.GEOMETRY_DECIMALS:
+        return None
+    file_path = _geodata_path(entity_type, entity_name)
+    return file_path if file_path and os.path.isfile(file_path) else None
+
+def _write_geojson(path: str, rows, extra_members=None) -> None:
+    with open(path, "wb") as f:
+        f.writelines(iter_feature_collection(_iter_feature_texts(rows), extra_members))
+    write_precompressed(path)
+
+def _preprocess_municipio(muni: str, directory: str):
+    """Gera e salva GeoJSON de município em `directory` (snapshot em construção)."""
+    table = settings.TABLE_GEOM_MUNICIPIOS
+    sql = _feature_sql(
+        f"SELECT {_geom_sql(table=table)} AS geom_json, \"nm_mun\" AS nome_municipio "
+        f"FROM {table} "
+        f"WHERE {_name_clause(table, 'nm_mun', 'muni')}",
+        ["nome_municipio"]
     )
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), {"muni": muni}).mappings().all()
-    features = [row_to_feature(r) for r in rows if r.get('geom_json')]
-    os.makedirs("data/geodata", exist_ok=True)
-    with open(f"data/geodata/municipio_{muni}.geojson", "w", encoding="utf-8") as f:
-        json.dump({"type": "FeatureCollection", "features": features}, f)
-
-def _preprocess_regiao(reg: str):
-    """Gera e salva GeoJSON de região."""
+    params = {"muni": _name_value(table, "nm_mun", muni), **_geom_params()}
+    rows = stream_rows(get_engine(), sql, params, settings.STREAM_YIELD_PER)
+    # Mesmo envelope de /geojson_muni, que serve o arquivo
+    _write_geojson(
+        os.path.join(directory, _geodata_name("municipio", muni)), rows,
+        lambda total: {"properties": {"total_municipios": 1}},
+    )
+
+def _preprocess_regiao(reg: str, directory: str):
+    """Gera e salva GeoJSON de região em `directory` (snapshot em construção)."""
+    table = settings.TABLE_DADOS_FUNDIARIOS
     cols = ", ".join(f'"{c}"' for c in COMMON_PROPERTY_COLUMNS)
-    sql = (
+    sql = _feature_sql(
         f"SELECT {_geom_sql()} AS geom_json, {cols} "
-        f"FROM {settings.TABLE_DADOS_FUNDIARIOS} "
-        f"WHERE {_ci_equals('regiao_administrativa', 'param')}"
+        f"FROM {table} "
+        f"WHERE {_name_clause(table, 'regiao_administrativa')}",
+        COMMON_PROPERTY_COLUMNS
     )
+    params = {"param": _name_value(table, "regiao_administrativa", reg), **_geom_params()}
+    rows = stream_rows(get_engine(), sql, params, settings.STREAM_YIELD_PER)
+    _write_geojson(os.path.join(directory, _geodata_name("regiao", reg)), rows)
+
+# Tabela de origem, coluna do nome e colunas que entram na assinatura de cada tipo de entidade
+PREPROCESS_SOURCES = {
+    "municipio": (settings.TABLE_GEOM_MUNICIPIOS, "nm_mun", []),
+    "regiao": (settings.TABLE_DADOS_FUNDIARIOS, "regiao_administrativa", ["lote_id", *COMMON_PROPERTY_COLUMNS]),
+}
+
+def _preprocess_salt(entity_type: str) -> str:
+    """Parâmetros que mudam os arquivos gerados; entram em todas as assinaturas do tipo."""
+    table, _, _ = PREPROCESS_SOURCES[entity_type]
+    columns = ["nome_municipio"] if entity_type == "municipio" else COMMON_PROPERTY_COLUMNS
+    return repr((entity_type, snap_tolerance(None, table), settings.GEOMETRY_DECIMALS, columns))
+
+def _entity_fingerprints(entity_type: str) -> Dict[str, str]:
+    """
+    Assinatura do conteúdo de origem de cada região/município (chave de
+    `file_key`): atributos e um resumo da geometria (nº de vértices e área)
+    de cada linha, sem gerar GeoJSON.
+    """
+    table, column, cols = PREPROCESS_SOURCES[entity_type]
+    props = "".join(f', "{c}"' for c in cols)
+    sql = f"""
+        SELECT "{column}"{props}, ST_NPoints(geometry), ST_Area(geometry)
+        FROM {table}
+        WHERE "{column}" IS NOT NULL
+    """
+    rows = (tuple(r.values()) for r in stream_rows(get_engine(), sql, None, settings.STREAM_YIELD_PER))
+    return row_fingerprints(rows, lambda r: file_key(r[0]), _preprocess_salt(entity_type))
+
+def _preprocess_pool_size(n: int) -> int:
+    """
+    Processos do pré-processamento: limitado por PREPROCESS_WORKERS (ou, se 0,
+    pelo DB_POOL_SIZE) e pelos núcleos, já que cada processo usa uma conexão.
+    """
+    limit = settings.PREPROCESS_WORKERS or settings.DB_POOL_SIZE
+    return max(1, min(n, limit, cpu_count()))
+
+def _init_preprocess_worker() -> None:
+    """
+    Inicializador dos processos filhos: descarta as conexões herdadas no fork
+    (sem fechá-las, pois pertencem ao processo pai) para que cada filho abra
+    as suas num pool próprio.
+    """
+    get_engine().dispose(close=False)
+
+def preprocess_geojson(forcar: bool = False) -> Dict[str, Any]:
+    """
+    Pré-processamento incremental e paralelo em snapshots. Compara a versão de
+    cada camada (`versao_dados`) e a assinatura de cada região/município com o
+    manifesto do snapshot publicado e regera só as entidades alteradas ou sem
+    arquivo; se nenhuma camada mudou, nem calcula assinaturas. Havendo mudança,
+    monta um novo snapshot (arquivos inalterados entram por hard link), faz
+    fsync e troca o link `current` atomicamente; se algo falhar, o snapshot
+    novo é descartado e o publicado continua valendo. Snapshots antigos além de
+    PREPROCESS_SNAPSHOTS_KEEP são apagados. `forcar` regera tudo.
+    Retorna (e registra no log) quantas entidades foram geradas, ignoradas e
+    removidas, e a duração.
+    """
+    inicio = time.monotonic()
+    root = settings.PREPROCESS_DIR
+    manifest = PreprocessManifest(current_snapshot(root))
+    versions = read_layer_versions(get_engine())
+    regioes = fetch_regioes()
+    entities = {("regiao", reg) for reg in regioes}
+    # Municípios da tabela de contornos, de onde saem os arquivos servidos por /geojson_muni
+    entities |= {("municipio", muni) for muni in _fetch_listing(settings.TABLE_GEOM_MUNICIPIOS, "nm_mun")}
+    wanted = {f"{kind}:{file_key(name)}": (kind, name) for kind, name in entities}
+
+    todo: Dict[str, List[Tuple[str, str]]] = {"municipio": [], "regiao": []}
+    signatures: Dict[str, str] = {}
+    for kind, (table, _, _) in PREPROCESS_SOURCES.items():
+        ids = [entity_id for entity_id, (k, _) in wanted.items() if k == kind]
+        # Camada sem versão registrada: não há como saber se houve importação,
+        # então as assinaturas são sempre conferidas
+        layer_changed = table not in versions or manifest.layers.get(table) != versions.get(table)
+        if not forcar and not layer_changed and all(manifest.is_current(i) for i in ids):
+            continue
+        fingerprints = _entity_fingerprints(kind)
+        for entity_id in ids:
+            name = wanted[entity_id][1]
+            signatures[entity_id] = fingerprints.get(file_key(name), "vazio")
+            if forcar or not manifest.is_current(entity_id, signatures[entity_id]):
+                todo[kind].append((entity_id, name))
+    removed = [entity_id for entity_id in manifest.entities if entity_id not in wanted]
+    generated = sum(len(items) for items in todo.values())
+    layers = {table: versions.get(table) for table, _, _ in PREPROCESS_SOURCES.values()}
+
+    if generated or removed or manifest.directory is None:
+        snapshot = new_snapshot(root)
+        try:
+            new_manifest = manifest.moved_to(snapshot)
+            regenerate = {entity_id for items in todo.values() for entity_id, _ in items}
+            for entity_id in removed:
+                new_manifest.forget(entity_id)
+            if manifest.directory:
+                link_files(manifest.directory, snapshot, [
+                    entry["arquivo"] for entity_id, entry in new_manifest.entities.items()
+                    if entity_id not in regenerate
+                ])
+            workers = {"municipio": _preprocess_municipio, "regiao": _preprocess_regiao}
+            for kind, items in todo.items():
+                if not items:
+                    continue
+                with Pool(_preprocess_pool_size(len(items)), initializer=_init_preprocess_worker) as pool:
+                    pool.starmap(workers[kind], [(name, snapshot) for _, name in items])
+                for entity_id, name in items:
+                    new_manifest.record(entity_id, signatures[entity_id], _geodata_name(kind, name))
+            manifest = new_manifest
+            manifest.layers = layers
+            manifest.data["ultima_execucao"] = _preprocess_report(inicio, generated, len(wanted), removed)
+            manifest.save()
+            publish(root, snapshot)
+        except Exception:
+            shutil.rmtree(snapshot, ignore_errors=True)
+            raise
+        gc_snapshots(root, settings.PREPROCESS_SNAPSHOTS_KEEP)
+    else:
+        # Nada a regerar: só registra as versões no manifesto do snapshot publicado
+        manifest.layers = layers
+        manifest.data["ultima_execucao"] = _preprocess_report(inicio, generated, len(wanted), removed)
+        manifest.save()
+
+    report = manifest.data["ultima_execucao"]
+    logger.info("Pré-processamento: %s", report)
+    return report
+
+def _preprocess_report(inicio: float, generated: int, total: int, removed: List[str]) -> Dict[str, Any]:
+    return {
+        "gerados": generated,
+        "ignorados": total - generated,
+        "removidos": len(removed),
+        "duracao_s": round(time.monotonic() - inicio, 3),
+    }
+
+def _layers_changed() -> bool:
+    """Alguma camada mudou de versão desde a última execução (ou seja, houve importação)?"""
+    manifest = PreprocessManifest(current_snapshot(settings.PREPROCESS_DIR))
+    versions = read_layer_versions(get_engine())
+    return any(manifest.layers.get(t) != versions.get(t) for t, _, _ in PREPROCESS_SOURCES.values())
+
+def run_preprocess(forcar: bool = False, somente_se_importado: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Ponto de entrada do pré-processamento (agendamentos e CLI): roda
+    `preprocess_geojson` só se obtiver o lock "preprocess" (advisory lock no
+    Postgres, arquivo no SQLite), de modo que os vários workers do gunicorn e
+    o runner dedicado não executem ao mesmo tempo. Com `somente_se_importado`,
+    só roda se alguma camada mudou de versão. Retorna None se não rodou.
+    """
+    with exclusive_lock("preprocess", get_engine(), settings.PREPROCESS_DIR) as leader:
+        if not leader:
+            logger.info("Pré-processamento já em execução em outro processo; ignorando")
+            return None
+        if somente_se_importado and not forcar and not _layers_changed():
+            return None
+        return preprocess_geojson(forcar)
+
+def schedule_preprocess(scheduler) -> None:
+    """Agenda o job diário e a checagem de novas importações em `scheduler`."""
+    scheduler.add_job(run_preprocess, 'cron',
+                      hour=settings.PREPROCESS_START_HOUR,
+                      minute=settings.PREPROCESS_START_MINUTE)
+    if settings.PREPROCESS_CHECK_INTERVAL_MINUTES > 0:
+        # Depois de uma importação, regera só o que mudou sem esperar a noite
+        scheduler.add_job(run_preprocess, 'interval',
+                          minutes=settings.PREPROCESS_CHECK_INTERVAL_MINUTES,
+                          kwargs={"somente_se_importado": True})
+
+# ==================== Consulta por ponto ====================
+# Camadas consultadas no banco pelo /lookup: tabela, coluna geométrica, chave e propriedades
+POINT_LOOKUP_LAYERS = {
+    "lote": (settings.TABLE_DADOS_FUNDIARIOS, "geometry", "lote_id", COMMON_PROPERTY_COLUMNS),
+    "assentamento": (settings.TABLE_DADOS_ASSENTAMENTOS, "geom", "id", ASSENTAMENTOS_PROPERTY_COLUMNS),
+}
+
+def _load_boundary_index() -> Optional[BoundaryIndex]:
+    """Lê os contornos completos dos municípios (EPSG:4326) e a região de cada um."""
+    table = settings.TABLE_GEOM_MUNICIPIOS
+    if not table_columns(get_engine(), table):
+        return None
+    sql = f'SELECT "nm_mun", {_geom_wkb_sql(table, 0)} AS geometry FROM {table}'
     with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), {"param": reg}).mappings().all()
-    features = [row_to_feature(r) for r in rows if r.get('geom_json')]
-    os.makedirs("data/geodata", exist_ok=True)
-    with open(f"data/geodata/regiao_{reg}.geojson", "w", encoding="utf-8") as f:
-        json.dump({"type": "FeatureCollection", "features": features}, f)
-
-def preprocess_geojson():
-    """Dispara pré-processamento paralelo."""
-    muni_list = []
-    for reg in fetch_regioes():
-        muni_list.extend(fetch_municipios(reg))
-    with Pool(cpu_count()) as pool:
-        pool.map(_preprocess_municipio, set(muni_list))
-    with Pool(cpu_count()) as pool:
-        pool.map(_preprocess_regiao, fetch_regioes())
+        rows = [(nome, wkb) for nome, wkb in conn.execute(as_statement(sql)).all() if wkb and nome]
+    regioes = {name_key(m): reg for reg in fetch_regioes() for m in fetch_municipios(reg)}
+    return BoundaryIndex(
+        [nome for nome, _ in rows], shapely.from_wkb([bytes(wkb) for _, wkb in rows]), regioes
+    )
+
+def get_boundary_index() -> Optional[BoundaryIndex]:
+    """Índice dos contornos, recarregado quando a versão dos dados muda."""
+    return for_data_version("contornos", _data_version(), _load_boundary_index)
+
+def _point_features(layer: str, points: List[Tuple[float, float]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Primeira feição (pela chave) de `layer` que contém cada ponto, por índice
+    do ponto. No Postgres, todos os pontos vão numa única consulta (unnest +
+    ST_Contains pelo índice GiST); no SQLite, uma consulta por ponto na mesma
+    conexão (SpatialIndex + ST_Contains).
+    """
+    table, geom_column, key, cols = POINT_LOOKUP_LAYERS[layer]
+    if not points or not table_columns(get_engine(), table):
+        return {}
+    srid = table_srid(get_engine(), table, geom_column)
+    props = ", ".join(f'{table}."{c}"' for c in [key, *cols])
+    found: Dict[int, Dict[str, Any]] = {}
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        where = " AND ".join(point_filter_sql(table, geom_column, srid, DatabaseType.SQLITE))
+        sql = f'SELECT {props} FROM {table} WHERE {where} ORDER BY {table}."{key}" LIMIT 1'
+        with get_engine().connect() as conn:
+            for i, (lon, lat) in enumerate(points):
+                row = conn.execute(as_statement(sql), {"lon": lon, "lat": lat}).mappings().first()
+                if row:
+                    found[i] = dict(row)
+        return found
+    on = " AND ".join(point_filter_sql(table, geom_column, srid, DatabaseType.POSTGRES, "p.lon", "p.lat"))
+    sql = f"""
+        SELECT DISTINCT ON (p.i) p.i AS ponto, {props}
+        FROM unnest(
+            CAST(:idx AS integer[]), CAST(:lons AS double precision[]), CAST(:lats AS double precision[])
+        ) AS p(i, lon, lat)
+        JOIN {table} ON {on}
+        ORDER BY p.i, {table}."{key}"
+    """
+    params = {
+        "idx": list(range(len(points))),
+        "lons": [lon for lon, _ in points],
+        "lats": [lat for _, lat in points],
+    }
+    with get_engine().connect() as conn:
+        for row in conn.execute(as_statement(sql), params).mappings():
+            row = dict(row)
+            found[row.pop("ponto")] = row
+    return found
+
+def _lookup_points(points: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+    """Município, região (em memória), lote e assentamento (no banco) de cada ponto (lon, lat)."""
+    index = get_boundary_index()
+    places = index.locate(points) if index else [(None, None)] * len(points)
+    layers = {layer: _point_features(layer, points) for layer in POINT_LOOKUP_LAYERS}
+    return [
+        {
+            "lon": lon, "lat": lat, "municipio": municipio, "regiao": regiao,
+            **{layer: found.get(i) for layer, found in layers.items()},
+        }
+        for i, ((lon, lat), (municipio, regiao)) in enumerate(zip(points, places))
+    ]
+
+def _load_reservoir_index() -> Optional[ReservoirIndex]:
+    """Lê os reservatórios (geometria em EPSG:4326) para a busca em memória do SQLite."""
+    table = settings.TABLE_DADOS_RESERVATORIOS
+    if not table_columns(get_engine(), table):
+        return None
+    geom = "geom"
+    if table_srid(get_engine(), table, "geom") != 4326:
+        geom = "Transform(geom, 4326)"
+    cols = ", ".join(f'"{c}"' for c in NEAREST_COLUMNS)
+    sql = f"SELECT {cols}, AsBinary({geom}) AS geometry FROM {table} WHERE geom IS NOT NULL"
+    with get_engine().connect() as conn:
+        rows = [dict(r) for r in conn.execute(as_statement(sql)).mappings().all()]
+    geoms = shapely.from_wkb([bytes(r.pop("geometry")) for r in rows])
+    return ReservoirIndex(rows, geoms)
+
+def get_reservoir_index() -> Optional[ReservoirIndex]:
+    """Índice dos reservatórios (SQLite), recarregado quando a versão dos dados muda."""
+    return for_data_version("reservatorios", _data_version(), _load_reservoir_index)
+
+def _lote_point(lote_id: int) -> Optional[Tuple[float, float]]:
+    """Ponto interior (lon, lat) do lote, origem da busca no SQLite."""
+    table = settings.TABLE_DADOS_FUNDIARIOS
+    sql = f"SELECT {_geom_wkb_sql(table, 0)} AS geometry FROM {table} WHERE lote_id = :lote_id LIMIT 1"
+    with get_engine().connect() as conn:
+        wkb = conn.execute(as_statement(sql), {"lote_id": lote_id}).scalar()
+    if not wkb:
+        return None
+    point = shapely.point_on_surface(shapely.from_wkb(bytes(wkb)))
+    return point.x, point.y
+
+def _nearest_reservoirs_sqlite(
+    lon: Optional[float], lat: Optional[float], lote_id: Optional[int], k: int
+) -> Optional[List[Dict[str, Any]]]:
+    """Busca em memória (SpatiaLite não tem KNN); None se o lote não existir."""
+    if lote_id is not None:
+        origin = _lote_point(lote_id)
+        if origin is None:
+            return None
+        lon, lat = origin
+    index = get_reservoir_index()
+    return index.nearest(lon, lat, k) if index else []
+
+async def _nearest_reservoirs(
+    lon: Optional[float], lat: Optional[float], lote_id: Optional[int], k: int
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Os k reservatórios mais próximos do ponto ou do lote, com `distancia_m`.
+    No PostgreSQL, KNN pelo índice GiST (`<->`), medindo do contorno do lote;
+    no SQLite, pelo índice em memória, a partir de um ponto interior do lote.
+    None se o lote não existir.
+    """
+    if settings.DATABASE_TYPE == DatabaseType.SQLITE:
+        return await run_in_threadpool(_nearest_reservoirs_sqlite, lon, lat, lote_id, k)
+    table = settings.TABLE_DADOS_RESERVATORIOS
+    if not await run_in_threadpool(table_columns, get_engine(), table):
+        return []
+    params: Dict[str, Any] = nearest_params(k)
+    if lote_id is None:
+        origin = "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)"
+        params.update(lon=lon, lat=lat)
+    else:
+        lotes = settings.TABLE_DADOS_FUNDIARIOS
+        geom = "geometry"
+        if await run_in_threadpool(table_srid, get_engine(), lotes, "geometry") != 4326:
+            geom = "ST_Transform(geometry, 4326)"
+        origin = f"(SELECT {geom} FROM {lotes} WHERE lote_id = :lote_id LIMIT 1)"
+        params["lote_id"] = lote_id
+        found = await _fetch_all(f"SELECT 1 FROM {lotes} WHERE lote_id = :lote_id LIMIT 1", {"lote_id": lote_id})
+        if not found:
+            return None
+    srid = await run_in_threadpool(table_srid, get_engine(), table, "geom")
+    return [dict(r) for r in await _fetch_all(nearest_sql(table, srid, origin), params)]
 
 # ==================== Endpoints ====================
 @app.get("/health")
-def health_check():
+async def health_check():
     """Verifica saúde do serviço."""
-    with get_engine().connect() as conn:
-        conn.execute(text("SELECT 1"))
-    return {"status": "healthy"}
+    await _fetch_all("SELECT 1")
+    return FastJSONResponse({"status": "healthy"})
+
+@app.get("/metricas")
+async def metricas():
+    """
+    Métricas do processo: espera no checkout e ocupação do pool, statements
+    registrados, acertos/faltas e ocupação do cache de artefatos.
+    """
+    pool = {"sync": {**POOL_WAIT["sync"].snapshot(), **pool_status(get_engine())}}
+    if settings.DATABASE_ASYNC:
+        pool["async"] = {**POOL_WAIT["async"].snapshot(), **pool_status(get_async_engine())}
+    return FastJSONResponse({
+        "pid": os.getpid(), "pool": pool, "consultas_registradas": len(STATEMENTS),
+        "artefatos": get_artifact_cache().snapshot(),
+    })
 
 @app.get("/regioes")
-def listar_regioes():
+async def listar_regioes():
     """Lista todas as regiões."""
-    return {"regioes": fetch_regioes()}
+    return FastJSONResponse({"regioes": await run_in_threadpool(fetch_regioes)})
 
 @app.get("/municipios")
-def listar_municipios(regiao: str = Query(..., description="Região case-insensitive.")):
+async def listar_municipios(regiao: str = Query(..., description="Região case-insensitive.")):
     """Lista municípios de uma região."""
-    munis = fetch_municipios(regiao)
+    munis = await run_in_threadpool(fetch_municipios, regiao)
     if not munis:
         raise HTTPException(404, f"Região '{regiao}' não encontrada.")
-    return {"municipios": munis}
+    return FastJSONResponse({"municipios": munis})
 
 @app.get("/municipios_todos")
-def listar_todos_municipios():
+async def listar_todos_municipios():
     """Lista todos municípios."""
+    async def _build():
+        sql, params = await run_in_threadpool(_listing_query, settings.TABLE_DADOS_FUNDIARIOS, "nome_municipio")
+        rows = await _fetch_all(sql, params)
+        return {"municipios": [r["nome_municipio"] for r in rows]}
+    return await _cached_json_response("municipios_todos", _build)
+
+@app.get("/localidades")
+async def listar_localidades():
+    """
+    Regiões → municípios → camadas, com o número de registros de cada camada
+    no município (tabela de localidades mantida pelos importadores).
+    """
     sql = f"""
-        SELECT DISTINCT nome_municipio
-        FROM {settings.TABLE_DADOS_FUNDIARIOS}
-        WHERE nome_municipio IS NOT NULL
-        ORDER BY nome_municipio
+        SELECT camada, regiao_administrativa, nome_municipio, nome_municipio_norm, total
+        FROM {settings.TABLE_LOCALIDADES}
     """
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql)).fetchall()
-    return {"municipios": [r[0] for r in rows]}
+    async def _build():
+        if not await run_in_threadpool(_lookup_layers):
+            raise HTTPException(404, "Tabela de localidades vazia; execute os importadores.")
+        return {"regioes": group_localidades(await _fetch_all(sql), LOOKUP_LAYERS)}
+    return await _cached_json_response("localidades", _build)
 
 # @app.get("/geojson_muni")
 # def geojson_muni(municipio: str = Query(..., description="Município case-insensitive.")):
@@ -255,319 +1277,596 @@ def listar_todos_municipios():
 #         raise HTTPException(404, f"Município '{municipio}' não encontrado.")
 #     return {"type": "FeatureCollection", "features": features}
 
-@app.get("/geojson_muni")
-def geojson_muni(municipio: str = Query(..., description="Município case-insensitive ou 'todos' para retornar todos os municípios.")):
-    """GeoJSON de município(s). Retorna todos se município='todos'."""
-    geom_expr = _geom_sql()
-    
-    # Construção dinâmica da query SQL
-    if municipio.lower() == "todos":
-        sql = f"""
-            SELECT {geom_expr} AS geom_json,
-                   \"nm_mun\" AS nome_municipio
-            FROM {settings.TABLE_GEOM_MUNICIPIOS};
-        """
-        params = {}
-    else:
-        where = _ci_equals("\"nm_mun\"", "municipio")
-        sql = f"""
-            SELECT {geom_expr} AS geom_json,
-                   \"nm_mun\" AS nome_municipio
-            FROM {settings.TABLE_GEOM_MUNICIPIOS}
-            WHERE {where};
-        """
-        params = {"municipio": municipio}
+def _geojson_muni_query(tolerance: Optional[float], municipio: Optional[str]) -> Tuple[TextClause, Dict[str, Any]]:
+    """
+    Consulta `feature_json` de `/geojson_muni` e o parâmetro do nome: todos os
+    municípios (`municipio` None) ou um. Lê metadados pela engine síncrona.
+    """
+    table = settings.TABLE_GEOM_MUNICIPIOS
+    where, params = "", {}
+    if municipio is not None:
+        clause, params["municipio"] = _name_filter(table, "nm_mun", municipio, "municipio")
+        where = f"WHERE {clause}"
+    level = snap_tolerance(tolerance, table)
+    sql = _statement(table, ("geojson_muni", level, where), lambda: _feature_sql(f"""
+        SELECT {_geom_sql(tolerance=level, table=table)} AS geom_json,
+               \"nm_mun\" AS nome_municipio
+        FROM {table}
+        {where}
+    """, ["nome_municipio"]))
+    return sql, params
 
+def _municipios_topology(municipio: Optional[str], tolerance: Optional[float], quantization: int) -> Dict[str, Any]:
+    """
+    TopoJSON dos municípios (todos se `municipio` for None). Com todos, inclui
+    o objeto 'regioes': cada região fundida a partir dos seus municípios
+    (região de cada município pela tabela de localidades/malha fundiária).
+    """
+    table = settings.TABLE_GEOM_MUNICIPIOS
+    where, params = "", {}
+    if municipio is not None:
+        where = "WHERE " + _name_clause(table, "nm_mun", "municipio")
+        params["municipio"] = _name_value(table, "nm_mun", municipio)
+    sql = f"""
+        SELECT {_geom_wkb_sql(table, tolerance)} AS geometry, "nm_mun" AS nome_municipio
+        FROM {table}
+        {where}
+        ORDER BY "nm_mun"
+    """
     with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), params).mappings().all()
-    
-    features = [row_to_feature(r) for r in rows if r.get('geom_json')]
-    
-    if not features:
-        if municipio.lower() != "todos":
-            raise HTTPException(404, f"Município '{municipio}' não encontrado.")
-        else:
-            raise HTTPException(404, "Nenhum município encontrado na base de dados.")
-    
-    return {
-        "type": "FeatureCollection", 
-        "features": features,
-        "properties": {
-            "total_municipios": len(features) if municipio.lower() == "todos" else 1
+        rows = conn.execute(as_statement(sql), params).all()
+    features = [
+        (shapely.from_wkb(bytes(wkb)) if wkb else None, {"nome_municipio": nome})
+        for wkb, nome in rows
+    ]
+    if not any(geom is not None for geom, _ in features):
+        raise HTTPException(
+            404, f"Município '{municipio}' não encontrado." if municipio
+            else "Nenhum município encontrado na base de dados."
+        )
+    regiao_de = None
+    if municipio is None:
+        regiao_de = {name_key(m): reg for reg in fetch_regioes() for m in fetch_municipios(reg)}
+    topology = build_topology(
+        features, quantization, "municipios",
+        group_by=(lambda props: regiao_de.get(name_key(props["nome_municipio"]))) if regiao_de else None,
+        group_name="regioes", group_property="regiao_administrativa",
+    )
+    topology["properties"] = {"total_municipios": len(features)}
+    return topology
+
+@app.get("/geojson_muni")
+async def geojson_muni(
+    request: Request,
+    municipio: str = Query(..., description="Município case-insensitive ou 'todos' para retornar todos os municípios."),
+    tolerance: Optional[float] = Query(None, description="Tolerância de simplificação da geometria (opcional)"),
+    decimals: Optional[int] = Query(None, description="Número de casas decimais na geometria (opcional)"),
+    format: str = MUNI_FORMAT_QUERY,
+    quantization: Optional[int] = QUANTIZATION_QUERY,
+):
+    """
+    GeoJSON de município(s). Retorna todos se município='todos'. Um município
+    na variante padrão (tolerância e casas decimais) vem do arquivo
+    pré-processado, se houver. Com format=topojson, devolve um Topology (veja
+    `_municipios_topology`), guardado no cache de resultados por versão dos dados.
+    """
+    _check_format(format, GEOJSON_FORMATS + ("topojson",))
+    todos = municipio.lower() == "todos"
+    if format == "topojson":
+        level = snap_tolerance(tolerance, settings.TABLE_GEOM_MUNICIPIOS)
+        quantization = quantization or settings.TOPOJSON_QUANTIZATION
+        entity = "todos" if todos else name_key(municipio)
+        return await _cached_json_response(
+            f"topojson:municipios:{entity}:{level}:{quantization}",
+            lambda: run_in_threadpool(_municipios_topology, None if todos else municipio, level, quantization)
+        )
+    if format == "geojson" and not todos:
+        file_path = _preprocessed_file(
+            "municipio", municipio, settings.TABLE_GEOM_MUNICIPIOS,
+            snap_tolerance(tolerance, settings.TABLE_GEOM_MUNICIPIOS), _geom_params(decimals)["geom_decimals"],
+        )
+        if file_path:
+            return precompressed_response(file_path, request.headers.get("accept-encoding"), GEOJSON_MEDIA_TYPE)
+    sql, params = await run_in_threadpool(_geojson_muni_query, tolerance, None if todos else municipio)
+    params.update(_geom_params(decimals))
+    not_found = (
+        "Nenhum município encontrado na base de dados." if todos
+        else f"Município '{municipio}' não encontrado."
+    )
+    return await _stream_geojson(
+        sql, params, not_found,
+        fmt=format,
+        extra_members=lambda total: {
+            "properties": {"total_municipios": total if todos else 1}
         }
-    }
+    )
 
 @app.get("/geojson")
-def geojson(
+async def geojson(
+    request: Request,
     regiao: str = Query(None),
     municipio: str = Query(None),
     tolerance: Optional[float] = Query(None, description="Tolerância de simplificação da geometria (opcional)"),
     decimals: Optional[int] = Query(None, description="Número de casas decimais na geometria (opcional)"),
-    # limit: int = Query(1000)
+    format: str = COLUMNAR_FORMAT_QUERY,
+    bbox: Optional[str] = BBOX_QUERY,
+    intersects: Optional[str] = INTERSECTS_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
 ):
-    """GeoJSON de região ou município."""
-    if bool(regiao) == bool(municipio):
+    """
+    GeoJSON de região ou município, opcionalmente recortado por bbox/intersects.
+    Também em Arrow IPC, GeoParquet ou FlatGeobuf (`format` ou cabeçalho Accept).
+    """
+    if regiao and municipio:
         raise HTTPException(400, "Informe 'regiao' OU 'municipio'.")
+    if not (regiao or municipio or bbox or intersects):
+        raise HTTPException(400, "Informe 'regiao' OU 'municipio' (ou um filtro 'bbox'/'intersects').")
+    format = _negotiated_format(request, format, GEOJSON_FORMATS + COLUMNAR_FORMATS)
+    filters, filter_params = await run_in_threadpool(
+        _spatial_filter, settings.TABLE_DADOS_FUNDIARIOS, "geometry", bbox, intersects
+    )
     if regiao:
-        return _get_geojson_from_file_or_db(
-            "regiao", regiao,
-            settings.TABLE_DADOS_FUNDIARIOS,
-            'regiao_administrativa',
-            COMMON_PROPERTY_COLUMNS,
-            tolerance=tolerance,
-            decimals=decimals
-        )
-    return _get_geojson_from_file_or_db(
-        "municipio", municipio,
+        entity_type, entity_name, where_column = "regiao", regiao, 'regiao_administrativa'
+    else:
+        entity_type, entity_name, where_column = "municipio", municipio, 'nome_municipio'
+    return await _get_geojson_from_file_or_db(
+        entity_type, entity_name,
         settings.TABLE_DADOS_FUNDIARIOS,
-        'nome_municipio',
+        where_column,
         COMMON_PROPERTY_COLUMNS,
         tolerance=tolerance,
-        decimals=decimals
+        decimals=decimals,
+        fmt=format,
+        filters=filters,
+        filter_params=filter_params,
+        accept_encoding=request.headers.get("accept-encoding"),
+        request=request,
+        limit=limit,
+        cursor=cursor
     )
 
 @app.get("/dados_fundiarios")
-def dados_fundiarios(
+async def dados_fundiarios(
+    request: Request,
     regiao: str = Query(None),
-    municipio: str = Query(None)
+    municipio: str = Query(None),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    format: str = Query("json", description="'json', 'arrow' (Arrow IPC) ou 'parquet'. Sem o parâmetro, vale o cabeçalho Accept."),
 ):
-    """Dados tabulares (sem geometria)."""
+    """
+    Dados tabulares (sem geometria). Com `limit`/`cursor`, devolve uma página
+    {total, limit, next, dados} ordenada por lote_id e o cabeçalho Link.
+    Em Arrow IPC ou Parquet, a página vem só no corpo e `next` no cabeçalho Link.
+    """
     if bool(regiao) == bool(municipio):
         raise HTTPException(400, "Informe 'regiao' OU 'municipio'.")
+    format = _negotiated_format(request, format, ("json", "arrow", "parquet"))
     where, val = (
         ('regiao_administrativa', regiao) if regiao else ('nome_municipio', municipio)
     )
+    table = settings.TABLE_DADOS_FUNDIARIOS
+    clause, value = await run_in_threadpool(_name_filter, table, where, val)
+    clauses, params = [clause], {"param": value}
+    page = await _keyset_page(request, table, "lote_id", clauses, params, limit, cursor)
+    if page:
+        clauses, params = page["clauses"], page["params"]
     props = ", ".join(f'"{c}"' for c in COMMON_PROPERTY_COLUMNS[:-1])
     sql = f"""
         SELECT {props}
-        FROM {settings.TABLE_DADOS_FUNDIARIOS}
-        WHERE {_ci_equals(where, 'param')}
+        FROM {table}
+        WHERE {' AND '.join(clauses)}
+        {page["order_sql"] if page else ""}
     """
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql), {"param": val}).fetchall()
-    if not rows:
-        raise HTTPException(404, "Nenhum dado encontrado.")
-    return [dict(zip(COMMON_PROPERTY_COLUMNS[:-1], r)) for r in rows]
+    if format != "json":
+        return await _stream_columnar(
+            format, f"dados_fundiarios_{val}", sql, params, "Nenhum dado encontrado.",
+            headers=page["headers"] if page else None
+        )
+    async def _build():
+        rows = await _fetch_all(sql, params)
+        if not rows:
+            raise HTTPException(404, "Nenhum dado encontrado.")
+        dados = [dict(r) for r in rows]
+        if not page:
+            return dados
+        return {"total": page["total"], "limit": page["limit"], "next": page["next"], "dados": dados}
+    return await _cached_json_response(
+        _query_key("dados_fundiarios", sql, params), _build,
+        headers=page["headers"] if page else None
+    )
+
+
+# ==================== Estatísticas ====================
+def _has_rows(table: str) -> bool:
+    """Se `table` existe e tem linhas (lido uma vez por versão dos dados)."""
+    def _query():
+        try:
+            with get_engine().connect() as conn:
+                return conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is not None
+        except Exception:
+            return False
+    return _cached_json(f"tabela:{table}", _query)
+
+async def _require_rollups(table: str) -> None:
+    if not await run_in_threadpool(_has_rows, table):
+        raise HTTPException(404, "Estatísticas ainda não calculadas; execute o importador da malha fundiária.")
+
+@app.get("/estatisticas")
+async def estatisticas(
+    agrupar: str = Query(
+        "categoria",
+        description="Dimensões separadas por vírgula: " + ", ".join(DIMENSIONS) + "."
+    ),
+    regiao: Optional[str] = Query(None),
+    municipio: Optional[str] = Query(None),
+    categoria: Optional[str] = Query(None),
+    situacao_juridica: Optional[str] = Query(None),
+    faixa_modulo_fiscal: Optional[str] = Query(None, description="Uma das faixas de `faixas_modulo_fiscal`."),
+):
+    """
+    Número de lotes e área (ha) da malha fundiária agrupados pelas dimensões
+    pedidas, lidos da tabela de agregados calculada na importação (sem
+    varrer a malha). Grupos ordenados pela área, do maior para o menor.
+    """
+    dims = [d.strip() for d in agrupar.split(",") if d.strip()]
+    invalid = [d for d in dims if d not in DIMENSIONS]
+    if invalid or len(set(dims)) != len(dims):
+        raise HTTPException(400, f"'agrupar' inválido; use: {', '.join(DIMENSIONS)}.")
+    table = settings.TABLE_ESTATISTICAS
+    await _require_rollups(table)
+
+    clauses, params = [], {}
+    for column, value in (("regiao_administrativa", regiao), ("nome_municipio", municipio)):
+        if value:
+            clauses.append(f"{key_column(column)} = :{column}")
+            params[column] = name_key(value)
+    for column, value in (
+        ("categoria", categoria), ("situacao_juridica", situacao_juridica),
+        ("faixa_modulo_fiscal", faixa_modulo_fiscal),
+    ):
+        if value:
+            clauses.append(f"{column} = :{column}")
+            params[column] = value
+    columns = [DIMENSIONS[d] for d in dims]
+    select = "".join(f"{c} AS {d}, " for d, c in zip(dims, columns))
+    sql = f"""
+        SELECT {select}SUM(lotes) AS lotes, SUM(area) AS area
+        FROM {table}
+        {"WHERE " + " AND ".join(clauses) if clauses else ""}
+        {"GROUP BY " + ", ".join(columns) if columns else ""}
+        ORDER BY area DESC
+    """
+    async def _build():
+        grupos = [dict(r) for r in await _fetch_all(sql, params)]
+        if clauses and not grupos:
+            raise HTTPException(404, "Nenhum lote para os filtros informados.")
+        return {
+            "agrupar": dims,
+            "faixas_modulo_fiscal": faixa_labels(),
+            "total": {
+                "lotes": sum(g["lotes"] for g in grupos),
+                "area": sum(g["area"] or 0 for g in grupos),
+            },
+            "grupos": grupos,
+        }
+    return await _cached_json_response(_query_key("estatisticas", sql, params), _build)
+
+@app.get("/estatisticas/proprietarios")
+async def estatisticas_proprietarios(
+    regiao: Optional[str] = Query(None),
+    municipio: Optional[str] = Query(None),
+    limite: int = Query(10, ge=1, le=settings.ESTATISTICAS_TOP_N),
+):
+    """
+    Proprietários com mais área (ha) no estado, numa região ou num município,
+    do ranking calculado na importação.
+    """
+    if regiao and municipio:
+        raise HTTPException(400, "Informe 'regiao' OU 'municipio' (ou nenhum, para o estado).")
+    table = settings.TABLE_ESTATISTICAS_PROPRIETARIOS
+    await _require_rollups(table)
+    escopo, chave = (
+        ("municipio", name_key(municipio)) if municipio
+        else ("regiao", name_key(regiao)) if regiao
+        else ("estado", "")
+    )
+    sql = f"""
+        SELECT posicao, nome_proprietario, lotes, area
+        FROM {table}
+        WHERE escopo = :escopo AND chave = :chave AND posicao <= :limite
+        ORDER BY posicao
+    """
+    params = {"escopo": escopo, "chave": chave, "limite": limite}
+    async def _build():
+        rows = await _fetch_all(sql, params)
+        if not rows:
+            raise HTTPException(404, f"Nenhum proprietário para {escopo} '{municipio or regiao}'.")
+        return {"escopo": escopo, "proprietarios": [dict(r) for r in rows]}
+    return await _cached_json_response(_query_key("estatisticas_proprietarios", sql, params), _build)
 
 
 @app.get("/geojson_assentamentos")
-def geojson_assentamentos(
+async def geojson_assentamentos(
+    request: Request,
     municipio: str = Query("todos", description="Filtrar por município ('todos' para todos os municípios)"),
     tolerance: Optional[float] = Query(None, description="Tolerância de simplificação da geometria (opcional)"),
     decimals: Optional[int] = Query(None, description="Número de casas decimais na geometria (opcional)"),
+    bbox: Optional[str] = BBOX_QUERY,
+    intersects: Optional[str] = INTERSECTS_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
 ):
     """
     Retorna todos os assentamentos estaduais do Ceará em formato GeoJSON.
-    Pode ser filtrado por município ou retornar todos quando municipio=todos.
+    Pode ser filtrado por município ou retornar todos quando municipio=todos,
+    recortado por bbox/intersects e paginado por `limit`/`cursor` (chave `id`).
     """
     # Colunas que queremos retornar
-    property_columns = [
-        "cd_sipra", 
-        "nome_municipio", 
-        "nome_assentamento", 
-        "nome_municipio_original", 
-        "area", 
-        "perimetro", 
-        "tipo_assentamento", 
-        "forma_obtecao", 
-        "num_familias"
-    ]
-
-
-    cols = ", ".join(f'"{c}"' for c in property_columns)
-
-    geom_expr = "wkt_geometry"
-
-    if tolerance is not None:
-        geom_expr = f"ST_SimplifyPreserveTopology({geom_expr}, {tolerance})"
-
-    # Adicione 'options' para remover a dimensão Z
-    if decimals is not None:
-        geom_json_expr = f"ST_AsGeoJSON({geom_expr}, maxdecimaldigits := {decimals}, options := 1)"
-    else:
-        geom_json_expr = f"ST_AsGeoJSON({geom_expr}, options := 1)"
-
-    sql = f"""
-        SELECT {geom_json_expr} AS geom_json, {cols}
-        FROM {settings.TABLE_DADOS_ASSENTAMENTOS}
-    """
+    property_columns = ASSENTAMENTOS_PROPERTY_COLUMNS
 
-    params = {}
+    table = settings.TABLE_DADOS_ASSENTAMENTOS
+    clauses, params = await run_in_threadpool(_spatial_filter, table, "geom", bbox, intersects)
 
     if municipio and municipio.lower() != "todos":
-        sql += f" WHERE {_ci_equals('nome_municipio', 'municipio')}"
-        params["municipio"] = municipio
-
-    try:        
-        with get_engine().connect() as conn:
-            rows = conn.execute(text(sql), params).mappings().all()
-    except Exception as e:
-        print(f"Erro ao executar a consulta: {e}")
-
-
-
-
-    features = []
-    for row in rows:
-        if not row.get('geom_json'):
-            continue
+        clause, params["municipio"] = await run_in_threadpool(
+            _name_filter, table, 'nome_municipio', municipio, 'municipio'
+        )
+        clauses.insert(0, clause)
+    if decimals is not None:
+        params["geom_decimals"] = decimals
+    page = await _keyset_page(request, table, "id", clauses, params, limit, cursor)
+    if page:
+        clauses, params = page["clauses"], page["params"]
+    level = snap_tolerance(tolerance, table) if tolerance is not None else None
 
-        try:
-            geom = json.loads(row['geom_json'])           
-            features.append({
-                "type": "Feature",
-                "geometry": geom,
-                "properties": {
-                    "cd_sipra": row.get('cd_sipra'),
-                    "nome_municipio": row.get('nome_municipio'),
-                    "nome_assentamento": row.get('nome_assentamento'),
-                    "nome_municipio_original": row.get('nome_municipio_original'),
-                    "area": row.get('area'),
-                    "perimetro": row.get('perimetro'),
-                    "forma_obtecao": row.get('forma_obtecao'),
-                    "tipo_assentamento": row.get('tipo_assentamento'),
-                    "num_familias": row.get('num_familias')
-                }
-            })
-        except Exception as e:
-            print(f"Erro ao processar feature: {e}")
-            continue
+    def _build() -> str:
+        cols = ", ".join(f'"{c}"' for c in property_columns)
+        if page:
+            cols += f', {page["columns_sql"]}'
 
-    if not features:
-        raise HTTPException(status_code=404, detail=f"Nenhum assentamento encontrado{f' para {municipio}' if municipio != 'todos' else ''}")
-    
+        # Coluna geométrica tipada (2D, válida, com índice GiST) preenchida pelo importador
+        geom_expr = "geom"
+        if level is not None:
+            # Geometria pré-simplificada no nível mais próximo da tolerância pedida
+            geom_expr = simplified_geometry_expr(
+                get_engine(), table, "geom", geom_expr, "ST_SimplifyPreserveTopology", level
+            )
 
-    return {
-        "type": "FeatureCollection",
-        "features": features,
-        "crs": {
-            "type": "name",
-            "properties": {
-                "name": "urn:ogc:def:crs:EPSG::4326"
-            }
-        }
-    } 
+        # Adicione 'options' para remover a dimensão Z
+        if decimals is not None:
+            geom_json_expr = f"ST_AsGeoJSON({geom_expr}, maxdecimaldigits := :geom_decimals, options := 1)"
+        else:
+            geom_json_expr = f"ST_AsGeoJSON({geom_expr}, options := 1)"
 
+        sql = f"""
+            SELECT {geom_json_expr} AS geom_json, {cols}
+            FROM {table}
+        """
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        if page:
+            sql += f" {page['order_sql']}"
+        return _feature_sql(sql, property_columns, strip_nulls=False, ordered=bool(page))
 
-def _ci_equals(column: str, param: str) -> str:
-    return f"LOWER({column}) = LOWER(:{param})"
+    variant = ("geojson", tuple(clauses), level, decimals is not None, bool(page))
+    sql = await run_in_threadpool(_statement, table, variant, _build)
 
-def row_to_feature(row):
-    """Converte uma linha do banco para uma feature GeoJSON, removendo coordenadas 3D se existirem"""
     try:
-        geometry = json.loads(row['geom_json'])       
-        return {
-            "type": "Feature",
-            "geometry": geometry,
-            "properties": {
-                k: v for k, v in row.items() 
-                if k != 'geom_json' and v is not None
-            }
-        }
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Erro ao processar feature: {e}")
-        return None
+        return await _stream_geojson(
+            sql,
+            params,
+            f"Nenhum assentamento encontrado{f' para {municipio}' if municipio != 'todos' else ''}",
+            extra_members=_page_members(page, {"crs": CRS_EPSG_4326}),
+            headers=page["headers"] if page else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Erro geojson_assentamentos: %s", e)
+        raise HTTPException(500, "Erro ao consultar GeoJSON")
 
 @app.get("/assentamentos_municipios")
-def listar_municipios_assentamentos():
+async def listar_municipios_assentamentos():
     """Lista todos os municípios que possuem assentamentos estaduais."""
-    sql = f"""
-        SELECT DISTINCT nome_municipio
-        FROM {settings.TABLE_DADOS_ASSENTAMENTOS}
-        WHERE nome_municipio IS NOT NULL
-        ORDER BY nome_municipio
-    """
-    with get_engine().connect() as conn:
-        rows = conn.execute(text(sql)).fetchall()
-    return {"municipios": [r[0] for r in rows]}
+    async def _build():
+        sql, params = await run_in_threadpool(
+            _listing_query, settings.TABLE_DADOS_ASSENTAMENTOS, "nome_municipio"
+        )
+        rows = await _fetch_all(sql, params)
+        return {"municipios": [r["nome_municipio"] for r in rows]}
+    return await _cached_json_response("assentamentos_municipios", _build)
 
 @app.get("/geojson_reservatorios")
-def geojson_reservatorios(
+async def geojson_reservatorios(
+    request: Request,
     municipio: str = Query("todos", description="Filtrar por município ('todos' pra geral)"),
     tolerance: Optional[float] = Query(0.001, description="Tolerância de simplificação (opc.)"),
     decimals: Optional[int] = Query(4, description="Casas decimais na geometria (opc.)"),
+    bbox: Optional[str] = BBOX_QUERY,
+    intersects: Optional[str] = INTERSECTS_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
 ):
     """
-    Retorna reservatórios em GeoJSON, usando o WKT em `wkt_geom`.
+    Retorna reservatórios em GeoJSON, a partir da coluna `geom` (contorno do
+    WKT ou o ponto x/y, gravado 2D e válido pelo importador).
+    Paginável por `limit`/`cursor` (chave `id`).
     """
-    props = [
-        "id_sagreh", "nome", "proprietario", "gerencia", "reg_hidrog",
-        "nome_municipio", "nome_municipio_original","ini_monito", "ano_constr", "o_barrad",
-        "ac_jusante", "id_ac_jus", "area_ha", "capacid_m3",
-        "cot_vert_m", "lg_vert_m", "cot_td_m", "tipo_verte","ri"
-    ]
-    cols = ", ".join(f'"{c}"' for c in props)
+    props = RESERVATORIOS_PROPERTY_COLUMNS
 
-    # Fonte de geometria: WKT
-    geom_expr = "ST_GeomFromText(wkt_geom, 4326)"
-    if tolerance is not None:
-        geom_expr = f"ST_SimplifyPreserveTopology({geom_expr}, {tolerance})"
-
-    # Gera GeoJSON
+    table = settings.TABLE_DADOS_RESERVATORIOS
+    clauses, params = await run_in_threadpool(_spatial_filter, table, "geom", bbox, intersects)
+    if municipio.lower() != "todos":
+        clause, params["municipio"] = await run_in_threadpool(
+            _name_filter, table, "nome_municipio", municipio, "municipio"
+        )
+        clauses.insert(0, clause)
     if decimals is not None:
-        geojson_expr = f"ST_AsGeoJSON({geom_expr}, {decimals})"
-    else:
-        geojson_expr = f"ST_AsGeoJSON({geom_expr})"
+        params["geom_decimals"] = decimals
+    page = await _keyset_page(request, table, "id", clauses, params, limit, cursor)
+    if page:
+        clauses, params = page["clauses"], page["params"]
+    level = snap_tolerance(tolerance, table) if tolerance is not None else None
 
-    sql = f"""
-    SELECT
-        {geojson_expr} AS geom_json,
-        {cols}
-      FROM {settings.TABLE_DADOS_RESERVATORIOS}
-    """
-    params = {}
-    if municipio.lower() != "todos":
-        sql += " WHERE " + _ci_equals("nome_municipio", "municipio")
-        params["municipio"] = municipio
+    def _build() -> str:
+        cols = ", ".join(f'"{c}"' for c in props)
+        if page:
+            cols += f', {page["columns_sql"]}'
+
+        geom_expr = "geom"
+        if level is not None:
+            # Geometria pré-simplificada no nível mais próximo da tolerância pedida
+            geom_expr = simplified_geometry_expr(
+                get_engine(), table, "geom", geom_expr, "ST_SimplifyPreserveTopology", level
+            )
+
+        # Gera GeoJSON
+        if decimals is not None:
+            geojson_expr = f"ST_AsGeoJSON({geom_expr}, :geom_decimals)"
+        else:
+            geojson_expr = f"ST_AsGeoJSON({geom_expr})"
+
+        sql = f"""
+        SELECT
+            {geojson_expr} AS geom_json,
+            {cols}
+          FROM {table}
+        """
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if page:
+            sql += f" {page['order_sql']}"
+        return _feature_sql(sql, props, strip_nulls=False, ordered=bool(page))
+
+    variant = ("geojson", tuple(clauses), level, decimals is not None, bool(page))
+    sql = await run_in_threadpool(_statement, table, variant, _build)
 
     try:
-        with get_engine().connect() as conn:
-            rows = conn.execute(text(sql), params).mappings().all()
+        return await _stream_geojson(
+            sql,
+            params,
+            f"Nenhum reservatório para '{municipio}'",
+            extra_members=_page_members(page, {"crs": CRS_EPSG_4326}),
+            allow_empty=municipio.lower() == "todos",
+            headers=page["headers"] if page else None
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Erro geojson_reservatorios: %s", e)
         raise HTTPException(500, "Erro ao consultar GeoJSON")
 
-    features = []
-    for row in rows:
-        geom_json = row.get("geom_json")
-        if not geom_json:
-            continue
+@app.get("/reservatorios_municipios")
+async def listar_municipios_reservatorios():
+    """Lista municípios que têm reservatórios (coluna nome_municipio)."""
+    async def _build():
         try:
-            features.append({
-                "type": "Feature",
-                "geometry": json.loads(geom_json),
-                "properties": {k: row[k] for k in props}
-            })
+            sql, params = await run_in_threadpool(
+                _listing_query, settings.TABLE_DADOS_RESERVATORIOS, "nome_municipio"
+            )
+            municipios = [r["nome_municipio"] for r in await _fetch_all(sql, params)]
         except Exception as e:
-            logger.warning("Feature inválida ignorada: %s", e)
-            continue
-
-    if not features and municipio.lower() != "todos":
-        raise HTTPException(404, f"Nenhum reservatório para '{municipio}'")
-
-    return {
-        "type": "FeatureCollection",
-        "features": features,
-        "crs": {
-            "type": "name",
-            "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}
-        }
-    }
+            logger.error("Erro listar_municipios_reservatorios: %s", e)
+            raise HTTPException(500, "Erro ao listar municípios")
+        return {"municipios": municipios}
+    return await _cached_json_response("reservatorios_municipios", _build)
 
-@app.get("/reservatorios_municipios")
-def listar_municipios_reservatorios():
-    """Lista municípios que têm reservatórios (coluna nome_municipio)."""
-    sql = f"""
-      SELECT DISTINCT nome_municipio
-        FROM {settings.TABLE_DADOS_RESERVATORIOS}
-       WHERE nome_municipio IS NOT NULL
-    ORDER BY nome_municipio
+@app.get("/reservatorios/proximos")
+async def reservatorios_proximos(
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude (EPSG:4326)."),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude (EPSG:4326)."),
+    lote_id: Optional[int] = Query(None, description="Lote da malha fundiária, no lugar de lat/lon."),
+    k: int = Query(5, ge=1, le=settings.RESERVATORIOS_PROXIMOS_MAX_K, description="Quantidade de reservatórios."),
+):
+    """
+    Os k reservatórios monitorados mais próximos de um ponto ou de um lote,
+    do mais próximo ao mais distante, com a distância em metros e a
+    capacidade (capacid_m3). Para muitos lotes de uma vez, use a tabela
+    pré-calculada TABLE_LOTES_RESERVATORIOS.
     """
+    por_ponto = lat is not None and lon is not None
+    if (lat is None) != (lon is None) or por_ponto == (lote_id is not None):
+        raise HTTPException(400, "Informe lat e lon ou lote_id.")
     try:
-        with get_engine().connect() as conn:
-            municipios = conn.execute(text(sql)).scalars().all()
+        reservatorios = await _nearest_reservoirs(lon, lat, lote_id, k)
     except Exception as e:
-        logger.error("Erro listar_municipios_reservatorios: %s", e)
-        raise HTTPException(500, "Erro ao listar municípios")
+        logger.error("Erro reservatorios_proximos: %s", e)
+        raise HTTPException(500, "Erro ao buscar reservatórios próximos")
+    if reservatorios is None:
+        raise HTTPException(404, f"Lote {lote_id} não encontrado.")
+    origem = {"lote_id": lote_id} if lote_id is not None else {"lon": lon, "lat": lat}
+    return FastJSONResponse({**origem, "k": k, "reservatorios": reservatorios})
+
+@app.get("/lookup")
+async def lookup(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude (EPSG:4326)."),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude (EPSG:4326)."),
+):
+    """
+    O que há no ponto: lote da malha fundiária (com as propriedades de
+    /geojson), município, região administrativa e assentamento, se houver.
+    """
+    return FastJSONResponse((await run_in_threadpool(_lookup_points, [(lon, lat)]))[0])
+
+@app.post("/lookup")
+async def lookup_pontos(
+    pontos: List[List[float]] = Body(..., embed=True, description="Pontos [lon, lat] em EPSG:4326."),
+):
+    """Como GET /lookup, para vários pontos por chamada (até LOOKUP_MAX_POINTS), na mesma ordem."""
+    if len(pontos) > settings.LOOKUP_MAX_POINTS:
+        raise HTTPException(400, f"Máximo de {settings.LOOKUP_MAX_POINTS} pontos por chamada.")
+    if any(len(p) != 2 or not (-180 <= p[0] <= 180 and -90 <= p[1] <= 90) for p in pontos):
+        raise HTTPException(400, "Cada ponto deve ser [lon, lat] em EPSG:4326.")
+    points = [(lon, lat) for lon, lat in pontos]
+    return FastJSONResponse({"resultados": await run_in_threadpool(_lookup_points, points)})
+
+def _layer_srids(layers: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    """SRID da coluna geométrica de cada camada (engine síncrona; chame via threadpool)."""
+    return {n: table_srid(get_engine(), layer["table"], layer["geom_column"]) for n, layer in layers.items()}
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def tile_mvt(
+    z: int,
+    x: int,
+    y: int,
+    layers: Optional[str] = Query(
+        None,
+        description=f"Camadas separadas por vírgula ({', '.join(TILE_LAYERS)}). Padrão: todas."
+    ),
+):
+    """
+    Tile vetorial (Mapbox Vector Tile) da malha fundiária, assentamentos e
+    reservatórios. Os tiles são guardados em cache em disco por versão dos dados.
+    """
+    if settings.DATABASE_TYPE != DatabaseType.POSTGRES:
+        raise HTTPException(501, "Tiles vetoriais exigem PostgreSQL/PostGIS.")
+    if not (0 <= z <= settings.TILE_MAX_ZOOM) or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(400, "Coordenadas de tile inválidas.")
+
+    names = sorted({n.strip() for n in layers.split(",") if n.strip()}) if layers else sorted(TILE_LAYERS)
+    unknown = [n for n in names if n not in TILE_LAYERS]
+    if unknown or not names:
+        raise HTTPException(400, f"Camadas inválidas: {', '.join(unknown)}. Use: {', '.join(TILE_LAYERS)}.")
+
+    version, _ = await run_in_threadpool(get_data_version, get_engine())
+    cache = get_tile_cache()
+    key = "+".join(names)
+    tile = await run_in_threadpool(cache.get, version, key, z, x, y)
+    if tile is None:
+        selected = {n: TILE_LAYERS[n] for n in names}
+        try:
+            if settings.DATABASE_ASYNC:
+                srids = await run_in_threadpool(_layer_srids, selected)
+                tile = await arender_tile(get_async_engine(), srids, selected, z, x, y)
+            else:
+                tile = await run_in_threadpool(render_tile, get_engine(), selected, z, x, y)
+        except Exception as e:
+            logger.error("Erro tile_mvt: %s", e)
+            raise HTTPException(500, "Erro ao gerar tile")
+        await run_in_threadpool(cache.put, version, key, z, x, y, tile)
 
-    return {"municipios": municipios}
+    if not tile:
+        return Response(status_code=204)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE)
@@ -0,0 +1,111 @@
+# data_service/manifest.py
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Muda quando o formato dos arquivos pré-processados muda (força regerar tudo)
+MANIFEST_FORMAT = 2
+MANIFEST_NAME = "manifest.json"
+
+
+def row_fingerprints(
+    rows: Iterable[Tuple[Any, ...]],
+    key_of: Callable[[Tuple[Any, ...]], str],
+    salt: str = "",
+) -> Dict[str, str]:
+    """
+    Assinatura de conteúdo por entidade: soma (mod 2⁶⁴) de um hash de cada
+    linha, mais a contagem. Independe da ordem das linhas, então a consulta
+    não precisa de ORDER BY. `salt` entra em todas as assinaturas (ex.:
+    parâmetros que mudam a saída, como casas decimais e tolerância).
+    """
+    acc: Dict[str, list] = {}
+    for row in rows:
+        digest = hashlib.blake2b(repr(tuple(row)).encode("utf-8"), digest_size=8).digest()
+        entry = acc.setdefault(key_of(row), [0, 0])
+        entry[0] = (entry[0] + int.from_bytes(digest, "big")) % (1 << 64)
+        entry[1] += 1
+    return {
+        key: hashlib.sha1(f"{salt}|{count}|{total}".encode("utf-8")).hexdigest()
+        for key, (total, count) in acc.items()
+    }
+
+
+class PreprocessManifest:
+    """
+    Manifesto de um snapshot do pré-processamento (`manifest.json` dentro do
+    diretório): versão de cada camada em `versao_dados` na execução que o
+    gerou e, por entidade ('regiao:<chave>', 'municipio:<chave>'), a
+    assinatura do conteúdo de origem e o nome do arquivo. Uma entidade só é
+    regerada quando a assinatura muda ou o arquivo sumiu. Sem diretório
+    (nenhum snapshot publicado), o manifesto começa vazio.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+        self.data: Dict[str, Any] = {"formato": MANIFEST_FORMAT, "camadas": {}, "entidades": {}}
+        if directory is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("formato") == MANIFEST_FORMAT:
+            self.data = data
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def moved_to(self, directory: str) -> "PreprocessManifest":
+        """Cópia do manifesto para um novo snapshot (os arquivos são ligados à parte)."""
+        manifest = PreprocessManifest(None)
+        manifest.directory = directory
+        manifest.data = json.loads(json.dumps(self.data))
+        return manifest
+
+    @property
+    def layers(self) -> Dict[str, int]:
+        return self.data["camadas"]
+
+    @layers.setter
+    def layers(self, value: Dict[str, int]) -> None:
+        self.data["camadas"] = dict(value)
+
+    @property
+    def entities(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["entidades"]
+
+    def signature(self, entity_id: str) -> Optional[str]:
+        entry = self.entities.get(entity_id)
+        return entry["assinatura"] if entry else None
+
+    def is_current(self, entity_id: str, signature: Optional[str] = None) -> bool:
+        """Entidade já gerada (arquivo presente) e, se dada, com a mesma assinatura."""
+        entry = self.entities.get(entity_id)
+        if not entry or self.directory is None:
+            return False
+        if not os.path.isfile(os.path.join(self.directory, entry["arquivo"])):
+            return False
+        return signature is None or entry["assinatura"] == signature
+
+    def record(self, entity_id: str, signature: str, filename: str) -> None:
+        self.entities[entity_id] = {
+            "assinatura": signature,
+            "arquivo": filename,
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def forget(self, entity_id: str) -> Optional[str]:
+        entry = self.entities.pop(entity_id, None)
+        return entry["arquivo"] if entry else None
+
+    def save(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,97 @@
+# data_service/names.py
+
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, Optional
+from urllib.parse import unquote
+
+from sqlalchemy import text
+
+# Sufixo da coluna com a chave normalizada (ex.: nome_municipio → nome_municipio_norm)
+KEY_SUFFIX = "_norm"
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def name_key(value: Optional[str]) -> Optional[str]:
+    """
+    Chave canônica de um nome de região/município: decodifica %XX, remove
+    acentos, minúsculas, e troca qualquer sequência de espaços, '_' ou
+    pontuação por um espaço. 'Juazeiro%20do%20Norte', 'juazeiro_do_norte' e
+    'JUAZEIRO DO NORTE' viram 'juazeiro do norte'.
+    """
+    if value is None:
+        return None
+    value = unicodedata.normalize("NFKD", unquote(str(value)))
+    value = value.encode("ASCII", "ignore").decode().lower()
+    return _NON_ALNUM.sub(" ", value).strip()
+
+
+def key_column(column: str) -> str:
+    return column.strip('"') + KEY_SUFFIX
+
+
+def file_key(value: str) -> str:
+    """Chave usada nos nomes dos arquivos pré-processados (sem espaços)."""
+    return name_key(value).replace(" ", "_")
+
+
+def is_sqlite(conn) -> bool:
+    return isinstance(conn, sqlite3.Connection) or conn.dialect.name == "sqlite"
+
+
+def run_sql(conn, sql: str, params=None):
+    """Executa `sql` numa Connection do SQLAlchemy ou numa sqlite3.Connection."""
+    if isinstance(conn, sqlite3.Connection):
+        return conn.execute(sql, params or {})
+    return conn.execute(text(sql), params or {})
+
+
+def run_sql_many(conn, sql: str, rows) -> None:
+    """Como `run_sql`, para uma lista de parâmetros (executemany)."""
+    if not rows:
+        return
+    if isinstance(conn, sqlite3.Connection):
+        conn.executemany(sql, rows)
+    else:
+        conn.execute(text(sql), rows)
+
+
+def build_name_keys(conn, table: str, columns: Iterable[str]) -> None:
+    """
+    Cria e preenche `<coluna>_norm` (chave de `name_key`) para cada coluna de
+    nome, com índice B-tree, para que os filtros da API sejam igualdades
+    indexadas. Aceita uma Connection do SQLAlchemy (Postgres ou SQLite) ou
+    uma sqlite3.Connection (SpatiaLite). Só os valores distintos passam pelo
+    Python; a tabela é atualizada num único UPDATE.
+    """
+    sqlite = is_sqlite(conn)
+    existing = set()
+    if sqlite:
+        existing = {row[1] for row in run_sql(conn, f"PRAGMA table_info({table})").fetchall()}
+    for column in columns:
+        key = key_column(column)
+        if sqlite:
+            if key not in existing:
+                run_sql(conn, f'ALTER TABLE {table} ADD COLUMN "{key}" TEXT')
+        else:
+            run_sql(conn, f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "{key}" TEXT')
+        values = [
+            row[0] for row in
+            run_sql(conn, f'SELECT DISTINCT "{column}" FROM {table} WHERE "{column}" IS NOT NULL').fetchall()
+        ]
+        # Mapa valor → chave numa tabela temporária e um único UPDATE (uma passada na tabela)
+        run_sql(conn, "DROP TABLE IF EXISTS tmp_name_keys")
+        run_sql(conn, "CREATE TEMPORARY TABLE tmp_name_keys (value TEXT PRIMARY KEY, key TEXT)")
+        run_sql_many(
+            conn, "INSERT INTO tmp_name_keys (value, key) VALUES (:value, :key)",
+            [{"value": v, "key": name_key(v)} for v in values]
+        )
+        run_sql(
+            conn,
+            f'UPDATE {table} SET "{key}" = '
+            f'(SELECT k.key FROM tmp_name_keys k WHERE k.value = {table}."{column}")'
+        )
+        run_sql(conn, "DROP TABLE tmp_name_keys")
+        run_sql(conn, f'CREATE INDEX IF NOT EXISTS idx_{table}_{key} ON {table} ("{key}")')
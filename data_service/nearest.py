@@ -0,0 +1,145 @@
+# data_service/nearest.py
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import shapely
+
+from config import settings
+
+from .names import is_sqlite, run_sql
+
+# Raio médio da Terra (m), para a distância de haversine do índice em memória
+EARTH_RADIUS_M = 6371008.8
+
+# O `<->` ordena pela distância planar em graus; a ordem final é pela distância
+# geodésica (m). Buscar alguns candidatos a mais pelo índice GiST cobre a
+# diferença entre as duas ordens (pequena na latitude do Ceará).
+KNN_CANDIDATE_FACTOR = 4
+
+# Colunas de cada reservatório devolvidas com a distância
+NEAREST_COLUMNS = ["id_sagreh", "nome", "nome_municipio", "capacid_m3", "area_ha"]
+
+
+def _candidates_sql(table: str, srid: int, columns: Sequence[str], origin_sql: str) -> str:
+    """
+    Os :candidatos reservatórios mais próximos de `origin_sql` (geometria em
+    EPSG:4326) pelo `<->` sobre `geom` (KNN pelo índice GiST), com a distância
+    geodésica em metros.
+    """
+    origin_in_table = origin_sql if srid == 4326 else f"ST_Transform({origin_sql}, {srid})"
+    geom_4326 = "r.geom" if srid == 4326 else "ST_Transform(r.geom, 4326)"
+    cols = ", ".join(f'r."{c}"' for c in columns)
+    return f"""
+        SELECT {cols}, ST_Distance({geom_4326}::geography, ({origin_sql})::geography) AS distancia_m
+        FROM {table} r
+        WHERE r.geom IS NOT NULL
+        ORDER BY r.geom <-> {origin_in_table}
+        LIMIT :candidatos
+    """
+
+
+def nearest_sql(table: str, srid: int, origin_sql: str, columns: Sequence[str] = NEAREST_COLUMNS) -> str:
+    """
+    Consulta PostGIS dos :k reservatórios mais próximos de `origin_sql`, em
+    ordem de distância. `origin_sql` deve ser constante na consulta (parâmetros
+    ou subconsulta não correlacionada) para o planner usar o índice no `<->`.
+    """
+    return f"""
+        SELECT * FROM ({_candidates_sql(table, srid, columns, origin_sql)}) c
+        ORDER BY c.distancia_m
+        LIMIT :k
+    """
+
+
+def nearest_params(k: int) -> Dict[str, int]:
+    return {"k": k, "candidatos": k * KNN_CANDIDATE_FACTOR}
+
+
+class ReservoirIndex:
+    """
+    Reservatórios em memória para o SQLite (sem KNN no SpatiaLite): um ponto
+    interior de cada geometria (EPSG:4326) e as colunas de NEAREST_COLUMNS.
+    Com algumas centenas de reservatórios monitorados, a haversine vetorizada
+    sobre todos é exata e mais barata que montar uma árvore.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], geoms: Sequence):
+        points = shapely.point_on_surface(np.asarray(geoms, dtype=object))
+        self.rows = [dict(r) for r in rows]
+        self.lon = np.radians(shapely.get_x(points))
+        self.lat = np.radians(shapely.get_y(points))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def nearest(self, lon: float, lat: float, k: int) -> List[Dict[str, Any]]:
+        """Os `k` reservatórios mais próximos de (lon, lat), com `distancia_m`, em ordem."""
+        if not self.rows:
+            return []
+        lon, lat = np.radians(lon), np.radians(lat)
+        h = (np.sin((self.lat - lat) / 2) ** 2
+             + np.cos(lat) * np.cos(self.lat) * np.sin((self.lon - lon) / 2) ** 2)
+        dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+        k = min(k, len(self.rows))
+        order = np.argpartition(dist, k - 1)[:k]
+        order = order[np.argsort(dist[order], kind="stable")]
+        return [{**self.rows[i], "distancia_m": float(dist[i])} for i in order.tolist()]
+
+
+def _srid(conn, table: str, column: str) -> Optional[int]:
+    row = run_sql(conn, "SELECT Find_SRID(current_schema()::text, :t, :c)", {"t": table, "c": column}).first()
+    return int(row[0]) if row and row[0] else None
+
+
+def refresh_nearest_reservoirs(
+    conn,
+    lotes_table: Optional[str] = None,
+    reservatorios_table: Optional[str] = None,
+    k: Optional[int] = None,
+) -> int:
+    """
+    Recria a tabela TABLE_LOTES_RESERVATORIOS com os `k`
+    (RESERVATORIOS_PROXIMOS_POR_LOTE) reservatórios mais próximos de cada lote
+    da malha: lote_id, posicao (1 = o mais próximo), id_sagreh, nome,
+    capacid_m3 e distancia_m (do contorno do lote, geodésica). Análises em lote
+    passam a ser um JOIN por lote_id. Roda nos importadores de reservatórios e
+    da malha, na mesma transação de `bump_data_version`; só no PostgreSQL, e
+    não faz nada se uma das tabelas ainda não existir ou se `k` for 0.
+    Retorna o número de linhas gravadas.
+    """
+    lotes_table = lotes_table or settings.TABLE_DADOS_FUNDIARIOS
+    reservatorios_table = reservatorios_table or settings.TABLE_DADOS_RESERVATORIOS
+    k = settings.RESERVATORIOS_PROXIMOS_POR_LOTE if k is None else k
+    if k <= 0 or is_sqlite(conn):
+        return 0
+    exists = run_sql(
+        conn, "SELECT to_regclass(:l) IS NOT NULL AND to_regclass(:r) IS NOT NULL",
+        {"l": lotes_table, "r": reservatorios_table},
+    ).scalar()
+    if not exists:
+        return 0
+
+    lotes_srid = _srid(conn, lotes_table, "geometry")
+    origin = "l.geometry" if lotes_srid == 4326 else "ST_Transform(l.geometry, 4326)"
+    candidates = _candidates_sql(
+        reservatorios_table, _srid(conn, reservatorios_table, "geom") or 4326,
+        ["id_sagreh", "nome", "capacid_m3"], origin,
+    )
+    table = settings.TABLE_LOTES_RESERVATORIOS
+    run_sql(conn, f"DROP TABLE IF EXISTS {table}")
+    run_sql(conn, f"""
+        CREATE TABLE {table} AS
+        SELECT l.lote_id, c.posicao, c.id_sagreh, c.nome, c.capacid_m3, c.distancia_m
+        FROM {lotes_table} l
+        CROSS JOIN LATERAL (
+            SELECT row_number() OVER (ORDER BY d.distancia_m) AS posicao, d.*
+            FROM ({candidates}) d
+            ORDER BY d.distancia_m
+            LIMIT :k
+        ) c
+        WHERE l.geometry IS NOT NULL
+    """, nearest_params(k))
+    run_sql(conn, f"CREATE INDEX idx_{table}_lote ON {table} (lote_id, posicao)")
+    run_sql(conn, f"CREATE INDEX idx_{table}_reservatorio ON {table} (id_sagreh)")
+    return run_sql(conn, f"SELECT COUNT(*) FROM {table}").scalar()
@@ -0,0 +1,88 @@
+# data_service/pagination.py
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import URL
+
+from config import DatabaseType
+
+
+def encode_cursor(key: Any, tie: Any) -> str:
+    """
+    Cursor opaco (base64 URL-safe) com a chave e o desempate da última linha
+    da página atual; a próxima página começa depois dela.
+    """
+    raw = json.dumps({"k": key, "t": tie}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """Inverso de `encode_cursor`: (chave, desempate). Lança ValueError se o cursor for inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return data["k"], data["t"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("cursor inválido") from e
+
+
+def _tiebreak(table: str, dialect: DatabaseType) -> Tuple[str, str, str]:
+    """
+    Desempate único da ordem da página, para chaves repetidas: a posição física
+    da linha (ctid no PostgreSQL, rowid no SQLite). Devolve a expressão, a
+    mesma em forma serializável (cursor) e a comparação com `:page_tie`.
+    """
+    if dialect == DatabaseType.SQLITE:
+        return f"{table}.rowid", f"{table}.rowid", f"{table}.rowid > :page_tie"
+    return f"{table}.ctid", f"{table}.ctid::text", f"{table}.ctid > CAST(CAST(:page_tie AS text) AS tid)"
+
+
+def keyset_columns_sql(table: str, key_column: str, dialect: DatabaseType) -> str:
+    """Colunas `page_key` e `page_tie` que a consulta da página deve trazer (ordem externa)."""
+    tie, _, _ = _tiebreak(table, dialect)
+    return f'{table}."{key_column}" AS page_key, {tie} AS page_tie'
+
+
+def keyset_order_sql(table: str, key_column: str, dialect: DatabaseType) -> str:
+    """ORDER BY/LIMIT da página (usa o parâmetro `:page_size`)."""
+    tie, _, _ = _tiebreak(table, dialect)
+    return f'ORDER BY {table}."{key_column}", {tie} LIMIT :page_size'
+
+
+def keyset_sql(
+    table: str,
+    key_column: str,
+    clauses: List[str],
+    params: Dict[str, Any],
+    after: Optional[Tuple[Any, Any]],
+    dialect: DatabaseType,
+) -> Tuple[List[str], Dict[str, Any], str]:
+    """
+    Cláusulas e parâmetros da página que começa depois de `after` (chave,
+    desempate), e a consulta da última linha da página (índice na
+    coluna-chave, sem ler as demais colunas): ela devolve duas linhas só se
+    houver página seguinte. A consulta usa o parâmetro `:page_offset`
+    (tamanho da página - 1). O `>=` na chave mantém a busca pelo índice; o
+    desempate só é avaliado nas linhas com a mesma chave do cursor.
+    """
+    tie, tie_value, tie_after = _tiebreak(table, dialect)
+    key = f'{table}."{key_column}"'
+    clauses = list(clauses)
+    params = dict(params)
+    if after is not None:
+        clauses.append(f"{key} >= :page_start AND ({key} > :page_start OR {tie_after})")
+        params["page_start"], params["page_tie"] = after
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    last_row_sql = (
+        f"SELECT {key} AS page_key, {tie_value} AS page_tie FROM {table} {where} "
+        f"ORDER BY {key}, {tie} LIMIT 2 OFFSET :page_offset"
+    )
+    return clauses, params, last_row_sql
+
+
+def page_link(url: URL, cursor: str) -> str:
+    """Link relativo (caminho + query) para a página do `cursor`."""
+    nxt = url.include_query_params(cursor=cursor)
+    return f"{nxt.path}?{nxt.query}"
@@ -0,0 +1,86 @@
+# data_service/precompressed.py
+
+import gzip
+import os
+import threading
+from typing import Dict, Optional
+
+import brotli
+from fastapi.responses import FileResponse
+
+from config import settings
+
+# Codificações com cópia pré-comprimida em disco, em ordem de preferência
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Um nome por thread: commits concorrentes do ArtifactCache no mesmo worker
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_precompressed(path: str) -> None:
+    """Gera as cópias `<path>.gz` e `<path>.br` de um arquivo pré-processado."""
+    with open(path, "rb") as f:
+        data = f.read()
+    _write_atomic(
+        path + PRECOMPRESSED_SUFFIXES["gzip"],
+        gzip.compress(data, compresslevel=settings.PRECOMPRESS_GZIP_LEVEL, mtime=0)
+    )
+    _write_atomic(
+        path + PRECOMPRESSED_SUFFIXES["br"],
+        brotli.compress(data, quality=settings.PRECOMPRESS_BROTLI_QUALITY)
+    )
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Interpreta `Accept-Encoding` em {codificação: q}."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe 'br' ou 'gzip' conforme `Accept-Encoding` (None = sem compressão)."""
+    accepted = _accepted(accept_encoding or "")
+    best, best_q = None, 0.0
+    for encoding in PRECOMPRESSED_SUFFIXES:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def precompressed_response(
+    path: str,
+    accept_encoding: Optional[str],
+    media_type: str,
+) -> FileResponse:
+    """
+    Devolve o arquivo (ou sua cópia comprimida aceita pelo cliente) como
+    FileResponse: os bytes saem do disco sem parse nem recompressão.
+    Com `Content-Encoding` já definido, os middlewares GZip/Brotli não atuam.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding:
+        compressed = path + PRECOMPRESSED_SUFFIXES[encoding]
+        if os.path.isfile(compressed):
+            headers["Content-Encoding"] = encoding
+            return FileResponse(compressed, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,47 @@
+# data_service/preprocess.py
+"""
+Runner dedicado do pré-processamento GeoJSON, fora dos workers da API:
+
+    python -m data_service.preprocess              # roda uma vez e imprime o relatório
+    python -m data_service.preprocess --forcar     # regera tudo
+    python -m data_service.preprocess --se-importado
+    python -m data_service.preprocess --agendar    # processo contínuo (diário + checagem)
+
+Usa o mesmo lock de `run_preprocess`, então pode conviver com a API.
+"""
+
+import argparse
+import json
+import sys
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from .main import logger, run_preprocess, schedule_preprocess
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pré-processamento dos GeoJSON de regiões e municípios.")
+    parser.add_argument("--forcar", action="store_true", help="regera todas as entidades")
+    parser.add_argument("--se-importado", action="store_true",
+                        help="só roda se alguma camada mudou de versão desde a última execução")
+    parser.add_argument("--agendar", action="store_true",
+                        help="fica em execução com o agendamento diário e a checagem de importações")
+    args = parser.parse_args(argv)
+
+    if args.agendar:
+        scheduler = BlockingScheduler()
+        schedule_preprocess(scheduler)
+        logger.info("Runner de pré-processamento agendado")
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        return 0
+
+    report = run_preprocess(forcar=args.forcar, somente_se_importado=args.se_importado)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# data_service/rollups.py
+
+from typing import List, Optional, Sequence
+
+from config import settings
+
+from .names import key_column, name_key, run_sql, run_sql_many
+
+# Dimensões do agregado: nome na API → coluna da tabela de estatísticas
+DIMENSIONS = {
+    "regiao": "regiao_administrativa",
+    "municipio": "nome_municipio",
+    "categoria": "categoria",
+    "situacao_juridica": "situacao_juridica",
+    "faixa_modulo_fiscal": "faixa_modulo_fiscal",
+}
+
+# Escopos do ranking de proprietários (coluna da malha que define o grupo)
+RANKING_SCOPES = {
+    "estado": None,
+    "regiao": "regiao_administrativa",
+    "municipio": "nome_municipio",
+}
+
+SEM_INFORMACAO = "sem informação"
+
+
+def _fmt(value: float) -> str:
+    return f"{value:g}"
+
+
+def faixa_labels(limits: Optional[Sequence[float]] = None) -> List[str]:
+    """Rótulos das faixas de módulo fiscal, na ordem (sem a faixa 'sem informação')."""
+    limits = sorted(settings.ESTATISTICAS_FAIXAS_MODULO_FISCAL if limits is None else limits)
+    if not limits:
+        return ["todos"]
+    labels = [f"< {_fmt(limits[0])}"]
+    labels += [f"{_fmt(lo)}-{_fmt(hi)}" for lo, hi in zip(limits, limits[1:])]
+    labels.append(f">= {_fmt(limits[-1])}")
+    return labels
+
+
+def faixa_sql(column: str = "modulo_fiscal", limits: Optional[Sequence[float]] = None) -> str:
+    """CASE que classifica `column` nas faixas de `faixa_labels`."""
+    limits = sorted(settings.ESTATISTICAS_FAIXAS_MODULO_FISCAL if limits is None else limits)
+    labels = faixa_labels(limits)
+    whens = "".join(
+        f" WHEN {column} < {float(limit)!r} THEN '{label}'" for limit, label in zip(limits, labels)
+    )
+    return f"CASE WHEN {column} IS NULL THEN '{SEM_INFORMACAO}'{whens} ELSE '{labels[-1]}' END"
+
+
+def _create_tables_sql() -> List[str]:
+    stats = settings.TABLE_ESTATISTICAS
+    owners = settings.TABLE_ESTATISTICAS_PROPRIETARIOS
+    regiao_norm = key_column("regiao_administrativa")
+    municipio_norm = key_column("nome_municipio")
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {stats} (
+            regiao_administrativa VARCHAR(255),
+            {regiao_norm} VARCHAR(255),
+            nome_municipio VARCHAR(255),
+            {municipio_norm} VARCHAR(255),
+            categoria VARCHAR(100),
+            situacao_juridica VARCHAR(255),
+            faixa_modulo_fiscal VARCHAR(50),
+            lotes BIGINT NOT NULL,
+            area DOUBLE PRECISION
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{stats}_regiao ON {stats} ({regiao_norm})",
+        f"CREATE INDEX IF NOT EXISTS idx_{stats}_municipio ON {stats} ({municipio_norm})",
+        f"""
+        CREATE TABLE IF NOT EXISTS {owners} (
+            escopo VARCHAR(20) NOT NULL,
+            chave VARCHAR(255) NOT NULL,
+            posicao INTEGER NOT NULL,
+            nome_proprietario VARCHAR(255) NOT NULL,
+            lotes BIGINT NOT NULL,
+            area DOUBLE PRECISION
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_{owners}_escopo ON {owners} (escopo, chave, posicao)",
+    ]
+
+
+def _ranking_sql(table: str, column: Optional[str], top_n: int) -> str:
+    group = f'"{column}"' if column else "''"
+    return f"""
+        SELECT grupo, nome_proprietario, lotes, area, posicao FROM (
+            SELECT {group} AS grupo, nome_proprietario, COUNT(*) AS lotes, SUM(area) AS area,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY {group} ORDER BY SUM(area) DESC, nome_proprietario
+                   ) AS posicao
+            FROM {table}
+            WHERE nome_proprietario IS NOT NULL AND area IS NOT NULL
+            {f'AND "{column}" IS NOT NULL' if column else ""}
+            GROUP BY {group}, nome_proprietario
+        ) ranking
+        WHERE posicao <= {int(top_n)}
+    """
+
+
+def refresh_rollups(conn, table: Optional[str] = None) -> int:
+    """
+    Recalcula os agregados da malha fundiária: número de lotes e área por
+    região × município × categoria × situação jurídica × faixa de módulo
+    fiscal, e o ranking dos ESTATISTICAS_TOP_N proprietários com mais área no
+    estado, em cada região e em cada município. Roda nos importadores da
+    malha, na mesma transação de `bump_data_version`; /estatisticas lê só
+    essas tabelas. Aceita uma Connection do SQLAlchemy ou uma sqlite3.Connection.
+    Retorna o número de linhas do agregado.
+    """
+    table = table or settings.TABLE_DADOS_FUNDIARIOS
+    for sql in _create_tables_sql():
+        run_sql(conn, sql)
+
+    faixa = faixa_sql()
+    rows = run_sql(conn, f"""
+        SELECT regiao_administrativa, nome_municipio, categoria, situacao_juridica,
+               {faixa} AS faixa, COUNT(*) AS lotes, SUM(area) AS area
+        FROM {table}
+        GROUP BY regiao_administrativa, nome_municipio, categoria, situacao_juridica, {faixa}
+    """).fetchall()
+    run_sql(conn, f"DELETE FROM {settings.TABLE_ESTATISTICAS}")
+    run_sql_many(conn, f"""
+        INSERT INTO {settings.TABLE_ESTATISTICAS} (
+            regiao_administrativa, {key_column("regiao_administrativa")},
+            nome_municipio, {key_column("nome_municipio")},
+            categoria, situacao_juridica, faixa_modulo_fiscal, lotes, area
+        ) VALUES (:regiao, :regiao_norm, :municipio, :municipio_norm,
+                  :categoria, :situacao, :faixa, :lotes, :area)
+    """, [
+        {
+            "regiao": reg, "regiao_norm": name_key(reg),
+            "municipio": muni, "municipio_norm": name_key(muni),
+            "categoria": cat, "situacao": sit, "faixa": fx,
+            "lotes": int(lotes), "area": None if area is None else float(area),
+        }
+        for reg, muni, cat, sit, fx, lotes, area in rows
+    ])
+
+    run_sql(conn, f"DELETE FROM {settings.TABLE_ESTATISTICAS_PROPRIETARIOS}")
+    for escopo, column in RANKING_SCOPES.items():
+        ranking = run_sql(conn, _ranking_sql(table, column, settings.ESTATISTICAS_TOP_N)).fetchall()
+        run_sql_many(conn, f"""
+            INSERT INTO {settings.TABLE_ESTATISTICAS_PROPRIETARIOS}
+                (escopo, chave, posicao, nome_proprietario, lotes, area)
+            VALUES (:escopo, :chave, :posicao, :nome, :lotes, :area)
+        """, [
+            {
+                "escopo": escopo, "chave": name_key(grupo) if column else "",
+                "posicao": int(posicao), "nome": nome, "lotes": int(lotes), "area": float(area),
+            }
+            for grupo, nome, lotes, area, posicao in ranking
+        ])
+    return len(rows)
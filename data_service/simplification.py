@@ -0,0 +1,145 @@
+# data_service/simplification.py
+
+import math
+from decimal import Decimal
+from typing import Any, FrozenSet, List, Optional, Sequence
+
+import shapely
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from config import settings, DatabaseType
+from .topojson import simplify_coverage
+from .db import table_srid
+from .version import for_data_version, get_data_version
+
+# Os níveis (e o `tolerance` das rotas) são em graus, as unidades do GeoJSON
+# servido. Em tabelas projetadas (ex.: a malha em EPSG:31984, em metros), a
+# tolerância é convertida: 1° ≈ 111,32 km (perto do equador, como no Ceará,
+# vale para os dois eixos).
+METERS_PER_DEGREE = 111320.0
+# SRIDs em graus (lon/lat): WGS 84 e SIRGAS 2000
+GEOGRAPHIC_SRIDS = frozenset({4326, 4674})
+
+
+def simplification_levels(table: Optional[str] = None) -> List[float]:
+    """
+    Níveis pré-simplificados de `table`: settings.SIMPLIFICATION_LEVELS e,
+    nos municípios, também SIMPLIFICATION_LEVELS_MUNICIPIOS.
+    """
+    levels = set(settings.SIMPLIFICATION_LEVELS)
+    if table == settings.TABLE_GEOM_MUNICIPIOS:
+        levels |= set(settings.SIMPLIFICATION_LEVELS_MUNICIPIOS)
+    return sorted(levels)
+
+
+def snap_tolerance(tolerance: Optional[float], table: Optional[str] = None) -> float:
+    """
+    Aproxima a tolerância pedida para o nível mais próximo (em escala
+    logarítmica) de `simplification_levels(table)`.
+    None usa settings.GEOMETRY_TOLERANCE; valores <= 0 significam geometria original.
+    """
+    tol = settings.GEOMETRY_TOLERANCE if tolerance is None else tolerance
+    levels = simplification_levels(table)
+    if tol <= 0 or not levels:
+        return 0.0
+    return min(levels, key=lambda level: abs(math.log(level / tol)))
+
+
+def native_tolerance(level: float, srid: Optional[int] = 4326) -> float:
+    """Tolerância `level` (em graus) nas unidades do SRID da coluna."""
+    if srid is None or srid in GEOGRAPHIC_SRIDS:
+        return level
+    return round(level * METERS_PER_DEGREE, 6)
+
+
+def simplified_column(column_base: str, level: float) -> str:
+    """Nome da coluna pré-simplificada: 0.001 -> '<base>_simpl_0_001'."""
+    suffix = format(Decimal(str(level)).normalize(), "f").replace(".", "_")
+    return f"{column_base}_simpl_{suffix}"
+
+
+def simplification_sql(
+    table: str,
+    column_base: str,
+    source_expr: str,
+    function: str = "ST_Simplify",
+    dialect: DatabaseType = DatabaseType.POSTGRES,
+    srid: Optional[int] = 4326,
+) -> List[str]:
+    """
+    Comandos que criam e preenchem, em uma única passada pela tabela, uma
+    coluna pré-simplificada por nível de settings.SIMPLIFICATION_LEVELS.
+    Usados pelos importadores ao final da carga. `srid` é o da coluna: os
+    níveis (em graus) são convertidos para as unidades dela.
+    """
+    columns = [(simplified_column(column_base, lvl), lvl) for lvl in settings.SIMPLIFICATION_LEVELS]
+    if not columns:
+        return []
+    if dialect == DatabaseType.SQLITE:
+        stmts = [f'ALTER TABLE {table} ADD COLUMN "{col}" BLOB' for col, _ in columns]
+    else:
+        stmts = [
+            f"ALTER TABLE {table} "
+            + ", ".join(f'ADD COLUMN IF NOT EXISTS "{col}" geometry' for col, _ in columns)
+        ]
+    assignments = ", ".join(
+        f'"{col}" = {function}({source_expr}, {native_tolerance(lvl, srid)!r})' for col, lvl in columns
+    )
+    stmts.append(f"UPDATE {table} SET {assignments}")
+    return stmts
+
+
+def coverage_simplify(geoms: Sequence[Any], tolerance: float) -> List[Any]:
+    """
+    Simplifica polígonos que formam uma cobertura (municípios) mantendo as
+    fronteiras compartilhadas idênticas nos dois lados, sem buracos nem
+    sobreposições. Usa o CoverageSimplifier do GEOS (o mesmo do
+    ST_CoverageSimplify; shapely >= 2.1 com GEOS >= 3.12) e, na falta dele,
+    a simplificação por arcos de data_service/topojson.py. Nos dois,
+    `tolerance` é uma distância cujo quadrado é a área mínima do triângulo de
+    um vértice com os vizinhos (Visvalingam-Whyatt), e não o desvio máximo do
+    Douglas-Peucker do ST_Simplify: o mesmo nível simplifica mais aqui.
+    """
+    if hasattr(shapely, "coverage_simplify") and shapely.geos_version >= (3, 12, 0):
+        return list(shapely.coverage_simplify(list(geoms), tolerance))
+    return simplify_coverage(geoms, tolerance)
+
+
+def table_columns(engine: Engine, table: str) -> FrozenSet[str]:
+    """
+    Colunas existentes na tabela, relidas quando a versão dos dados muda (os
+    importadores podem criar a tabela ou novas colunas com a API no ar).
+    Vazio se a tabela não existir; a ausência não fica em cache.
+    """
+    def _load() -> Optional[FrozenSet[str]]:
+        try:
+            return frozenset(c["name"] for c in inspect(engine).get_columns(table)) or None
+        except Exception:
+            return None
+
+    version = get_data_version(engine)[0]
+    return for_data_version(f"colunas:{table}", version, _load) or frozenset()
+
+
+def simplified_geometry_expr(
+    engine: Engine,
+    table: str,
+    column_base: str,
+    fallback_source: str,
+    function: str,
+    level: float,
+) -> str:
+    """
+    Expressão da geometria no nível `level`: a coluna pré-simplificada, se o
+    importador já a criou; senão, simplifica `fallback_source` em tempo de
+    consulta (ainda com a tolerância discretizada, nas unidades da coluna
+    `column_base`).
+    """
+    if level <= 0:
+        return fallback_source
+    column = simplified_column(column_base, level)
+    if column in table_columns(engine, table):
+        return f'"{column}"'
+    tolerance = native_tolerance(level, table_srid(engine, table, column_base))
+    return f"{function}({fallback_source}, {tolerance!r})"
@@ -0,0 +1,100 @@
+# data_service/snapshots.py
+
+import os
+import shutil
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from .precompressed import PRECOMPRESSED_SUFFIXES
+
+# Layout: <raiz>/snapshots/<id>/... e <raiz>/current → snapshots/<id>
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_LINK = "current"
+
+
+def current_snapshot(root: str) -> Optional[str]:
+    """
+    Diretório do snapshot publicado (caminho real, já sem o link `current`),
+    ou None. Quem serve arquivos deve resolver isto uma vez por requisição:
+    o conteúdo de um snapshot nunca muda depois de publicado.
+    """
+    link = os.path.join(root, CURRENT_LINK)
+    if not os.path.islink(link):
+        return None
+    target = os.path.realpath(link)
+    return target if os.path.isdir(target) else None
+
+
+def new_snapshot(root: str) -> str:
+    """Cria um diretório de snapshot vazio (ainda não publicado)."""
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    path = os.path.join(root, SNAPSHOTS_DIR, name)
+    os.makedirs(path)
+    return path
+
+
+def link_files(src_dir: str, dst_dir: str, names: Iterable[str]) -> None:
+    """
+    Reaproveita no novo snapshot os arquivos (e cópias .gz/.br) que não mudaram:
+    hard link quando possível, cópia caso contrário. Os arquivos de um
+    snapshot nunca são reescritos no lugar, então compartilhar o inode é seguro.
+    """
+    for name in names:
+        for suffix in ("", *PRECOMPRESSED_SUFFIXES.values()):
+            src = os.path.join(src_dir, name + suffix)
+            if not os.path.isfile(src):
+                continue
+            dst = os.path.join(dst_dir, name + suffix)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+
+def _fsync_path(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(root: str, snapshot: str) -> None:
+    """
+    Grava em disco (fsync) os arquivos e o diretório do snapshot e troca o
+    link `current` atomicamente (rename de um link temporário). Requisições
+    em andamento continuam lendo o snapshot anterior.
+    """
+    for name in os.listdir(snapshot):
+        _fsync_path(os.path.join(snapshot, name))
+    _fsync_path(snapshot)
+    link = os.path.join(root, CURRENT_LINK)
+    tmp = f"{link}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.relpath(snapshot, root), tmp)
+    os.replace(tmp, link)
+    _fsync_path(root)
+
+
+def gc_snapshots(root: str, keep: int) -> List[str]:
+    """
+    Remove os snapshots antigos, mantendo o publicado e os `keep` mais recentes
+    (o anterior ainda pode estar sendo lido por uma requisição em andamento).
+    Também apaga snapshots de execuções que falharam. Retorna os removidos.
+    """
+    base = os.path.join(root, SNAPSHOTS_DIR)
+    if not os.path.isdir(base):
+        return []
+    current = current_snapshot(root)
+    snapshots = sorted(
+        (os.path.join(base, name) for name in os.listdir(base)),
+        key=os.path.getmtime, reverse=True,
+    )
+    removed = []
+    for path in snapshots[max(keep, 1):]:
+        if current and os.path.samefile(path, current):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path)
+    return removed
@@ -0,0 +1,146 @@
+# data_service/spatial_filter.py
+
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import shapely
+
+from config import DatabaseType
+
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(value: Optional[str]) -> Optional[BBox]:
+    """Converte 'minx,miny,maxx,maxy' (lon/lat, EPSG:4326) em tupla. Lança ValueError."""
+    if not value:
+        return None
+    parts = [p.strip() for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox deve ter o formato minx,miny,maxx,maxy")
+    minx, miny, maxx, maxy = (float(p) for p in parts)
+    if not all(math.isfinite(v) for v in (minx, miny, maxx, maxy)):
+        raise ValueError("bbox com valor não finito")
+    if minx > maxx or miny > maxy:
+        raise ValueError("bbox com mínimo maior que máximo")
+    return minx, miny, maxx, maxy
+
+
+def parse_geometry(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Identifica o formato da geometria de `intersects`: ('geojson', texto) se
+    for um objeto JSON, senão ('wkt', texto). A geometria é validada aqui (com
+    shapely) para que uma entrada malformada vire 400, e não um erro do banco
+    no meio do streaming. Lança ValueError.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith(("{", "[")):
+        obj = json.loads(value)
+        if not isinstance(obj, dict):
+            raise ValueError("GeoJSON deve ser um objeto Geometry ou Feature")
+        # Aceita Feature além de Geometry
+        if obj.get("type") == "Feature":
+            obj = obj.get("geometry") or {}
+        if "type" not in obj:
+            raise ValueError("GeoJSON sem 'type'")
+        text = json.dumps(obj)
+        try:
+            shapely.from_geojson(text)
+        except shapely.errors.GEOSException as e:
+            raise ValueError(f"GeoJSON inválido: {e}") from None
+        return "geojson", text
+    try:
+        shapely.from_wkt(value)
+    except shapely.errors.GEOSException as e:
+        raise ValueError(f"WKT inválido: {e}") from None
+    return "wkt", value
+
+
+def spatial_filter_sql(
+    table: str,
+    geom_column: str,
+    srid: int,
+    bbox: Optional[BBox],
+    intersects: Optional[Tuple[str, str]],
+    dialect: DatabaseType,
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Cláusulas WHERE (e parâmetros) para filtrar `table` pela caixa `bbox` e/ou
+    pela geometria `intersects`, ambas em EPSG:4326.
+
+    - PostGIS: `&&` e ST_Intersects, que usam o índice GiST da coluna.
+    - SpatiaLite: subconsulta no `SpatialIndex` (R*Tree) + ST_Intersects.
+    """
+    clauses: List[str] = []
+    params: Dict[str, Any] = {}
+    geom = f'"{geom_column}"'
+    sqlite = dialect == DatabaseType.SQLITE
+
+    def _to_table_srid(expr: str) -> str:
+        return expr if srid == 4326 else f"ST_Transform({expr}, {srid})"
+
+    if bbox:
+        params.update(dict(zip(("bbox_minx", "bbox_miny", "bbox_maxx", "bbox_maxy"), bbox)))
+        if sqlite:
+            frame = _to_table_srid("BuildMbr(:bbox_minx, :bbox_miny, :bbox_maxx, :bbox_maxy, 4326)")
+            clauses.append(_spatialite_index_clause(table, geom_column, frame))
+            clauses.append(f"MbrIntersects({geom}, {frame})")
+        else:
+            frame = _to_table_srid("ST_MakeEnvelope(:bbox_minx, :bbox_miny, :bbox_maxx, :bbox_maxy, 4326)")
+            clauses.append(f"{geom} && {frame}")
+
+    if intersects:
+        kind, params["intersects_geom"] = intersects
+        if sqlite:
+            parsed = (
+                "SetSRID(GeomFromGeoJSON(:intersects_geom), 4326)" if kind == "geojson"
+                else "GeomFromText(:intersects_geom, 4326)"
+            )
+            other = _to_table_srid(parsed)
+            clauses.append(_spatialite_index_clause(table, geom_column, other))
+        else:
+            parsed = (
+                "ST_SetSRID(ST_GeomFromGeoJSON(:intersects_geom), 4326)" if kind == "geojson"
+                else "ST_GeomFromText(:intersects_geom, 4326)"
+            )
+            other = _to_table_srid(parsed)
+        clauses.append(f"ST_Intersects({geom}, {other})")
+
+    return clauses, params
+
+
+def point_filter_sql(
+    table: str,
+    geom_column: str,
+    srid: int,
+    dialect: DatabaseType,
+    lon: str = ":lon",
+    lat: str = ":lat",
+) -> List[str]:
+    """
+    Cláusulas WHERE das linhas de `table` cuja geometria contém o ponto
+    (`lon`, `lat`) em EPSG:4326; `lon`/`lat` são expressões SQL (parâmetros
+    ou colunas, como no lote de pontos do /lookup).
+
+    - PostGIS: ST_Contains, que usa o índice GiST da coluna.
+    - SpatiaLite: subconsulta no `SpatialIndex` (R*Tree) + ST_Contains.
+    """
+    geom = f'"{geom_column}"'
+    if dialect == DatabaseType.SQLITE:
+        point = f"MakePoint({lon}, {lat}, 4326)"
+        point = point if srid == 4326 else f"ST_Transform({point}, {srid})"
+        return [_spatialite_index_clause(table, geom_column, point), f"ST_Contains({table}.{geom}, {point})"]
+    point = f"ST_SetSRID(ST_MakePoint({lon}, {lat}), 4326)"
+    point = point if srid == 4326 else f"ST_Transform({point}, {srid})"
+    return [f"ST_Contains({table}.{geom}, {point})"]
+
+
+def _spatialite_index_clause(table: str, geom_column: str, frame: str) -> str:
+    """Restringe as linhas pelo R*Tree do SpatiaLite (o planner não o usa sozinho)."""
+    return (
+        f"{table}.ROWID IN (SELECT ROWID FROM SpatialIndex "
+        f"WHERE f_table_name = '{table}' AND f_geometry_column = '{geom_column}' "
+        f"AND search_frame = {frame})"
+    )
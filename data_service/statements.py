@@ -0,0 +1,69 @@
+# data_service/statements.py
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from config import settings
+
+
+class StatementRegistry:
+    """
+    Statements (TextClause) das consultas das rotas, por (tabela, variante).
+    A variante reúne tudo o que muda o texto (forma dos filtros, nível de
+    simplificação, colunas, paginação); os valores da requisição vão como
+    parâmetros nomeados. A mesma variante devolve sempre o mesmo objeto: o
+    texto não é remontado nem reanalisado por `text()` a cada requisição, e o
+    cache de compilação do SQLAlchemy e os prepared statements do asyncpg
+    acertam.
+
+    O texto também depende dos metadados das tabelas (colunas
+    pré-simplificadas, chaves de nome, SRID), relidos por versão dos dados:
+    por isso o registro é preenchido sob demanda, não na subida, e uma versão
+    nova o esvazia. Guarda até `max_size` variantes (LRU).
+    """
+
+    def __init__(self, max_size: int = 500):
+        self.max_size = max_size
+        self._version: Optional[int] = None
+        self._statements: "OrderedDict[Tuple[str, Hashable], TextClause]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: int, table: str, variant: Hashable, build: Callable[[], str]) -> TextClause:
+        """
+        Statement de `variant` em `table` na versão `version` dos dados; na
+        ausência, `build()` monta o texto (fora do lock: pode ler metadados).
+        """
+        key = (table, variant)
+        with self._lock:
+            if self._version != version:
+                self._statements.clear()
+                self._version = version
+            stmt = self._statements.get(key)
+            if stmt is not None:
+                self._statements.move_to_end(key)
+                return stmt
+        stmt = text(build())
+        with self._lock:
+            if self._version != version:
+                return stmt
+            stmt = self._statements.setdefault(key, stmt)
+            if len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+            return stmt
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+
+STATEMENTS = StatementRegistry(settings.DB_QUERY_CACHE_SIZE)
+
+
+def as_statement(sql: Union[str, TextClause]) -> TextClause:
+    """TextClause para `sql` (texto) ou o próprio statement (veja STATEMENTS)."""
+    if isinstance(sql, TextClause):
+        return sql
+    return text(sql)
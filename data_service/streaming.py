@@ -0,0 +1,191 @@
+# data_service/streaming.py
+
+from itertools import chain
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+)
+
+from sqlalchemy.engine import Engine
+
+from .json_response import dumps_json
+from .statements import as_statement
+
+# Tipos de mídia suportados na saída de geometrias
+GEOJSON_MEDIA_TYPE = "application/json"
+GEOJSON_SEQ_MEDIA_TYPE = "application/geo+json-seq"
+
+# Separador de registro da RFC 8142 (GeoJSON Text Sequences)
+RECORD_SEPARATOR = b"\x1e"
+
+
+def stream_rows(
+    engine: Engine,
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    yield_per: int = 1000,
+) -> Iterator[Mapping[str, Any]]:
+    """
+    Executa `sql` com cursor server-side e devolve os RowMappings sob demanda.
+    A conexão fica aberta até o iterador ser consumido ou fechado.
+    """
+    conn = engine.connect()
+    try:
+        result = conn.execution_options(
+            stream_results=True, yield_per=yield_per
+        ).execute(as_statement(sql), params or {})
+    except Exception:
+        conn.close()
+        raise
+
+    def _rows():
+        try:
+            for row in result.mappings():
+                yield row
+        finally:
+            result.close()
+            conn.close()
+
+    return _rows()
+
+
+async def astream_rows(
+    engine,
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    yield_per: int = 1000,
+) -> AsyncIterator[Mapping[str, Any]]:
+    """
+    Versão assíncrona de `stream_rows` para uma AsyncEngine: executa a
+    consulta imediatamente (erros sobem para quem chamou) e devolve um
+    iterador assíncrono que fecha a conexão ao terminar.
+    """
+    conn = await engine.connect()
+    try:
+        result = await conn.stream(as_statement(sql), params or {}, execution_options={"yield_per": yield_per})
+    except Exception:
+        await conn.close()
+        raise
+
+    async def _rows():
+        try:
+            async for row in result.mappings():
+                yield row
+        finally:
+            await result.close()
+            await conn.close()
+
+    return _rows()
+
+
+def stream_row_batches(
+    engine: Engine,
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    batch_size: int = 1000,
+) -> Tuple[List[str], Iterator[List[Tuple[Any, ...]]]]:
+    """
+    Como `stream_rows`, mas devolve (colunas, lotes de tuplas) na ordem em que
+    o cursor server-side entrega as linhas — base das saídas colunares.
+    """
+    conn = engine.connect()
+    try:
+        result = conn.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(as_statement(sql), params or {})
+    except Exception:
+        conn.close()
+        raise
+
+    def _batches():
+        try:
+            for partition in result.partitions(batch_size):
+                yield [tuple(row) for row in partition]
+        finally:
+            result.close()
+            conn.close()
+
+    return list(result.keys()), _batches()
+
+
+def peek(iterable: Iterable[Any]) -> Tuple[Optional[Any], Iterator[Any]]:
+    """
+    Lê o primeiro item sem perdê-lo: retorna (primeiro, iterador_completo).
+    Se estiver vazio, retorna (None, iterador_vazio) e fecha o iterador original.
+    """
+    it = iter(iterable)
+    try:
+        first = next(it)
+    except StopIteration:
+        return None, iter(())
+    return first, chain([first], it)
+
+
+async def apeek(iterable: AsyncIterable[Any]) -> Tuple[Optional[Any], AsyncIterator[Any]]:
+    """Equivalente assíncrono de `peek`."""
+    it = iterable.__aiter__()
+    try:
+        first = await it.__anext__()
+    except StopAsyncIteration:
+        return None, _aempty()
+
+    async def _chained():
+        yield first
+        async for item in it:
+            yield item
+
+    return first, _chained()
+
+
+async def _aempty():
+    return
+    yield
+
+
+def iter_feature_collection(
+    features: Iterable[str],
+    extra_members: Optional[Callable[[int], Dict[str, Any]]] = None,
+) -> Iterator[bytes]:
+    """
+    Escreve um FeatureCollection incrementalmente a partir de features já
+    serializadas. `extra_members(total)` permite acrescentar membros ao
+    envelope (ex.: 'properties', 'crs') depois da lista de features.
+    """
+    yield b'{"type":"FeatureCollection","features":['
+    total = 0
+    for feature in features:
+        yield (b"," if total else b"") + feature.encode("utf-8")
+        total += 1
+    yield b"]"
+    if extra_members:
+        for key, value in extra_members(total).items():
+            yield b"," + dumps_json(key) + b":" + dumps_json(value)
+    yield b"}"
+
+
+def iter_geojson_seq(features: Iterable[str]) -> Iterator[bytes]:
+    """Escreve as features como GeoJSON Text Sequence (RFC 8142)."""
+    for feature in features:
+        yield RECORD_SEPARATOR + feature.encode("utf-8") + b"\n"
+
+
+async def aiter_feature_collection(
+    features: AsyncIterable[str],
+    extra_members: Optional[Callable[[int], Dict[str, Any]]] = None,
+) -> AsyncIterator[bytes]:
+    """Equivalente assíncrono de `iter_feature_collection`."""
+    yield b'{"type":"FeatureCollection","features":['
+    total = 0
+    async for feature in features:
+        yield (b"," if total else b"") + feature.encode("utf-8")
+        total += 1
+    yield b"]"
+    if extra_members:
+        for key, value in extra_members(total).items():
+            yield b"," + dumps_json(key) + b":" + dumps_json(value)
+    yield b"}"
+
+
+async def aiter_geojson_seq(features: AsyncIterable[str]) -> AsyncIterator[bytes]:
+    """Equivalente assíncrono de `iter_geojson_seq`."""
+    async for feature in features:
+        yield RECORD_SEPARATOR + feature.encode("utf-8") + b"\n"
@@ -0,0 +1,183 @@
+# data_service/tiles.py
+
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from config import settings
+from .db import table_srid
+from .statements import as_statement
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def properties_for_zoom(layer: Dict[str, Any], z: int) -> List[str]:
+    """
+    Seleciona as propriedades da camada para o zoom pedido.
+    `layer["properties_by_zoom"]` é uma lista [(zoom_minimo, colunas), ...]
+    em ordem crescente; vale a última entrada cujo zoom mínimo é <= z.
+    """
+    cols: List[str] = []
+    for min_zoom, columns in layer["properties_by_zoom"]:
+        if z >= min_zoom:
+            cols = columns
+    return cols
+
+
+def _layer_tile_sql(name: str, layer: Dict[str, Any], z: int, srid: int) -> str:
+    """
+    SQL de uma camada do tile: filtra por bounding box (&&, usa o índice GiST
+    da coluna geométrica) e recorta/quantiza com ST_AsMVTGeom.
+    """
+    geom = f't."{layer["geom_column"]}"'
+    props = "".join(f', t."{c}"' for c in properties_for_zoom(layer, z))
+    extent = settings.TILE_EXTENT
+    margin = settings.TILE_BUFFER / extent
+    return f"""
+        SELECT ST_AsMVT(tile, '{name}', {extent}, 'geom')
+        FROM (
+            SELECT ST_AsMVTGeom(
+                       ST_Transform({geom}, 3857),
+                       ST_TileEnvelope(:z, :x, :y),
+                       {extent}, {settings.TILE_BUFFER}, true
+                   ) AS geom{props}
+            FROM {layer["table"]} AS t
+            WHERE {geom} && ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => {margin}), {srid})
+        ) AS tile
+        WHERE tile.geom IS NOT NULL
+    """
+
+
+def render_tile(
+    engine: Engine,
+    layers: Dict[str, Dict[str, Any]],
+    z: int, x: int, y: int,
+) -> bytes:
+    """
+    Gera o tile MVT concatenando as camadas pedidas (o formato permite
+    concatenar camadas codificadas separadamente).
+    """
+    parts = []
+    with engine.connect() as conn:
+        for name, layer in layers.items():
+            if z < layer.get("min_zoom", 0):
+                continue
+            srid = table_srid(engine, layer["table"], layer["geom_column"])
+            data = conn.execute(
+                as_statement(_layer_tile_sql(name, layer, z, srid)),
+                {"z": z, "x": x, "y": y}
+            ).scalar()
+            if data:
+                parts.append(bytes(data))
+    return b"".join(parts)
+
+
+async def arender_tile(
+    async_engine,
+    srids: Dict[str, int],
+    layers: Dict[str, Dict[str, Any]],
+    z: int, x: int, y: int,
+) -> bytes:
+    """
+    Versão assíncrona de `render_tile`. `srids` mapeia o nome da camada para
+    o SRID da coluna geométrica (lido antes pela engine síncrona, que cacheia).
+    """
+    parts = []
+    async with async_engine.connect() as conn:
+        for name, layer in layers.items():
+            if z < layer.get("min_zoom", 0):
+                continue
+            result = await conn.execute(
+                as_statement(_layer_tile_sql(name, layer, z, srids[name])),
+                {"z": z, "x": x, "y": y}
+            )
+            data = result.scalar()
+            if data:
+                parts.append(bytes(data))
+    return b"".join(parts)
+
+
+class TileCache:
+    """
+    Cache de tiles em disco, organizado como
+    `<root>/v<versão>/<camadas>/<z>/<x>/<y>.mvt`.
+    Ao mudar a versão dos dados, os diretórios de versões antigas são
+    removidos; ao ultrapassar `max_bytes`, os tiles menos usados recentemente
+    (mtime, atualizado a cada leitura) são apagados.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, version: int, key: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, f"v{version}", key, str(z), str(x), f"{y}.mvt")
+
+    def _files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def get(self, version: int, key: str, z: int, x: int, y: int) -> Optional[bytes]:
+        path = self._path(version, key, z, x, y)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, version: int, key: str, z: int, x: int, y: int, data: bytes) -> None:
+        if self.max_bytes <= 0:
+            return
+        path = self._path(version, key, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._version != version:
+                self._purge_old_versions(version)
+                self._version = version
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _purge_old_versions(self, version: int) -> None:
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            if name != f"v{version}":
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        self._size = None
+
+    def _evict(self) -> None:
+        """Remove os tiles mais antigos até ficar em 90% do limite."""
+        files = sorted(self._files(), key=lambda f: f[2])
+        size = sum(s for _, s, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for path, s, _ in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= s
+            except OSError:
+                pass
+        self._size = size
@@ -0,0 +1,367 @@
+# data_service/topojson.py
+#
+# TopoJSON (https://github.com/topojson/topojson-specification) de camadas de
+# polígonos, sem dependências além do shapely: coordenadas quantizadas em
+# inteiros, fronteiras compartilhadas entre vizinhos viram um único arco
+# (referenciado pelos dois lados), arcos com codificação delta e polígonos
+# agrupados (ex.: municípios → região) fundidos pelos arcos internos.
+# Os mesmos arcos servem à simplificação de coberturas (`simplify_coverage`).
+
+import heapq
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from shapely.geometry import MultiPolygon, Polygon
+
+Point = Tuple[int, int]
+Ring = List[Point]
+
+# Convenção do RFC 7946 (seguida pelo topojson-client): anel externo
+# anti-horário, buracos no sentido horário.
+
+
+def _signed_area(ring: Sequence[Point]) -> float:
+    """Área com sinal (positiva = anti-horário) de um anel sem o ponto de fechamento."""
+    n = len(ring)
+    return sum(
+        ring[i][0] * ring[(i + 1) % n][1] - ring[(i + 1) % n][0] * ring[i][1]
+        for i in range(n)
+    ) / 2.0
+
+
+def _contains(ring: Sequence[Point], point: Tuple[float, float]) -> bool:
+    """Ponto dentro do anel (ray casting)."""
+    x, y = point
+    inside = False
+    n = len(ring)
+    for i in range(n):
+        (x1, y1), (x2, y2) = ring[i], ring[(i + 1) % n]
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _oriented(ring: Ring, exterior: bool) -> Optional[Ring]:
+    """Anel sem repetições nem o ponto de fechamento, orientado; None se degenerado."""
+    ring = [p for i, p in enumerate(ring) if i == 0 or ring[i - 1] != p]
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()
+    if len(ring) < 3:
+        return None
+    area = _signed_area(ring)
+    if area == 0:
+        return None
+    if (area > 0) != exterior:
+        ring.reverse()
+    return ring
+
+
+def _polygons(geom) -> List[Any]:
+    if geom is None or geom.is_empty:
+        return []
+    if geom.geom_type == "Polygon":
+        return [geom]
+    if geom.geom_type == "MultiPolygon":
+        return list(geom.geoms)
+    raise ValueError(f"TopoJSON só aceita polígonos (recebido {geom.geom_type})")
+
+
+class _Quantizer:
+    """Transformação afim para inteiros em [0, n - 1] sobre `bounds`."""
+
+    def __init__(self, bounds: Tuple[float, float, float, float], n: int):
+        x0, y0, x1, y1 = bounds
+        self.x0, self.y0 = x0, y0
+        self.kx = (x1 - x0) / (n - 1) if x1 > x0 else 1.0
+        self.ky = (y1 - y0) / (n - 1) if y1 > y0 else 1.0
+
+    def ring(self, coords, exterior: bool) -> Optional[Ring]:
+        """Anel quantizado e orientado (None se colapsou na quantização)."""
+        return _oriented(
+            [(round((c[0] - self.x0) / self.kx), round((c[1] - self.y0) / self.ky)) for c in coords],
+            exterior
+        )
+
+    @property
+    def transform(self) -> Dict[str, List[float]]:
+        return {"scale": [self.kx, self.ky], "translate": [self.x0, self.y0]}
+
+
+def _junctions(rings: Iterable[Ring]) -> set:
+    """
+    Pontos onde anéis se encontram ou se separam: o mesmo ponto visitado com
+    vizinhos diferentes. Entre duas junções, o trecho é igual nos dois lados.
+    """
+    neighbors: Dict[Point, Tuple[Point, Point]] = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, p in enumerate(ring):
+            pair = (ring[i - 1], ring[(i + 1) % n])
+            seen = neighbors.setdefault(p, pair)
+            if seen != pair and seen != pair[::-1]:
+                junctions.add(p)
+    return junctions
+
+
+class _Arcs:
+    """Arcos únicos; um trecho percorrido ao contrário é referenciado como ~índice."""
+
+    def __init__(self):
+        self.points: List[Ring] = []
+        self._index: Dict[Tuple[Point, ...], int] = {}
+
+    def ref(self, arc: Ring) -> int:
+        key = tuple(arc)
+        if key in self._index:
+            return self._index[key]
+        reverse = key[::-1]
+        if reverse in self._index:
+            return ~self._index[reverse]
+        self._index[key] = len(self.points)
+        self.points.append(arc)
+        return len(self.points) - 1
+
+    def cut(self, ring: Ring, junctions: set) -> List[int]:
+        """Referências dos arcos que formam `ring`, cortado nas junções."""
+        cuts = [i for i, p in enumerate(ring) if p in junctions]
+        if not cuts:
+            # Anel sem vizinhos (ou idêntico a outro, como um enclave e o buraco
+            # que ele preenche): começa no menor ponto para casar nos dois sentidos
+            start = ring.index(min(ring))
+            rotated = ring[start:] + ring[:start]
+            return [self.ref(rotated + [rotated[0]])]
+        rotated = ring[cuts[0]:] + ring[:cuts[0]] + [ring[cuts[0]]]
+        offsets = [i - cuts[0] for i in cuts] + [len(ring)]
+        return [self.ref(rotated[a:b + 1]) for a, b in zip(offsets, offsets[1:])]
+
+    def start(self, ref: int) -> Point:
+        return self.points[ref][0] if ref >= 0 else self.points[~ref][-1]
+
+    def end(self, ref: int) -> Point:
+        return self.points[ref][-1] if ref >= 0 else self.points[~ref][0]
+
+    def ring_points(self, refs: Sequence[int]) -> Ring:
+        ring: Ring = []
+        for ref in refs:
+            arc = self.points[ref] if ref >= 0 else self.points[~ref][::-1]
+            ring.extend(arc[:-1])
+        return ring
+
+    def encoded(self) -> List[List[List[int]]]:
+        """Arcos com codificação delta (primeiro ponto absoluto, demais relativos)."""
+        out = []
+        for arc in self.points:
+            encoded = [list(arc[0])]
+            encoded.extend([b[0] - a[0], b[1] - a[1]] for a, b in zip(arc, arc[1:]))
+            out.append(encoded)
+        return out
+
+
+def _geometry(polygons: List[List[List[int]]], properties: Dict[str, Any]) -> Dict[str, Any]:
+    if not polygons:
+        return {"type": None, "properties": properties}
+    if len(polygons) == 1:
+        return {"type": "Polygon", "arcs": polygons[0], "properties": properties}
+    return {"type": "MultiPolygon", "arcs": polygons, "properties": properties}
+
+
+def _merge(arcs: _Arcs, polygons: Iterable[List[List[int]]]) -> List[List[List[int]]]:
+    """
+    Funde polígonos vizinhos: arcos usados por dois membros do grupo são
+    internos e saem; os restantes são encadeados em anéis (externos
+    anti-horários, buracos horários) e cada buraco vai para o menor anel
+    externo que o contém.
+    """
+    refs = [ref for polygon in polygons for ring in polygon for ref in ring]
+    uses: Dict[int, int] = defaultdict(int)
+    for ref in refs:
+        uses[ref if ref >= 0 else ~ref] += 1
+    boundary = [ref for ref in refs if uses[ref if ref >= 0 else ~ref] == 1]
+
+    by_start: Dict[Point, List[int]] = defaultdict(list)
+    for ref in boundary:
+        by_start[arcs.start(ref)].append(ref)
+    used = set()
+    rings: List[List[int]] = []
+    for ref in boundary:
+        if ref in used:
+            continue
+        ring, first, current = [ref], arcs.start(ref), arcs.end(ref)
+        used.add(ref)
+        while current != first:
+            nxt = next((r for r in by_start[current] if r not in used), None)
+            if nxt is None:
+                break  # contorno aberto (geometria de origem inconsistente)
+            ring.append(nxt)
+            used.add(nxt)
+            current = arcs.end(nxt)
+        if current == first:
+            rings.append(ring)
+
+    exteriors, holes = [], []
+    for ring in rings:
+        points = arcs.ring_points(ring)
+        area = _signed_area(points)
+        if area == 0:
+            continue
+        (exteriors if area > 0 else holes).append((abs(area), points, ring))
+    exteriors.sort(key=lambda e: e[0])
+    merged = {id(e): [e[2]] for e in exteriors}
+    for _, points, ring in holes:
+        # Ponto no interior do buraco (os vértices podem tocar o anel externo)
+        inner = Polygon(points).representative_point()
+        owner = next((e for e in exteriors if _contains(e[1], (inner.x, inner.y))), None)
+        if owner is not None:
+            merged[id(owner)].append(ring)
+    return [merged[id(e)] for e in sorted(exteriors, key=lambda e: -e[0])]
+
+
+def build_topology(
+    features: Sequence[Tuple[Any, Dict[str, Any]]],
+    quantization: int,
+    name: str,
+    group_by: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    group_name: Optional[str] = None,
+    group_property: str = "nome",
+) -> Dict[str, Any]:
+    """
+    Monta um Topology a partir de (geometria shapely, propriedades) de
+    polígonos em lon/lat. `quantization` é o número de valores inteiros por
+    eixo (ex.: 1e5). Com `group_by`, o objeto `group_name` traz um polígono
+    por grupo (propriedade `group_property`), fundido a partir dos membros e
+    compartilhando os mesmos arcos.
+    """
+    bounds = [g.bounds for g, _ in features if g is not None and not g.is_empty]
+    if not bounds:
+        raise ValueError("Nenhuma geometria para montar a topologia")
+    bbox = (
+        min(b[0] for b in bounds), min(b[1] for b in bounds),
+        max(b[2] for b in bounds), max(b[3] for b in bounds),
+    )
+    quantizer = _Quantizer(bbox, quantization)
+
+    quantized: List[List[List[Ring]]] = []
+    for geom, _ in features:
+        polygons = []
+        for polygon in _polygons(geom):
+            exterior = quantizer.ring(polygon.exterior.coords, exterior=True)
+            if exterior is None:
+                continue
+            holes = [quantizer.ring(r.coords, exterior=False) for r in polygon.interiors]
+            polygons.append([exterior] + [h for h in holes if h is not None])
+        quantized.append(polygons)
+
+    junctions = _junctions(ring for polygons in quantized for polygon in polygons for ring in polygon)
+    arcs = _Arcs()
+    geometries = []
+    groups: Dict[str, List[List[List[int]]]] = defaultdict(list)
+    for (_, properties), polygons in zip(features, quantized):
+        refs = [[arcs.cut(ring, junctions) for ring in polygon] for polygon in polygons]
+        geometries.append(_geometry(refs, properties))
+        key = group_by(properties) if group_by else None
+        if key is not None:
+            groups[key].extend(refs)
+
+    objects = {name: {"type": "GeometryCollection", "geometries": geometries}}
+    if group_by:
+        objects[group_name] = {
+            "type": "GeometryCollection",
+            "geometries": [
+                _geometry(_merge(arcs, polygons), {group_property: key})
+                for key, polygons in sorted(groups.items())
+            ],
+        }
+    return {
+        "type": "Topology",
+        "bbox": list(bbox),
+        "transform": quantizer.transform,
+        "objects": objects,
+        "arcs": arcs.encoded(),
+    }
+
+
+def _triangle_area(a: Point, b: Point, c: Point) -> float:
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2
+
+
+def _simplify_arc(arc: Ring, tolerance: float) -> Ring:
+    """
+    Visvalingam-Whyatt de um arco, mantendo as pontas (as junções): remove o
+    vértice de menor triângulo com os vizinhos enquanto a área for menor que
+    tolerance², o mesmo critério do CoverageSimplifier do GEOS, para que um
+    nível dê o mesmo grau de simplificação nos dois caminhos de
+    `coverage_simplify`. Um anel fechado (arco sem junções) mantém ao menos
+    um triângulo.
+    """
+    n = len(arc)
+    if n <= 3:
+        return arc
+    keep = 4 if arc[0] == arc[-1] else 2
+    min_area = tolerance * tolerance
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    area = {i: _triangle_area(arc[i - 1], arc[i], arc[i + 1]) for i in range(1, n - 1)}
+    heap = [(a, i) for i, a in area.items()]
+    heapq.heapify(heap)
+    removed = [False] * n
+    remaining = n
+    while heap and remaining > keep:
+        a, i = heapq.heappop(heap)
+        if removed[i] or area[i] != a:
+            continue
+        if a >= min_area:
+            break
+        removed[i] = True
+        remaining -= 1
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                area[j] = _triangle_area(arc[prev[j]], arc[j], arc[nxt[j]])
+                heapq.heappush(heap, (area[j], j))
+    return [point for point, gone in zip(arc, removed) if not gone]
+
+
+def simplify_coverage(geoms: Sequence[Any], tolerance: float) -> List[Any]:
+    """
+    Simplifica uma cobertura de polígonos (ex.: municípios) sem abrir
+    buracos nem sobreposições entre vizinhos: cada fronteira compartilhada
+    vira um arco, simplificado uma única vez e usado pelos dois lados.
+    Devolve uma geometria por entrada (None se o polígono colapsou).
+    """
+    rings_by_geom: List[List[List[Ring]]] = []
+    for geom in geoms:
+        polygons = []
+        for polygon in _polygons(geom):
+            exterior = _oriented([tuple(c[:2]) for c in polygon.exterior.coords], exterior=True)
+            if exterior is None:
+                continue
+            holes = [_oriented([tuple(c[:2]) for c in r.coords], exterior=False) for r in polygon.interiors]
+            polygons.append([exterior] + [h for h in holes if h is not None])
+        rings_by_geom.append(polygons)
+
+    junctions = _junctions(ring for polygons in rings_by_geom for polygon in polygons for ring in polygon)
+    arcs = _Arcs()
+    refs = [
+        [[arcs.cut(ring, junctions) for ring in polygon] for polygon in polygons]
+        for polygons in rings_by_geom
+    ]
+    arcs.points = [_simplify_arc(arc, tolerance) for arc in arcs.points]
+
+    out = []
+    for geom, polygons in zip(geoms, refs):
+        parts = []
+        for polygon in polygons:
+            shell = arcs.ring_points(polygon[0])
+            if len(shell) < 3:
+                continue
+            holes = [h for h in (arcs.ring_points(r) for r in polygon[1:]) if len(h) >= 3]
+            parts.append(Polygon(shell, holes))
+        if not parts:
+            out.append(None)
+        elif len(parts) == 1 and geom.geom_type == "Polygon":
+            out.append(parts[0])
+        else:
+            out.append(MultiPolygon(parts))
+    return out
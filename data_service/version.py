@@ -0,0 +1,114 @@
+# data_service/version.py
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+from .names import run_sql
+
+# Versão lida por último e instante da leitura (segundos monotônicos)
+_cached: Optional[Tuple[int, Optional[datetime]]] = None
+_cached_at: float = 0.0
+_lock = threading.Lock()
+
+# Objetos derivados dos dados mantidos em memória (metadados, índices espaciais):
+# nome → (versão, objeto). Reentrante: um `load` pode pedir outro objeto.
+_derived: Dict[str, Tuple[int, Any]] = {}
+_derived_lock = threading.RLock()
+
+
+def _create_table_sql() -> str:
+    return f"""
+        CREATE TABLE IF NOT EXISTS {settings.TABLE_DATA_VERSION} (
+            camada VARCHAR(100) PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+
+
+def bump_data_version(conn, camada: str, minimo: int = 0) -> None:
+    """
+    Incrementa a versão dos dados de uma camada. Deve ser chamada pelos
+    importadores, dentro da mesma transação da carga, ao final da importação.
+    `minimo` é a versão anterior quando a tabela de versões foi recriada (o
+    importador SQLite apaga o banco): a nova versão nunca repete uma já
+    publicada. Aceita uma Connection do SQLAlchemy ou uma sqlite3.Connection.
+    """
+    run_sql(conn, _create_table_sql())
+    run_sql(conn, f"""
+        INSERT INTO {settings.TABLE_DATA_VERSION} (camada, versao, atualizado_em)
+        VALUES (:camada, :minimo + 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (camada) DO UPDATE
+        SET versao = CASE WHEN {settings.TABLE_DATA_VERSION}.versao > :minimo
+                          THEN {settings.TABLE_DATA_VERSION}.versao ELSE :minimo END + 1,
+            atualizado_em = CURRENT_TIMESTAMP
+    """, {"camada": camada, "minimo": minimo})
+
+
+def read_data_version(engine: Engine) -> Tuple[int, Optional[datetime]]:
+    """
+    Lê (versão, última atualização) somando as versões de todas as camadas.
+    Retorna (0, None) se a tabela ainda não existir.
+    """
+    sql = f"""
+        SELECT COALESCE(SUM(versao), 0) AS versao, MAX(atualizado_em) AS atualizado_em
+        FROM {settings.TABLE_DATA_VERSION}
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text(sql)).mappings().first()
+    except Exception:
+        return 0, None
+    atualizado_em = row["atualizado_em"]
+    if isinstance(atualizado_em, str):
+        # SQLite devolve TIMESTAMP como texto
+        atualizado_em = datetime.fromisoformat(atualizado_em)
+    return int(row["versao"]), atualizado_em
+
+
+def read_layer_versions(engine: Engine) -> Dict[str, int]:
+    """Versão de cada camada ({} se a tabela ainda não existir)."""
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT camada, versao FROM {settings.TABLE_DATA_VERSION}")).all()
+    except Exception:
+        return {}
+    return {camada: int(versao) for camada, versao in rows}
+
+
+def get_data_version(engine: Engine) -> Tuple[int, Optional[datetime]]:
+    """Versão atual dos dados, relida do banco no máximo a cada DATA_VERSION_TTL_SECONDS."""
+    global _cached, _cached_at
+    with _lock:
+        now = time.monotonic()
+        if _cached is None or now - _cached_at >= settings.DATA_VERSION_TTL_SECONDS:
+            _cached = read_data_version(engine)
+            _cached_at = now
+        return _cached
+
+
+def for_data_version(name: str, version: int, load: Callable[[], Any]) -> Any:
+    """
+    Objeto `name` da versão `version` dos dados; recarregado (uma vez) por
+    `load` quando ela muda. None (tabela ainda ausente, falha na leitura) não
+    fica guardado: a próxima chamada tenta de novo.
+    """
+    current = _derived.get(name)
+    if current is not None and current[0] == version:
+        return current[1]
+    with _derived_lock:
+        current = _derived.get(name)
+        if current is None or current[0] != version:
+            value = load()
+            if value is None:
+                _derived.pop(name, None)
+                return None
+            current = _derived[name] = (version, value)
+        return current[1]
@@ -7,6 +7,12 @@ import numpy as np
 from unidecode import unidecode
 from dotenv import load_dotenv
 
+from data_service.db import get_sqlalchemy_engine
+from data_service.geometry import clean_geometry_sql
+from data_service.lookup import refresh_lookup
+from data_service.names import name_key
+from data_service.version import bump_data_version
+
 load_dotenv()
 
 def padronizar_nome_municipio(nome):
@@ -89,6 +95,9 @@ def importar_assentamentos():
         
         cursor.execute(f"TRUNCATE TABLE {table_name};")
         
+        # Geometria 2D, válida e MULTIPOLYGON já na inserção (lida pela API no lugar do WKT)
+        geom_expr = clean_geometry_sql("ST_GeomFromText(%s, 4326)", polygonal=True)
+
         # Inserir dados com tratamento de valores nulos
         for _, row in df.iterrows():
             # Garantir que valores numéricos sejam inteiros ou floats
@@ -99,7 +108,7 @@ def importar_assentamentos():
                 cd_sipra, nome_municipio, nome_municipio_original, nome_assentamento,
                 area, perimetro, forma_obtecao, tipo_assentamento, num_familias, wkt_geometry, geom
             ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, ST_GeomFromText(%s, 4326)
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, {geom_expr}
             );
             """, (
                 row['cd_sipra'] if pd.notnull(row['cd_sipra']) else None,
@@ -115,7 +124,23 @@ def importar_assentamentos():
                 row['wkt_geometry'] if pd.notnull(row['wkt_geometry']) else None
             ))
         
+        # Chave normalizada (indexada) usada no filtro por município da API
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS nome_municipio_norm TEXT;")
+        cursor.executemany(
+            f"UPDATE {table_name} SET nome_municipio_norm = %s WHERE nome_municipio = %s;",
+            [(name_key(nome), nome) for nome in df['nome_municipio'].dropna().unique()]
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_nome_municipio_norm "
+            f"ON {table_name} (nome_municipio_norm);"
+        )
+        
         conn.commit()
+        
+        # Listagem de municípios da API e versão dos dados (invalida os caches)
+        with get_sqlalchemy_engine().begin() as sa_conn:
+            refresh_lookup(sa_conn, table_name, "nome_municipio")
+            bump_data_version(sa_conn, table_name)
         print(f"Importação concluída! {len(df)} registros inseridos na tabela {table_name}.")
         
     except Exception as e:
@@ -18,6 +18,15 @@ from sqlalchemy import create_engine
 from geoalchemy2 import Geometry
 
 from config import settings
+from data_service.version import bump_data_version
+from data_service.names import build_name_keys
+from data_service.lookup import refresh_lookup
+from data_service.rollups import refresh_rollups
+from data_service.nearest import refresh_nearest_reservoirs
+from importers.postgis import (
+    add_coverage_levels, build_simplification_levels, convert_coverage_levels,
+    create_key_index, create_spatial_index,
+)
 
 
 
@@ -97,6 +106,7 @@ def import_malha_fundiaria(csv_path: str, engine=None):
         
         # 2. Validação das colunas obrigatórias
         required_cols = [
+            "lote_id",
             "modulo_fiscal",
             "area",
             "geometry",
@@ -135,7 +145,20 @@ def import_malha_fundiaria(csv_path: str, engine=None):
             index=False,
             dtype={"geometry": Geometry("MULTIPOLYGON", srid=SRID)}
         )
+        # O replace recria a tabela: refaz as colunas pré-simplificadas
+        build_simplification_levels(TABLE_MALHA_FUNDIARIA, SRID, engine=engine)
+        # Chave da paginação por keyset (ORDER BY lote_id e busca da próxima chave)
+        create_key_index(TABLE_MALHA_FUNDIARIA, "lote_id", engine=engine)
+        create_spatial_index(TABLE_MALHA_FUNDIARIA, engine=engine)
         
+        with engine.begin() as conn:
+            build_name_keys(conn, TABLE_MALHA_FUNDIARIA, ["regiao_administrativa", "nome_municipio"])
+            refresh_lookup(conn, TABLE_MALHA_FUNDIARIA, "nome_municipio", "regiao_administrativa")
+            refresh_rollups(conn, TABLE_MALHA_FUNDIARIA)
+            # Os lote_id mudam com o replace: recalcula os reservatórios mais próximos
+            refresh_nearest_reservoirs(conn, TABLE_MALHA_FUNDIARIA)
+            bump_data_version(conn, TABLE_MALHA_FUNDIARIA)
+
         logger.info("Importação da malha fundiária concluída com sucesso")
         return len(gdf)
         
@@ -157,6 +180,11 @@ def import_municipios(geojson_path: str, engine=None):
         gdf = gdf.to_crs(epsg=SRID)
         gdf.columns = [col.lower() for col in gdf.columns]
 
+        # Níveis simplificados como cobertura (inclusive os grosseiros de
+        # SIMPLIFICATION_LEVELS_MUNICIPIOS): ST_Simplify por município abriria
+        # frestas e sobreposições entre vizinhos
+        levels = add_coverage_levels(gdf)
+
         # 2. Importação para o PostGIS
         engine = engine or get_engine()
         logger.info("Importando %d municípios para %s", len(gdf), TABLE_MUNICIPIOS)
@@ -168,7 +196,13 @@ def import_municipios(geojson_path: str, engine=None):
             index=False,
             dtype={"geometry": Geometry("MULTIPOLYGON", srid=SRID)}
         )
+        convert_coverage_levels(TABLE_MUNICIPIOS, levels, engine=engine)
+        create_spatial_index(TABLE_MUNICIPIOS, engine=engine)
         
+        with engine.begin() as conn:
+            build_name_keys(conn, TABLE_MUNICIPIOS, ["nm_mun"])
+            bump_data_version(conn, TABLE_MUNICIPIOS)
+
         logger.info("Importação de municípios concluída com sucesso")
         return len(gdf)
         
@@ -9,6 +9,12 @@ from unidecode import unidecode
 from sqlalchemy import create_engine
 from geoalchemy2 import Geometry
 
+from data_service.version import bump_data_version
+from data_service.names import build_name_keys
+from data_service.lookup import refresh_lookup
+from data_service.geometry import clean_geometry
+from data_service.nearest import refresh_nearest_reservoirs
+
 # Carregar variáveis de ambiente do arquivo .env
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
@@ -59,6 +65,10 @@ gdf['area_ha'] = area_m2 / 10000.0
 gdf = gdf.rename(columns={'wkt': 'wkt_geom'})
 gdf = gdf.rename(columns={'proprietar': 'proprietario'})
 
+# Geometria 2D e válida na coluna `geom` (com índice GiST), lida pela API no lugar do WKT
+gdf['geometry'] = gdf['geometry'].apply(clean_geometry)
+gdf = gdf.rename_geometry('geom')
+
 
 print(f"Enviando para o PostGIS... (tabela: {table_name})")
 gdf.to_postgis(
@@ -66,8 +76,14 @@ gdf.to_postgis(
     con=engine,
     if_exists='replace',
     index=False,
-    dtype={'geometry': Geometry('GEOMETRY', srid=4326)}
+    dtype={'geom': Geometry('GEOMETRY', srid=4326, spatial_index=True)}
 )
+with engine.begin() as conn:
+    build_name_keys(conn, table_name, ["nome_municipio"])
+    refresh_lookup(conn, table_name, "nome_municipio")
+    # Reservatórios mais próximos de cada lote (JOIN nas análises em lote)
+    refresh_nearest_reservoirs(conn, reservatorios_table=table_name)
+    bump_data_version(conn, table_name)
 
 # Resumo
 do_importados = len(gdf)
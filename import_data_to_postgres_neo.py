@@ -18,6 +18,14 @@ from sqlalchemy import create_engine
 from geoalchemy2 import Geometry
 
 from config import settings
+from data_service.version import bump_data_version
+from data_service.lookup import refresh_lookup
+from data_service.rollups import refresh_rollups
+from data_service.nearest import refresh_nearest_reservoirs
+from importers.postgis import (
+    add_coverage_levels, build_simplification_levels, convert_coverage_levels,
+    create_key_index, create_name_keys, create_spatial_index,
+)
 
 ### O sistema das coordenadas geográficas 
 ### é baseado no EPSG: 31984 - SIRGAS 2000 / UTM zone 24S
@@ -111,6 +119,12 @@ def import_malha_fundiaria(csv_path: str, engine=None):
             "geometry": Geometry("MULTIPOLYGON", srid=31984)
         }
     )
+    build_simplification_levels(settings.TABLE_DADOS_FUNDIARIOS, 31984, engine=eng)
+    create_spatial_index(settings.TABLE_DADOS_FUNDIARIOS, engine=eng)
+    create_key_index(settings.TABLE_DADOS_FUNDIARIOS, "lote_id", engine=eng)
+    create_name_keys(
+        settings.TABLE_DADOS_FUNDIARIOS, ["regiao_administrativa", "nome_municipio"], engine=eng
+    )
     logger.info("✔️ Importação de %s concluída", settings.TABLE_DADOS_FUNDIARIOS)
     return len(gdf)
 
@@ -129,6 +143,10 @@ def import_municipios(geojson_path: str, engine=None):
     # Converte nomes de colunas para minúsculo
     gdf.columns = [col.lower() for col in gdf.columns]
 
+    # Níveis simplificados como cobertura: ST_Simplify por município abriria
+    # frestas e sobreposições entre vizinhos nas tolerâncias maiores
+    levels = add_coverage_levels(gdf)
+
     eng = engine or get_engine()
     logger.info("Importando %s para tabela '%s'...", geojson_path, settings.TABLE_GEOM_MUNICIPIOS)
     gdf.to_postgis(
@@ -140,6 +158,9 @@ def import_municipios(geojson_path: str, engine=None):
             "geometry": Geometry("MULTIPOLYGON", srid=gdf.crs.to_epsg() if gdf.crs else 4326)
         }
     )
+    convert_coverage_levels(settings.TABLE_GEOM_MUNICIPIOS, levels, engine=eng)
+    create_spatial_index(settings.TABLE_GEOM_MUNICIPIOS, engine=eng)
+    create_name_keys(settings.TABLE_GEOM_MUNICIPIOS, ["nm_mun"], engine=eng)
     logger.info("✔️ Importação de %s concluída", settings.TABLE_GEOM_MUNICIPIOS)
     return len(gdf)
 
@@ -151,6 +172,16 @@ def main():
     logger.info(f"Foram importados {quantidade_de_lotes} lotes!")
     quantidade_de_municipios = import_municipios(PATH_GEOJSON_MUNICIPIOS, engine=eng)
     logger.info(f"Foram importados {quantidade_de_municipios} municípios!")
+    # Invalida caches (tiles, pré-processados) derivados da versão anterior
+    with eng.begin() as conn:
+        # Listagens de regiões/municípios lidas pela API (tabela de localidades)
+        refresh_lookup(conn, settings.TABLE_DADOS_FUNDIARIOS, "nome_municipio", "regiao_administrativa")
+        # Agregados e rankings servidos por /estatisticas
+        refresh_rollups(conn, settings.TABLE_DADOS_FUNDIARIOS)
+        # Reservatórios mais próximos de cada lote (se os reservatórios já foram importados)
+        refresh_nearest_reservoirs(conn, settings.TABLE_DADOS_FUNDIARIOS)
+        bump_data_version(conn, settings.TABLE_DADOS_FUNDIARIOS)
+        bump_data_version(conn, settings.TABLE_GEOM_MUNICIPIOS)
     logger.info("Todas as importações concluídas com sucesso!")
 
 
@@ -4,6 +4,7 @@
 import os
 import sys
 import argparse
+import sqlite3
 import subprocess
 import tempfile
 
@@ -13,6 +14,13 @@ from shapely import wkt
 import numpy as np
 import unicodedata
 
+from config import DatabaseType, settings
+from data_service.simplification import simplification_sql
+from data_service.names import build_name_keys
+from data_service.lookup import refresh_lookup
+from data_service.rollups import refresh_rollups
+from data_service.version import bump_data_version
+
 # ---------------------------------------------------------------------------------------------------
 # 1) Diretórios e arquivos
 # ---------------------------------------------------------------------------------------------------
@@ -42,6 +50,7 @@ def ogr2ogr_to_spatialite(
     """
     # Comando base:
     # ogr2ogr -f SQLite -dsco SPATIALITE=YES terra_data.sqlite <input> -nln <layer_name> -overwrite
+    # (-lco SPATIAL_INDEX=YES cria o R*Tree usado pelos filtros bbox/intersects)
     cmd = [
         "ogr2ogr",
         "-f", "SQLite",
@@ -49,6 +58,7 @@ def ogr2ogr_to_spatialite(
         sqlite_path,
         input_path,
         "-nln", layer_name,
+        "-lco", "SPATIAL_INDEX=YES",
         "-overwrite"
     ]
 
@@ -74,6 +84,133 @@ def ogr2ogr_to_spatialite(
         return False
 
 
+def spatialite_connect(sqlite_path: str) -> sqlite3.Connection:
+    """Abre o banco com a extensão SpatiaLite carregada."""
+    conn = sqlite3.connect(sqlite_path)
+    conn.enable_load_extension(True)
+    conn.load_extension("mod_spatialite")
+    return conn
+
+
+def build_simplification_levels(sqlite_path: str, table: str) -> bool:
+    """
+    Cria as colunas pré-simplificadas (settings.SIMPLIFICATION_LEVELS) da tabela,
+    lidas pelas rotas GeoJSON no lugar de ST_Simplify por requisição, com os
+    níveis (em graus) convertidos para as unidades do SRID da tabela.
+    """
+    try:
+        conn = spatialite_connect(sqlite_path)
+        try:
+            row = conn.execute(
+                "SELECT srid FROM geometry_columns "
+                "WHERE lower(f_table_name) = lower(?) AND lower(f_geometry_column) = 'geometry'",
+                (table,),
+            ).fetchone()
+            srid = row[0] if row else None
+            for stmt in simplification_sql(
+                table, "geometry", "geometry", "ST_Simplify", DatabaseType.SQLITE, srid=srid
+            ):
+                conn.execute(stmt)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"    ↪ níveis de simplificação gerados em '{table}'")
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao gerar níveis de simplificação em '{table}': {e}")
+        return False
+
+
+def create_name_keys(sqlite_path: str, table: str, columns) -> bool:
+    """
+    Colunas `<coluna>_norm` (chave canônica dos nomes) indexadas, usadas nos
+    filtros por região/município da API.
+    """
+    try:
+        conn = spatialite_connect(sqlite_path)
+        try:
+            build_name_keys(conn, table, columns)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"    ↪ chaves de nome geradas em '{table}'")
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao gerar chaves de nome em '{table}': {e}")
+        return False
+
+
+def create_lookup(sqlite_path: str, table: str, municipio_column: str, regiao_column=None) -> bool:
+    """
+    Atualiza a tabela de localidades (região → município, com contagens) lida
+    pelas listagens da API no lugar de um DISTINCT sobre `table`.
+    """
+    try:
+        conn = spatialite_connect(sqlite_path)
+        try:
+            total = refresh_lookup(conn, table, municipio_column, regiao_column)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"    ↪ {total} localidades de '{table}' atualizadas")
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao atualizar localidades de '{table}': {e}")
+        return False
+
+
+def create_rollups(sqlite_path: str, table: str) -> bool:
+    """Recalcula os agregados e rankings da malha lidos por /estatisticas."""
+    try:
+        conn = spatialite_connect(sqlite_path)
+        try:
+            total = refresh_rollups(conn, table)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"    ↪ {total} grupos de estatísticas de '{table}' calculados")
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao calcular estatísticas de '{table}': {e}")
+        return False
+
+
+def read_data_versions(sqlite_path: str) -> dict:
+    """Versões das camadas no banco atual ({} se não houver), lidas antes de recriá-lo."""
+    if not os.path.isfile(sqlite_path):
+        return {}
+    try:
+        conn = sqlite3.connect(sqlite_path)
+        try:
+            rows = conn.execute(f"SELECT camada, versao FROM {settings.TABLE_DATA_VERSION}").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+    return {camada: int(versao) for camada, versao in rows}
+
+
+def create_data_versions(sqlite_path: str, tables, previous: dict) -> bool:
+    """
+    Incrementa a versão das camadas importadas, a partir das versões do banco
+    anterior: a API e o pré-processamento só percebem a reimportação (e
+    invalidam caches e arquivos gerados) quando a versão muda.
+    """
+    try:
+        conn = spatialite_connect(sqlite_path)
+        try:
+            for table in tables:
+                bump_data_version(conn, table, previous.get(table, 0))
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"    ↪ versão dos dados atualizada: {', '.join(tables)}")
+        return True
+    except Exception as e:
+        print(f"✗ Erro ao atualizar a versão dos dados: {e}")
+        return False
+
+
 # ---------------------------------------------------------------------------------------------------
 # 3) Importando municípios do Ceará para SpatiaLite
 # ---------------------------------------------------------------------------------------------------
@@ -100,6 +237,8 @@ def import_municipios(geojson_path: str):
         input_format="GeoJSON"
     )
     if ok:
+        build_simplification_levels(SQLITE_DB, TABLE_MUNICIPIOS)
+        create_name_keys(SQLITE_DB, TABLE_MUNICIPIOS, ["nm_mun"])
         print(f"✔ Municípios gravados em '{TABLE_MUNICIPIOS}' com sucesso.")
     else:
         print("✗ Falha ao gravar municípios em SpatiaLite.")
@@ -205,6 +344,17 @@ def import_malha_fundiaria(csv_path: str):
         pass
 
     if ok:
+        build_simplification_levels(SQLITE_DB, TABLE_FUNDOS)
+        # Índice da chave usada na paginação por keyset
+        conn = spatialite_connect(SQLITE_DB)
+        try:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_FUNDOS}_lote_id ON {TABLE_FUNDOS} (lote_id)")
+            conn.commit()
+        finally:
+            conn.close()
+        create_name_keys(SQLITE_DB, TABLE_FUNDOS, ["regiao_administrativa", "nome_municipio"])
+        create_lookup(SQLITE_DB, TABLE_FUNDOS, "nome_municipio", "regiao_administrativa")
+        create_rollups(SQLITE_DB, TABLE_FUNDOS)
         print(f"✔ Malha fundiária gravada em '{TABLE_FUNDOS}' com sucesso.")
     else:
         print("✗ Falha ao gravar malha fundiária em SpatiaLite.")
@@ -248,9 +398,13 @@ def main():
         print(f"✗ CSV não encontrado: {FUNDIARIA_CSV}")
         sys.exit(1)
 
+    # Versões do banco anterior (recriado do zero por import_municipios)
+    previous_versions = read_data_versions(SQLITE_DB)
+
     # Chama as funções de importação
     import_municipios(MUNI_GEOJSON)
     import_malha_fundiaria(FUNDIARIA_CSV)
+    create_data_versions(SQLITE_DB, [TABLE_MUNICIPIOS, TABLE_FUNDOS], previous_versions)
 
     print("\n✅ Importação concluída. Banco disponível em:", SQLITE_DB)
 
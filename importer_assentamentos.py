@@ -7,6 +7,11 @@ import csv
 from sqlalchemy import create_engine, text, DDL
 from sqlalchemy.exc import SQLAlchemyError
 import config
+from data_service.version import bump_data_version
+from data_service.names import build_name_keys
+from data_service.lookup import refresh_lookup
+from data_service.simplification import simplification_sql
+from data_service.geometry import clean_geometry_sql
 
 # Configuração de logging
 log_filename = datetime.now().strftime("logs/importer_assentamentos_ceara_%Y_%m_%d_%H_%M.log")
@@ -45,6 +50,9 @@ def create_table():
             geom GEOMETRY(MULTIPOLYGON, 4326),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+        
+        CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_geom
+        ON {TABLE_NAME} USING GIST (geom);
     """)
     
     try:
@@ -122,17 +130,22 @@ def import_csv_data():
         # Inserir dados no banco
         if records:
             with engine.begin() as conn:
-                # Primeiro inserir os dados básicos
+                # Geometria 2D, válida e tipada calculada na própria inserção
+                # (a API lê `geom`, sem interpretar o WKT a cada requisição)
+                geom_expr = clean_geometry_sql(
+                    "ST_GeomFromText(NULLIF(:wkt_geometry, ''), 4326)", polygonal=True
+                )
                 insert_query = text(f"""
                     INSERT INTO {TABLE_NAME} (
                         cd_sipra, nome_municipio, nome_municipio_original, 
                         nome_assentamento, area, perimetro, forma_obtecao, 
-                        tipo_assentamento, num_familias, wkt_geometry
+                        tipo_assentamento, num_familias, wkt_geometry, geom
                     )
                     VALUES (
                         :cd_sipra, :nome_municipio, :nome_municipio_original,
                         :nome_assentamento, :area, :perimetro, :forma_obtecao,
-                        :tipo_assentamento, :num_familias, :wkt_geometry
+                        :tipo_assentamento, :num_familias, :wkt_geometry,
+                        {geom_expr}
                     )
                 """)
                 
@@ -145,13 +158,15 @@ def import_csv_data():
                 
                 conn.execute(insert_query, corrected_records)
                 
-                # Atualizar a coluna geom a partir do WKT
-                update_geom_query = text(f"""
-                    UPDATE {TABLE_NAME} 
-                    SET geom = ST_GeomFromText(wkt_geometry, 4326)
-                    WHERE geom IS NULL
-                """)
-                conn.execute(update_geom_query)
+                # Níveis pré-simplificados lidos por /geojson_assentamentos
+                for stmt in simplification_sql(TABLE_NAME, "geom", "geom", "ST_SimplifyPreserveTopology"):
+                    conn.execute(text(stmt))
+                
+                # Chave normalizada (indexada) do filtro por município
+                build_name_keys(conn, TABLE_NAME, ["nome_municipio"])
+                # Municípios com dados desta camada, lidos pela listagem da API
+                refresh_lookup(conn, TABLE_NAME, "nome_municipio")
+                bump_data_version(conn, TABLE_NAME)
                 
                 stats['registros_salvos'] = len(records)
                 logger.info(f"{len(records)} registros inseridos com sucesso")
@@ -11,6 +11,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from geoalchemy2 import Geometry
 import config
 import json
+from data_service.version import bump_data_version
 from functools import partial
 
 # Configuração de logging
@@ -435,6 +436,7 @@ def main():
                 try:
                     with engine.begin() as conn:
                         conn.execute(insert_query, final_records)
+                        bump_data_version(conn, TABLE_NAME)
                         inserted = len(final_records)
                         stats['registros_inseridos'] += inserted
                         logger.info(f"{inserted} registros inseridos/atualizados")
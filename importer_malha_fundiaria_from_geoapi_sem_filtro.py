@@ -11,6 +11,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from geoalchemy2 import Geometry
 import config
 import json
+from data_service.version import bump_data_version
 from functools import partial
 
 # Configuração de logging
@@ -289,6 +290,7 @@ def main():
                 try:
                     with engine.begin() as conn:
                         conn.execute(insert_query, records_with_geometry)
+                        bump_data_version(conn, TABLE_NAME)
                         inserted = len(records_with_geometry)
                         stats['registros_inseridos'] += inserted
                         logger.info(f"{inserted} registros inseridos")
@@ -7,6 +7,12 @@ import csv
 from sqlalchemy import create_engine, text, DDL
 from sqlalchemy.exc import SQLAlchemyError
 import config
+from data_service.version import bump_data_version
+from data_service.names import build_name_keys
+from data_service.lookup import refresh_lookup
+from data_service.simplification import simplification_sql
+from data_service.geometry import clean_geometry_sql
+from data_service.nearest import refresh_nearest_reservoirs
 
 # Configuração de logging
 log_filename = datetime.now().strftime("logs/importer_reservatorios_ceara_%Y_%m_%d_%H_%M.log")
@@ -54,9 +60,15 @@ def create_table():
             y DOUBLE PRECISION,
             nome_municipio_original VARCHAR(255),
             nome_municipio VARCHAR(255),
-            geom GEOMETRY(POINT, 4326),
+            geom GEOMETRY(GEOMETRY, 4326),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+
+        -- Tabelas antigas guardavam só o ponto (x, y) em `geom`
+        ALTER TABLE {TABLE_NAME} ALTER COLUMN geom TYPE GEOMETRY(GEOMETRY, 4326);
+        
+        CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_geom
+        ON {TABLE_NAME} USING GIST (geom);
     """)
     
     try:
@@ -153,40 +165,39 @@ def import_csv_data():
         # Inserir dados no banco
         if records:
             with engine.begin() as conn:
-                # Primeiro inserir os dados básicos
+                # Geometria 2D e válida calculada na própria inserção: o contorno
+                # do WKT ou, sem ele, o ponto (x, y). A API lê só `geom`.
+                shape = clean_geometry_sql("ST_GeomFromText(NULLIF(:wkt_geom, ''), 4326)")
+                geom_expr = f"COALESCE({shape}, ST_SetSRID(ST_MakePoint(:x, :y), 4326))"
                 insert_query = text(f"""
                     INSERT INTO {TABLE_NAME} (
                         wkt_geom, id_sagreh, nome, proprietario, gerencia, reg_hidrog,
                         ini_monito, ano_constr, ri, o_barrad, ac_jusante, id_ac_jus,
                         area_ha, capacid_m3, cot_vert_m, lg_vert_m, cot_td_m, tipo_verte,
-                        x, y, nome_municipio_original, nome_municipio
+                        x, y, nome_municipio_original, nome_municipio, geom
                     )
                     VALUES (
                         :wkt_geom, :id_sagreh, :nome, :proprietario, :gerencia, :reg_hidrog,
                         :ini_monito, :ano_constr, :ri, :o_barrad, :ac_jusante, :id_ac_jus,
                         :area_ha, :capacid_m3, :cot_vert_m, :lg_vert_m, :cot_td_m, :tipo_verte,
-                        :x, :y, :nome_municipio_original, :nome_municipio
+                        :x, :y, :nome_municipio_original, :nome_municipio,
+                        {geom_expr}
                     )
                 """)
                 
                 conn.execute(insert_query, records)
                 
-                # Atualizar a coluna geom a partir das coordenadas X e Y
-                update_geom_query = text(f"""
-                    UPDATE {TABLE_NAME} 
-                    SET geom = ST_SetSRID(ST_MakePoint(x, y), 4326)
-                    WHERE geom IS NULL AND x IS NOT NULL AND y IS NOT NULL
-                """)
-                conn.execute(update_geom_query)
+                # Níveis pré-simplificados lidos por /geojson_reservatorios
+                for stmt in simplification_sql(TABLE_NAME, "geom", "geom", "ST_SimplifyPreserveTopology"):
+                    conn.execute(text(stmt))
                 
-                # Alternativamente, poderia usar o WKT se disponível
-                if any(r['wkt_geom'] for r in records):
-                    update_geom_wkt_query = text(f"""
-                        UPDATE {TABLE_NAME} 
-                        SET geom = ST_GeomFromText(wkt_geom, 4326)
-                        WHERE geom IS NULL AND wkt_geom IS NOT NULL AND wkt_geom != ''
-                    """)
-                    conn.execute(update_geom_wkt_query)
+                # Chave normalizada (indexada) do filtro por município
+                build_name_keys(conn, TABLE_NAME, ["nome_municipio"])
+                # Municípios com dados desta camada, lidos pela listagem da API
+                refresh_lookup(conn, TABLE_NAME, "nome_municipio")
+                # Reservatórios mais próximos de cada lote (JOIN nas análises em lote)
+                refresh_nearest_reservoirs(conn, reservatorios_table=TABLE_NAME)
+                bump_data_version(conn, TABLE_NAME)
                 
                 stats['registros_salvos'] = len(records)
                 logger.info(f"{len(records)} registros inseridos com sucesso")
@@ -0,0 +1,101 @@
+# importers/postgis.py
+
+# Passos comuns aos importadores PostGIS, rodados depois do `to_postgis`
+# (que recria a tabela com if_exists='replace' e perde colunas derivadas e índices).
+
+import logging
+
+import geopandas as gpd
+import shapely
+from sqlalchemy import create_engine, text
+
+from config import settings
+from data_service.simplification import (
+    coverage_simplify, native_tolerance, simplification_levels, simplification_sql, simplified_column,
+)
+from data_service.names import build_name_keys
+
+logger = logging.getLogger(__name__)
+
+
+def get_engine():
+    """Cria engine SQLAlchemy usando DSN do settings."""
+    return create_engine(settings.postgres_dsn)
+
+
+def build_simplification_levels(table: str, srid: int, engine=None):
+    """
+    Gera as colunas pré-simplificadas (settings.SIMPLIFICATION_LEVELS) da
+    tabela, lidas pelas rotas GeoJSON no lugar de ST_Simplify por requisição.
+    Os níveis, em graus, são convertidos para as unidades de `srid`.
+    """
+    eng = engine or get_engine()
+    logger.info("Gerando níveis de simplificação de '%s'...", table)
+    with eng.begin() as conn:
+        for stmt in simplification_sql(table, "geometry", "geometry", "ST_Simplify", srid=srid):
+            conn.execute(text(stmt))
+
+
+def add_coverage_levels(gdf: gpd.GeoDataFrame) -> list:
+    """
+    Acrescenta ao GeoDataFrame uma coluna por nível dos municípios
+    (SIMPLIFICATION_LEVELS e SIMPLIFICATION_LEVELS_MUNICIPIOS)
+    com a cobertura simplificada (fronteiras compartilhadas idênticas nos
+    vizinhos, sem buracos nem sobreposições; veja `coverage_simplify`), em
+    EWKB hex. Convertidas para geometry por `convert_coverage_levels` depois
+    da carga. Retorna os nomes das colunas.
+    """
+    srid = gdf.crs.to_epsg() if gdf.crs else 4326
+    columns = []
+    antes = int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+    for level in simplification_levels(settings.TABLE_GEOM_MUNICIPIOS):
+        column = simplified_column("geometry", level)
+        simplified = shapely.set_srid(coverage_simplify(list(gdf.geometry), native_tolerance(level, srid)), srid)
+        gdf[column] = shapely.to_wkb(simplified, hex=True, include_srid=True)
+        columns.append(column)
+        depois = int(shapely.get_num_coordinates(simplified).sum())
+        logger.info("Nível %s: %d → %d vértices", level, antes, depois)
+    return columns
+
+
+def convert_coverage_levels(table: str, columns, engine=None):
+    """Converte as colunas EWKB hex de `add_coverage_levels` para geometry."""
+    eng = engine or get_engine()
+    with eng.begin() as conn:
+        for column in columns:
+            conn.execute(text(
+                f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE geometry USING "{column}"::geometry'
+            ))
+
+
+def create_spatial_index(table: str, engine=None):
+    """
+    Garante o índice GiST da coluna geometry (usado pelos filtros bbox/intersects
+    e pelos tiles) e atualiza as estatísticas do planner.
+    """
+    eng = engine or get_engine()
+    with eng.begin() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_geometry ON {table} USING GIST (geometry)"
+        ))
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def create_key_index(table: str, column: str, engine=None):
+    """Índice B-tree da chave usada na paginação por keyset (ORDER BY/>= na chave)."""
+    eng = engine or get_engine()
+    with eng.begin() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})"
+        ))
+
+
+def create_name_keys(table: str, columns, engine=None):
+    """
+    Colunas `<coluna>_norm` com a chave canônica dos nomes (veja
+    data_service/names.py) e seus índices B-tree: os filtros por
+    região/município da API viram igualdades indexadas.
+    """
+    eng = engine or get_engine()
+    with eng.begin() as conn:
+        build_name_keys(conn, table, columns)
@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+# Testes unitários dos módulos puros do data_service (sem banco de dados).
+# config.Settings exige estas variáveis; os valores não são usados aqui.
+
+import os
+import sys
+
+os.environ.setdefault("DATABASE_TYPE", "sqlite")
+os.environ.setdefault("POSTGRES_USER", "teste")
+os.environ.setdefault("POSTGRES_PASSWORD", "teste")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
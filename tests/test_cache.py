@@ -0,0 +1,154 @@
+# tests/test_cache.py
+
+import pytest
+
+from data_service.cache import MemoryCache, SQLiteCache, TieredCache, tee_to_cache
+
+
+class _Failing:
+    """Camada indisponível (ex.: Redis fora do ar)."""
+
+    def get(self, version, key):
+        raise ConnectionError("fora do ar")
+
+    def set(self, version, key, value, ttl):
+        raise ConnectionError("fora do ar")
+
+
+# ==================== MemoryCache ====================
+
+def test_memory_cache_evicts_least_recently_used_by_bytes():
+    cache = MemoryCache(max_bytes=10)
+    cache.set(1, "a", b"aaaa", 60)
+    cache.set(1, "b", b"bbbb", 60)
+    assert cache.get(1, "a") == b"aaaa"  # "b" passa a ser o menos recente
+    cache.set(1, "c", b"cccc", 60)
+    assert cache.get(1, "b") is None
+    assert cache.get(1, "a") == b"aaaa"
+    assert cache.get(1, "c") == b"cccc"
+
+
+def test_memory_cache_replacing_key_updates_size():
+    cache = MemoryCache(max_bytes=10)
+    cache.set(1, "a", b"a" * 8, 60)
+    cache.set(1, "a", b"a" * 2, 60)
+    cache.set(1, "b", b"b" * 8, 60)
+    assert cache.get(1, "a") == b"aa"
+    assert cache.get(1, "b") == b"b" * 8
+
+
+def test_memory_cache_skips_values_larger_than_limit():
+    cache = MemoryCache(max_bytes=4)
+    cache.set(1, "a", b"aaa", 60)
+    cache.set(1, "grande", b"x" * 5, 60)
+    assert cache.get(1, "grande") is None
+    assert cache.get(1, "a") == b"aaa"
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_bytes=100)
+    cache.set(1, "a", b"aaa", -1)
+    assert cache.get(1, "a") is None
+
+
+def test_memory_cache_version_change_drops_everything():
+    cache = MemoryCache(max_bytes=100)
+    cache.set(1, "a", b"aaa", 60)
+    assert cache.get(2, "a") is None
+    assert cache.get(1, "a") is None
+
+
+# ==================== SQLiteCache ====================
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache" / "respostas.sqlite"), max_bytes=100)
+
+
+def test_sqlite_cache_round_trip_and_version(sqlite_cache):
+    sqlite_cache.set(1, "a", b"aaa", 60)
+    assert sqlite_cache.get(1, "a") == b"aaa"
+    assert sqlite_cache.get(2, "a") is None
+    sqlite_cache.set(2, "b", b"bbb", 60)
+    assert sqlite_cache.get(1, "a") is None  # versão antiga apagada na gravação
+    assert sqlite_cache.get(2, "b") == b"bbb"
+
+
+def test_sqlite_cache_expires_entries(sqlite_cache):
+    sqlite_cache.set(1, "a", b"aaa", -1)
+    assert sqlite_cache.get(1, "a") is None
+
+
+def test_sqlite_cache_evicts_to_ninety_percent(sqlite_cache):
+    for i in range(5):
+        sqlite_cache.set(1, f"k{i}", bytes([i]) * 20, 60)
+    sqlite_cache.set(1, "k5", b"z" * 20, 60)
+    present = [k for k in (f"k{i}" for i in range(6)) if sqlite_cache.get(1, k) is not None]
+    assert "k5" in present
+    assert len(present) * 20 <= 90
+
+
+# ==================== TieredCache ====================
+
+def test_tiered_cache_backfills_upper_tiers(sqlite_cache):
+    memory = MemoryCache(max_bytes=100)
+    cache = TieredCache([memory, sqlite_cache], ttl=60, max_entry_bytes=100)
+    sqlite_cache.set(1, "a", b"aaa", 60)
+    assert memory.get(1, "a") is None
+    assert cache.get(1, "a") == b"aaa"
+    assert memory.get(1, "a") == b"aaa"
+
+
+def test_tiered_cache_treats_failing_tier_as_miss():
+    memory = MemoryCache(max_bytes=100)
+    cache = TieredCache([_Failing(), memory], ttl=60, max_entry_bytes=100)
+    cache.set(1, "a", b"aaa")
+    assert memory.get(1, "a") == b"aaa"
+    assert cache.get(1, "a") == b"aaa"
+    assert cache.get(1, "b") is None
+
+
+def test_tiered_cache_skips_entries_larger_than_limit():
+    memory = MemoryCache(max_bytes=100)
+    cache = TieredCache([memory], ttl=60, max_entry_bytes=4)
+    cache.set(1, "a", b"aaaaa")
+    assert memory.get(1, "a") is None
+
+
+def test_get_or_compute_computes_once():
+    cache = TieredCache([MemoryCache(max_bytes=100)], ttl=60, max_entry_bytes=100)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"corpo"
+
+    assert cache.get_or_compute(1, "a", compute) == b"corpo"
+    assert cache.get_or_compute(1, "a", compute) == b"corpo"
+    assert len(calls) == 1
+    assert cache.get_or_compute(2, "a", compute) == b"corpo"
+    assert len(calls) == 2
+
+
+# ==================== tee_to_cache ====================
+
+def test_tee_stores_complete_body():
+    cache = TieredCache([MemoryCache(max_bytes=100)], ttl=60, max_entry_bytes=10)
+    chunks = [b"abc", b"def", b"g"]
+    assert list(tee_to_cache(iter(chunks), cache, 1, "k")) == chunks
+    assert cache.get(1, "k") == b"abcdefg"
+
+
+def test_tee_skips_body_larger_than_limit():
+    cache = TieredCache([MemoryCache(max_bytes=100)], ttl=60, max_entry_bytes=5)
+    chunks = [b"abc", b"def", b"g"]
+    assert list(tee_to_cache(iter(chunks), cache, 1, "k")) == chunks
+    assert cache.get(1, "k") is None
+
+
+def test_tee_skips_body_not_read_to_the_end():
+    cache = TieredCache([MemoryCache(max_bytes=100)], ttl=60, max_entry_bytes=10)
+    stream = tee_to_cache(iter([b"abc", b"def"]), cache, 1, "k")
+    assert next(stream) == b"abc"
+    stream.close()  # cliente desconectou
+    assert cache.get(1, "k") is None
@@ -0,0 +1,69 @@
+# tests/test_flatgeobuf.py
+
+import math
+import struct
+
+import pytest
+import shapely
+from shapely.geometry import LineString, MultiPolygon, Point, Polygon, box
+
+from data_service.flatgeobuf import MAGIC, feature_bytes, header_bytes, iter_flatgeobuf
+
+COLUMNS = ["nome", "geometry", "area", "lotes", "regularizado"]
+KINDS = ["str", "bytes", "float", "int", "bool"]
+
+
+def _rows():
+    with_hole = Polygon(box(0, 0, 4, 4).exterior.coords, [box(1, 1, 2, 2).exterior.coords])
+    return [
+        ("Crato", with_hole.wkb, 12.5, 40, True),
+        ("Iguatu", MultiPolygon([box(5, 5, 6, 6), box(7, 7, 8, 8)]).wkb, None, 3, False),
+        ("Sobral", box(9, 9, 10, 10).wkb, float("nan"), None, None),
+    ]
+
+
+def _size_prefixed(buf: bytes) -> int:
+    (size,) = struct.unpack_from("<I", buf)
+    return size
+
+
+def test_header_starts_with_magic_and_is_size_prefixed():
+    header = header_bytes("lotes", ["nome", "area"], ["str", "float"], "Polygon", 4326)
+    assert header.startswith(MAGIC)
+    body = header[len(MAGIC):]
+    assert _size_prefixed(body) == len(body) - 4
+    assert len(body) % 4 == 0
+
+
+@pytest.mark.parametrize("geom", [
+    Point(1, 2), LineString([(0, 0), (1, 1)]), box(0, 0, 1, 1), None,
+])
+def test_feature_is_size_prefixed(geom):
+    buf = feature_bytes(geom.wkb if geom is not None else None, ["str"], ["x"])
+    assert _size_prefixed(buf) == len(buf) - 4
+
+
+def test_iter_flatgeobuf_yields_header_then_features():
+    chunks = list(iter_flatgeobuf("lotes", COLUMNS, KINDS, _rows(), 1))
+    assert len(chunks) == 4
+    assert chunks[0].startswith(MAGIC)
+    assert all(_size_prefixed(c) == len(c) - 4 for c in chunks[1:])
+
+
+def test_round_trip_with_gdal(tmp_path):
+    raw = pytest.importorskip("pyogrio.raw")
+    path = tmp_path / "lotes.fgb"
+    path.write_bytes(b"".join(iter_flatgeobuf("lotes", COLUMNS, KINDS, _rows(), 1)))
+
+    meta, _, geometries, fields = raw.read(str(path))
+    assert list(meta["fields"]) == ["nome", "area", "lotes", "regularizado"]
+    assert meta["crs"] == "EPSG:4326"
+    names, areas, lotes, regularizado = fields
+    assert list(names) == ["Crato", "Iguatu", "Sobral"]
+    assert areas[0] == 12.5
+    # Nulos (e NaN) não são gravados: voltam como ausentes
+    assert math.isnan(areas[1]) and math.isnan(areas[2])
+    assert list(lotes[:2]) == [40, 3]
+    assert list(regularizado[:2]) == [True, False]
+    for (_, wkb, *_), read in zip(_rows(), geometries):
+        assert shapely.from_wkb(read).equals(shapely.from_wkb(wkb))
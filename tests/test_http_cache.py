@@ -0,0 +1,74 @@
+# tests/test_http_cache.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config import settings
+from data_service.http_cache import build_etag, cache_headers, http_date, is_not_modified
+
+MODIFIED = datetime(2024, 5, 10, 12, 30, 15, 500000, tzinfo=timezone.utc)
+ETAG = build_etag(3, "/geojson/municipios?tolerance=0.01", "gzip")
+
+
+def test_etag_is_strong_and_versioned():
+    assert ETAG.startswith('"v3-') and ETAG.endswith('"')
+    assert len(ETAG) == len('"v3-"') + 16
+
+
+def test_etag_changes_with_version_resource_and_encoding():
+    resource = "/geojson/municipios?tolerance=0.01"
+    assert build_etag(3, resource, "gzip") == ETAG
+    assert build_etag(4, resource, "gzip") != ETAG
+    assert build_etag(3, "/geojson/municipios?tolerance=0.001", "gzip") != ETAG
+    assert build_etag(3, resource, "br") != ETAG
+    assert build_etag(3, resource) == build_etag(3, resource, "identity")
+
+
+def test_cache_headers():
+    headers = cache_headers(ETAG, MODIFIED)
+    assert headers["ETag"] == ETAG
+    assert headers["Last-Modified"] == "Fri, 10 May 2024 12:30:15 GMT"
+    assert headers["Cache-Control"] == f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate"
+    assert headers["Vary"] == "Accept-Encoding"
+
+
+def test_http_date_treats_naive_as_utc():
+    assert http_date(MODIFIED.replace(tzinfo=None)) == http_date(MODIFIED)
+    brt = MODIFIED.astimezone(timezone(timedelta(hours=-3)))
+    assert http_date(brt) == http_date(MODIFIED)
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"outra", {ETAG}', True),
+    ("*", True),
+    ('"v2-0000000000000000"', False),
+    (ETAG.strip('"'), False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert is_not_modified(if_none_match, None, ETAG, MODIFIED) is expected
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    later = http_date(MODIFIED + timedelta(days=1))
+    assert not is_not_modified('"outra"', later, ETAG, MODIFIED)
+    earlier = http_date(MODIFIED - timedelta(days=1))
+    assert is_not_modified(ETAG, earlier, ETAG, MODIFIED)
+
+
+@pytest.mark.parametrize("since, expected", [
+    # Last-Modified tem precisão de segundos: a mesma data (sem a fração) vale
+    (http_date(MODIFIED), True),
+    (http_date(MODIFIED + timedelta(hours=1)), True),
+    (http_date(MODIFIED - timedelta(seconds=1)), False),
+    ("data inválida", False),
+    ("", False),
+])
+def test_if_modified_since(since, expected):
+    assert is_not_modified(None, since, ETAG, MODIFIED) is expected
+
+
+def test_no_conditions():
+    assert not is_not_modified(None, None, ETAG, MODIFIED)
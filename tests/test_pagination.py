@@ -0,0 +1,119 @@
+# tests/test_pagination.py
+
+import base64
+
+import pytest
+from sqlalchemy import create_engine, text
+from starlette.datastructures import URL
+
+from config import DatabaseType
+from data_service.pagination import (
+    decode_cursor, encode_cursor, keyset_columns_sql, keyset_order_sql, keyset_sql, page_link,
+)
+
+
+@pytest.mark.parametrize("key, tie", [(10, 3), ("Fortaleza", 7), ("São Gonçalo", "(0,12)"), (None, 1)])
+def test_cursor_round_trip(key, tie):
+    cursor = encode_cursor(key, tie)
+    assert "=" not in cursor
+    assert "+" not in cursor and "/" not in cursor
+    assert decode_cursor(cursor) == (key, tie)
+
+
+@pytest.mark.parametrize("cursor", [
+    "###",
+    base64.urlsafe_b64encode(b"nao e json").decode(),
+    base64.urlsafe_b64encode(b'{"k": 1}').decode(),
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match="cursor inválido"):
+        decode_cursor(cursor)
+
+
+def test_keyset_sql_first_page_keeps_filters():
+    clauses, params, last_row_sql = keyset_sql(
+        "lotes", "lote_id", ["municipio = :m"], {"m": "Crato"}, None, DatabaseType.SQLITE
+    )
+    assert clauses == ["municipio = :m"]
+    assert params == {"m": "Crato"}
+    assert "WHERE municipio = :m" in last_row_sql
+    assert "LIMIT 2 OFFSET :page_offset" in last_row_sql
+
+
+def test_keyset_sql_does_not_mutate_inputs():
+    clauses, params = ["a = :a"], {"a": 1}
+    keyset_sql("lotes", "lote_id", clauses, params, (5, 2), DatabaseType.SQLITE)
+    assert clauses == ["a = :a"]
+    assert params == {"a": 1}
+
+
+def test_keyset_sql_tiebreak_per_dialect():
+    clauses, params, sql = keyset_sql("lotes", "lote_id", [], {}, (5, 2), DatabaseType.SQLITE)
+    assert params == {"page_start": 5, "page_tie": 2}
+    assert "lotes.rowid > :page_tie" in clauses[0]
+    assert "lotes.rowid AS page_tie" in sql
+
+    clauses, params, sql = keyset_sql("lotes", "lote_id", [], {}, (5, "(0,2)"), DatabaseType.POSTGRES)
+    assert params == {"page_start": 5, "page_tie": "(0,2)"}
+    assert "lotes.ctid > CAST(CAST(:page_tie AS text) AS tid)" in clauses[0]
+    assert "lotes.ctid::text AS page_tie" in sql
+
+
+@pytest.fixture
+def lotes():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE lotes ("lote_id" INTEGER, municipio TEXT)'))
+        # Chaves repetidas: o desempate (rowid) decide a ordem
+        rows = [{"k": k, "m": "Crato" if i % 3 else "Iguatu"} for i, k in enumerate([3, 1, 2, 2, 5, 1, 4, 2, 3, 5])]
+        conn.execute(text("INSERT INTO lotes VALUES (:k, :m)"), rows)
+    return engine
+
+
+def _pages(engine, base_clauses, base_params, size):
+    """Percorre as páginas como as rotas: página + consulta da última linha."""
+    dialect = DatabaseType.SQLITE
+    after, pages = None, []
+    with engine.connect() as conn:
+        while True:
+            clauses, params, last_row_sql = keyset_sql("lotes", "lote_id", base_clauses, base_params, after, dialect)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(text(
+                f"SELECT {keyset_columns_sql('lotes', 'lote_id', dialect)} FROM lotes {where} "
+                f"{keyset_order_sql('lotes', 'lote_id', dialect)}"
+            ), {**params, "page_size": size}).fetchall()
+            pages.append([(r.page_key, r.page_tie) for r in rows])
+            last = conn.execute(text(last_row_sql), {**params, "page_offset": size - 1}).fetchall()
+            if len(last) < 2:
+                return pages
+            after = decode_cursor(encode_cursor(last[0].page_key, last[0].page_tie))
+            assert after == pages[-1][-1]
+
+
+@pytest.mark.parametrize("size", [1, 3, 4, 10, 20])
+def test_keyset_pages_cover_table_once(lotes, size):
+    pages = _pages(lotes, [], {}, size)
+    seen = [row for page in pages for row in page]
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 10
+    assert all(0 < len(page) <= size for page in pages)
+
+
+def test_keyset_pages_with_filter(lotes):
+    pages = _pages(lotes, ["municipio = :m"], {"m": "Iguatu"}, 2)
+    seen = [row for page in pages for row in page]
+    with lotes.connect() as conn:
+        expected = conn.execute(text(
+            "SELECT lote_id, rowid FROM lotes WHERE municipio = 'Iguatu' ORDER BY lote_id, rowid"
+        )).fetchall()
+    assert seen == [tuple(r) for r in expected]
+
+
+def test_page_link_replaces_cursor():
+    url = URL("http://localhost/geojson/lotes?municipio=Crato&cursor=antigo&limit=10")
+    link = page_link(url, "novo")
+    assert link.startswith("/geojson/lotes?")
+    assert "cursor=novo" in link
+    assert "cursor=antigo" not in link
+    assert "municipio=Crato" in link and "limit=10" in link
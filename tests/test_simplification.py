@@ -0,0 +1,95 @@
+# tests/test_simplification.py
+
+import pytest
+
+from config import settings, DatabaseType
+from data_service.simplification import (
+    native_tolerance, simplification_levels, simplification_sql, simplified_column, snap_tolerance,
+)
+
+
+@pytest.fixture(autouse=True)
+def levels(monkeypatch):
+    monkeypatch.setattr(settings, "SIMPLIFICATION_LEVELS", [0.0001, 0.0005, 0.001, 0.01])
+    monkeypatch.setattr(settings, "SIMPLIFICATION_LEVELS_MUNICIPIOS", [0.02, 0.05])
+    monkeypatch.setattr(settings, "GEOMETRY_TOLERANCE", 0.001)
+
+
+@pytest.mark.parametrize("srid", [4326, 4674, None])
+def test_native_tolerance_geographic(srid):
+    assert native_tolerance(0.001, srid) == 0.001
+
+
+def test_native_tolerance_projected_in_meters():
+    assert native_tolerance(0.001, 31984) == pytest.approx(111.32)
+    assert native_tolerance(0.0001, 31984) == pytest.approx(11.132)
+
+
+def test_simplification_levels_per_table():
+    assert simplification_levels() == [0.0001, 0.0005, 0.001, 0.01]
+    assert simplification_levels(settings.TABLE_DADOS_FUNDIARIOS) == [0.0001, 0.0005, 0.001, 0.01]
+    assert simplification_levels(settings.TABLE_GEOM_MUNICIPIOS) == [0.0001, 0.0005, 0.001, 0.01, 0.02, 0.05]
+
+
+@pytest.mark.parametrize("tolerance, expected", [
+    (None, 0.001),
+    (0, 0.0),
+    (-1, 0.0),
+    (0.001, 0.001),
+    (0.00001, 0.0001),
+    (0.0002, 0.0001),
+    (0.0003, 0.0005),
+    # Escala logarítmica: 0.003 está mais perto de 0.001 (3x) que de 0.01 (3,3x)
+    (0.003, 0.001),
+    (0.004, 0.01),
+    (1.0, 0.01),
+])
+def test_snap_tolerance(tolerance, expected):
+    assert snap_tolerance(tolerance) == expected
+
+
+def test_snap_tolerance_coarse_levels_only_for_municipios():
+    assert snap_tolerance(0.04, settings.TABLE_GEOM_MUNICIPIOS) == 0.05
+    assert snap_tolerance(0.015, settings.TABLE_GEOM_MUNICIPIOS) == 0.02
+    assert snap_tolerance(0.04, settings.TABLE_DADOS_FUNDIARIOS) == 0.01
+
+
+def test_snap_tolerance_without_levels(monkeypatch):
+    monkeypatch.setattr(settings, "SIMPLIFICATION_LEVELS", [])
+    assert snap_tolerance(0.003) == 0.0
+
+
+@pytest.mark.parametrize("level, expected", [
+    (0.001, "geometry_simpl_0_001"),
+    (0.0001, "geometry_simpl_0_0001"),
+    (1e-4, "geometry_simpl_0_0001"),
+    (0.01, "geometry_simpl_0_01"),
+    (0.05, "geometry_simpl_0_05"),
+])
+def test_simplified_column(level, expected):
+    assert simplified_column("geometry", level) == expected
+
+
+def test_simplification_sql_postgres_converts_to_native_units():
+    stmts = simplification_sql("malha", "geometry", "geometry", srid=31984)
+    assert len(stmts) == 2
+    assert stmts[0].startswith("ALTER TABLE malha ADD COLUMN IF NOT EXISTS")
+    assert stmts[0].count("ADD COLUMN") == 4
+    assert stmts[1].startswith("UPDATE malha SET ")
+    assert '"geometry_simpl_0_001" = ST_Simplify(geometry, 111.32)' in stmts[1]
+
+
+def test_simplification_sql_sqlite():
+    stmts = simplification_sql(
+        "municipios", "geometry", "GeomFromWKB(geometry)", "ST_Simplify", dialect=DatabaseType.SQLITE
+    )
+    assert stmts[:4] == [
+        f'ALTER TABLE municipios ADD COLUMN "{simplified_column("geometry", lvl)}" BLOB'
+        for lvl in settings.SIMPLIFICATION_LEVELS
+    ]
+    assert '"geometry_simpl_0_01" = ST_Simplify(GeomFromWKB(geometry), 0.01)' in stmts[4]
+
+
+def test_simplification_sql_without_levels(monkeypatch):
+    monkeypatch.setattr(settings, "SIMPLIFICATION_LEVELS", [])
+    assert simplification_sql("malha", "geometry", "geometry") == []
@@ -0,0 +1,190 @@
+# tests/test_topojson.py
+
+import math
+
+import pytest
+from shapely.geometry import LineString, Polygon, box
+from shapely.ops import unary_union
+
+from data_service.topojson import _simplify_arc, build_topology, simplify_coverage
+
+Q = 10_001
+
+
+def _decode_arcs(topology):
+    """Arcos absolutos (desfaz a codificação delta)."""
+    arcs = []
+    for arc in topology["arcs"]:
+        x, y = 0, 0
+        points = []
+        for dx, dy in arc:
+            x, y = x + dx, y + dy
+            points.append((x, y))
+        arcs.append(points)
+    return arcs
+
+
+def _ring(arcs, refs):
+    points = []
+    for ref in refs:
+        arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+        points.extend(arc[:-1])
+    return points + points[:1]
+
+
+def _shape(topology, geometry):
+    """Geometria shapely de um objeto do Topology, nas coordenadas originais."""
+    arcs = _decode_arcs(topology)
+    (kx, ky), (x0, y0) = topology["transform"]["scale"], topology["transform"]["translate"]
+    polygons = [geometry["arcs"]] if geometry["type"] == "Polygon" else geometry["arcs"]
+    parts = []
+    for polygon in polygons:
+        rings = [[(x0 + x * kx, y0 + y * ky) for x, y in _ring(arcs, refs)] for refs in polygon]
+        parts.append(Polygon(rings[0], rings[1:]))
+    return unary_union(parts)
+
+
+def _same(a, b):
+    """Mesma geometria (vértices na grade da quantização), a menos do ponto flutuante."""
+    return a.symmetric_difference(b).area < 1e-9
+
+
+def _refs(geometry):
+    polygons = [geometry["arcs"]] if geometry["type"] == "Polygon" else geometry["arcs"]
+    return [ref for polygon in polygons for ring in polygon for ref in ring]
+
+
+@pytest.fixture
+def vizinhos():
+    return [
+        (box(0, 0, 1, 1), {"nome": "A", "regiao": "Cariri"}),
+        (box(1, 0, 2, 1), {"nome": "B", "regiao": "Cariri"}),
+        (box(0, 1, 2, 2), {"nome": "C", "regiao": "Sertão"}),
+    ]
+
+
+def test_transform_and_bbox(vizinhos):
+    topology = build_topology(vizinhos, Q, "municipios")
+    assert topology["type"] == "Topology"
+    assert topology["bbox"] == [0, 0, 2, 2]
+    assert topology["transform"]["translate"] == [0, 0]
+    assert topology["transform"]["scale"] == pytest.approx([2 / (Q - 1), 2 / (Q - 1)])
+    for arc in _decode_arcs(topology):
+        assert all(0 <= x <= Q - 1 and 0 <= y <= Q - 1 for x, y in arc)
+
+
+def test_geometries_round_trip(vizinhos):
+    topology = build_topology(vizinhos, Q, "municipios")
+    geometries = topology["objects"]["municipios"]["geometries"]
+    assert [g["properties"]["nome"] for g in geometries] == ["A", "B", "C"]
+    for (geom, _), geometry in zip(vizinhos, geometries):
+        assert geometry["type"] == "Polygon"
+        assert _same(_shape(topology, geometry), geom)
+
+
+def test_shared_boundary_is_a_single_arc(vizinhos):
+    topology = build_topology(vizinhos, Q, "municipios")
+    a, b, _ = (_refs(g) for g in topology["objects"]["municipios"]["geometries"])
+    shared = {r if r >= 0 else ~r for r in a} & {r if r >= 0 else ~r for r in b}
+    assert len(shared) == 1
+    (index,) = shared
+    # Os dois lados percorrem a fronteira em sentidos opostos
+    assert {index, ~index} <= set(a) | set(b)
+    assert (index in a) != (index in b)
+
+
+def test_exterior_rings_counterclockwise(vizinhos):
+    topology = build_topology(vizinhos, Q, "municipios")
+    arcs = _decode_arcs(topology)
+    for geometry in topology["objects"]["municipios"]["geometries"]:
+        ring = _ring(arcs, geometry["arcs"][0])
+        assert Polygon(ring).exterior.is_ccw
+
+
+def test_group_merge_drops_internal_arcs(vizinhos):
+    topology = build_topology(
+        vizinhos, Q, "municipios",
+        group_by=lambda p: p["regiao"], group_name="regioes", group_property="regiao",
+    )
+    regioes = topology["objects"]["regioes"]["geometries"]
+    assert [g["properties"] for g in regioes] == [{"regiao": "Cariri"}, {"regiao": "Sertão"}]
+    cariri = regioes[0]
+    assert cariri["type"] == "Polygon"
+    assert len(cariri["arcs"]) == 1
+    assert _same(_shape(topology, cariri), box(0, 0, 2, 1))
+    # Os grupos reaproveitam os arcos dos municípios
+    assert len(topology["arcs"]) == len(build_topology(vizinhos, Q, "municipios")["arcs"])
+
+
+def test_enclave_shares_arc_with_hole_and_merges_away():
+    outer = Polygon(box(0, 0, 4, 4).exterior.coords, [box(1, 1, 2, 2).exterior.coords])
+    features = [(outer, {"g": "x"}), (box(1, 1, 2, 2), {"g": "x"})]
+    topology = build_topology(features, Q, "m", group_by=lambda p: p["g"], group_name="grupos")
+    anel, enclave = topology["objects"]["m"]["geometries"]
+    hole_refs, enclave_refs = anel["arcs"][1], enclave["arcs"][0]
+    assert len(hole_refs) == len(enclave_refs) == 1
+    assert hole_refs[0] == ~enclave_refs[0]
+    assert _same(_shape(topology, anel), outer)
+    merged = topology["objects"]["grupos"]["geometries"][0]
+    assert len(merged["arcs"]) == 1
+    assert _same(_shape(topology, merged), box(0, 0, 4, 4))
+
+
+def test_multipolygon_and_empty_geometry():
+    features = [
+        (box(0, 0, 1, 1).union(box(2, 0, 3, 1)), {"nome": "ilhas"}),
+        (Polygon(), {"nome": "vazio"}),
+    ]
+    topology = build_topology(features, Q, "m")
+    ilhas, vazio = topology["objects"]["m"]["geometries"]
+    assert ilhas["type"] == "MultiPolygon" and len(ilhas["arcs"]) == 2
+    assert vazio == {"type": None, "properties": {"nome": "vazio"}}
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        build_topology([(Polygon(), {})], Q, "m")
+    with pytest.raises(ValueError, match="LineString"):
+        build_topology([(LineString([(0, 0), (1, 1)]), {})], Q, "m")
+
+
+# ==================== Simplificação de coberturas ====================
+
+def _wavy_neighbors(n=200, amplitude=0.001):
+    """Dois polígonos cuja fronteira comum (x ≈ 1) tem muitos vértices pequenos."""
+    border = [(1 + amplitude * math.sin(i), i / n) for i in range(n + 1)]
+    left = Polygon([(0, 0)] + border + [(0, 1)])
+    right = Polygon([(2, 0), (2, 1)] + border[::-1])
+    return left, right
+
+
+def test_simplify_coverage_keeps_shared_boundary():
+    left, right = _wavy_neighbors()
+    simple_left, simple_right = simplify_coverage([left, right], 0.01)
+    assert len(simple_left.exterior.coords) < len(left.exterior.coords)
+    assert simple_left.is_valid and simple_right.is_valid
+    # Sem sobreposição nem buraco entre os vizinhos
+    assert simple_left.intersection(simple_right).area == pytest.approx(0, abs=1e-12)
+    union = unary_union([simple_left, simple_right])
+    assert union.geom_type == "Polygon" and not union.interiors
+    assert union.area == pytest.approx(2)
+
+
+def test_simplify_coverage_zero_tolerance_is_identity():
+    left, right = _wavy_neighbors()
+    simple_left, simple_right = simplify_coverage([left, right], 0)
+    assert simple_left.equals(left) and simple_right.equals(right)
+
+
+def test_simplify_arc_keeps_endpoints():
+    arc = [(i, (i % 2) * 0.01) for i in range(11)]
+    simplified = _simplify_arc(arc, 1)
+    assert simplified == [arc[0], arc[-1]]
+    assert _simplify_arc(arc, 0.01) == arc
+
+
+def test_simplify_closed_arc_keeps_a_triangle():
+    ring = [(0, 0), (1, 0), (1, 1), (0.5, 1.001), (0, 1), (0, 0)]
+    simplified = _simplify_arc(ring, 10)
+    assert len(simplified) == 4
+    assert simplified[0] == simplified[-1]